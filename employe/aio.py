@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(getattr(settings, 'AIO_DB_WORKERS', 8), thread_name_prefix='employe-aio')
+    return _pool
+
+
+def in_own_thread(func):
+    """Enveloppe ``func`` pour l'exécuter dans un thread du pool, avec sa propre connexion.
+
+    ``sync_to_async`` par défaut fait passer tout le code synchrone d'une requête par un
+    seul thread : les requêtes SQL s'y suivent. Ici les appels se répartissent sur un pool
+    borné (AIO_DB_WORKERS) ; chaque thread garde sa connexion d'un appel à l'autre, fermée
+    seulement si elle est inutilisable ou plus vieille que CONN_MAX_AGE, comme entre deux
+    requêtes HTTP.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=_executor())
+
+
+async def gather_queries(*calls):
+    """Lance en parallèle des appels ``(fonction, *args)`` indépendants ; résultats dans l'ordre."""
+    return await asyncio.gather(*(in_own_thread(func)(*args) for func, *args in calls))
@@ -0,0 +1,303 @@
+import bisect
+import datetime
+import threading
+from array import array
+from collections import Counter, defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from . import cache as object_cache
+from .models import Employe
+
+ANALYTICS_BATCH_SIZE = 2000
+# Au-delà de ce nombre de lignes modifiées d'un coup (import), les index sont refaits en
+# entier plutôt que corrigés ligne à ligne
+REINDEX_AFTER = 1000
+# Relecture des employés modifiés un peu avant la dernière date vue : une transaction
+# validée après une autre plus récente garde un updated_at antérieur
+REREAD_WINDOW = datetime.timedelta(seconds=60)
+PERCENTILES = (25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+
+# Regroupements disponibles ; ALL : toute l'entreprise, un seul groupe (code 0)
+DEPARTMENT, POSTE, ALL = 'department', 'poste', 'all'
+
+FIELDS = ('id', 'department_id', 'poste', 'salaire', 'hire_date', 'updated_at')
+
+
+def _cents(value):
+    return int(value * 100)
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _month(ordinal):
+    day = datetime.date.fromordinal(ordinal)
+    return day.year * 12 + day.month - 1
+
+
+def rank(values, p):
+    """Percentile ``p`` (entier, 0-100) d'une suite triée, au rang le plus proche : une valeur observée."""
+    return values[max((p * len(values) + 99) // 100 - 1, 0)]
+
+
+class _Groups:
+    """Salaires triés (centimes) et leur somme, par code de groupe."""
+
+    def __init__(self, buckets=None):
+        self.salaries = {code: array('q', sorted(values)) for code, values in (buckets or {}).items()}
+        self.sums = Counter({code: sum(values) for code, values in self.salaries.items()})
+
+    def add(self, code, cents):
+        values = self.salaries.get(code)
+        if values is None:
+            values = self.salaries[code] = array('q')
+        bisect.insort(values, cents)
+        self.sums[code] += cents
+
+    def discard(self, code, cents):
+        values = self.salaries[code]
+        del values[bisect.bisect_left(values, cents)]
+        self.sums[code] -= cents
+        if not values:
+            del self.salaries[code], self.sums[code]
+
+
+class OrgSnapshot:
+    """Employés en colonnes compactes (``array``), par processus, pour la page analytique.
+
+    Une ligne par employé : code du département, code du poste, salaire en centimes et
+    date d'embauche en ordinal. Les salaires sont aussi rangés, triés, par département et
+    par poste, et les embauches comptées par mois : effectifs, percentiles et histogrammes
+    se lisent sans parcourir les employés. L'instantané est rattrapé par morceaux (lignes
+    modifiées depuis la dernière lecture) quand les versions du cache d'objets changent,
+    que l'écriture vienne de ce processus ou d'un autre.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.ids = array('q')
+        self.departments = array('i')
+        self.postes = array('i')
+        self.salaries = array('q')
+        self.hired = array('i')
+        self.row = {}
+        # code -> id du département (0 : sans département) ; code -> libellé du poste
+        self.department_ids, self.department_codes = [None], {None: 0}
+        self.poste_names, self.poste_codes = [], {}
+        self.groups = {DEPARTMENT: _Groups(), POSTE: _Groups(), ALL: _Groups()}
+        self.hires = Counter()
+        self.watermark = None
+        self.versions = None
+
+    def _columns(self):
+        return (self.ids, self.departments, self.postes, self.salaries, self.hired)
+
+    def _department_code(self, department_id):
+        code = self.department_codes.get(department_id)
+        if code is None:
+            code = self.department_codes[department_id] = len(self.department_ids)
+            self.department_ids.append(department_id)
+        return code
+
+    def _poste_code(self, poste):
+        code = self.poste_codes.get(poste)
+        if code is None:
+            code = self.poste_codes[poste] = len(self.poste_names)
+            self.poste_names.append(poste)
+        return code
+
+    # -- index dérivés des colonnes
+
+    def _index(self, position, sign=1):
+        cents = self.salaries[position]
+        for name, code in ((DEPARTMENT, self.departments[position]), (POSTE, self.postes[position]), (ALL, 0)):
+            if sign > 0:
+                self.groups[name].add(code, cents)
+            else:
+                self.groups[name].discard(code, cents)
+        month = _month(self.hired[position])
+        self.hires[month] += sign
+        if not self.hires[month]:
+            del self.hires[month]
+
+    def _reindex(self):
+        for name, codes in ((DEPARTMENT, self.departments), (POSTE, self.postes), (ALL, None)):
+            buckets = defaultdict(list)
+            for position, cents in enumerate(self.salaries):
+                buckets[codes[position] if codes is not None else 0].append(cents)
+            self.groups[name] = _Groups(buckets)
+        # beaucoup d'embauches le même jour : une conversion de date par jour distinct
+        self.hires = Counter()
+        for ordinal, count in Counter(self.hired).items():
+            self.hires[_month(ordinal)] += count
+
+    # -- mise à jour des colonnes
+
+    def _put(self, pk, department_id, poste, salaire, hire_date, index=True):
+        values = (self._department_code(department_id), self._poste_code(poste), _cents(salaire), hire_date.toordinal())
+        position = self.row.get(pk)
+        if position is None:
+            position = self.row[pk] = len(self.ids)
+            self.ids.append(pk)
+            for column, value in zip(self._columns()[1:], values):
+                column.append(value)
+        elif tuple(column[position] for column in self._columns()[1:]) == values:
+            return
+        else:
+            if index:
+                self._index(position, -1)
+            for column, value in zip(self._columns()[1:], values):
+                column[position] = value
+        if index:
+            self._index(position)
+
+    def _remove(self, pk, index=True):
+        # la dernière ligne prend la place de la ligne retirée
+        position = self.row.pop(pk)
+        if index:
+            self._index(position, -1)
+        last = len(self.ids) - 1
+        if position != last:
+            for column in self._columns():
+                column[position] = column[last]
+            self.row[self.ids[position]] = position
+        for column in self._columns():
+            column.pop()
+
+    def _load(self, rows, index=True):
+        for pk, department_id, poste, salaire, hire_date, updated_at in rows:
+            self._put(pk, department_id, poste, salaire, hire_date, index)
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+
+    def _rebuild(self):
+        self._clear()
+        self._load(Employe.objects.order_by().values_list(*FIELDS).iterator(chunk_size=ANALYTICS_BATCH_SIZE), index=False)
+        self._reindex()
+
+    def _catch_up(self):
+        employes = Employe.objects.order_by()
+        changed = employes.values_list(*FIELDS)
+        if self.watermark is not None:
+            changed = changed.filter(updated_at__gte=self.watermark - REREAD_WINDOW)
+        changed = list(changed)
+        bulk = len(changed) > REINDEX_AFTER
+        self._load(changed, index=not bulk)
+        # suppressions (et lignes validées trop tard pour la fenêtre de relecture)
+        if employes.count() != len(self.row):
+            ids = set(employes.values_list('id', flat=True))
+            for pk in [pk for pk in self.row if pk not in ids]:
+                self._remove(pk, index=not bulk)
+            missing = sorted(ids - self.row.keys())
+            for start in range(0, len(missing), ANALYTICS_BATCH_SIZE // 4):
+                self._load(employes.filter(id__in=missing[start:start + ANALYTICS_BATCH_SIZE // 4]).values_list(*FIELDS),
+                           index=not bulk)
+        if bulk:
+            self._reindex()
+
+    def _department_removed(self):
+        # SET_NULL des employés d'un département supprimé : mise à jour en masse, sans updated_at
+        known = object_cache.departments()
+        return any(
+            self.department_ids[code] not in known
+            for code in self.groups[DEPARTMENT].salaries if code
+        )
+
+    def _ensure_fresh(self):
+        # versions lues avant les données : une écriture concurrente sera vue au prochain appel
+        versions = object_cache.versions('employe', 'department')
+        if versions == self.versions:
+            return
+        if self.versions is None or self._department_removed():
+            self._rebuild()
+        else:
+            self._catch_up()
+        self.versions = versions
+
+    # -- lectures
+
+    def _labels(self, by):
+        if by == DEPARTMENT:
+            # un seul passage par le cache pour tous les groupes
+            departments = object_cache.departments()
+            return lambda code: getattr(departments.get(self.department_ids[code]), 'name', 'Sans département')
+        if by == POSTE:
+            return self.poste_names.__getitem__
+        return lambda code: 'Tous'
+
+    def _code(self, by, key):
+        if by == DEPARTMENT:
+            return self.department_codes.get(key)
+        if by == POSTE:
+            return self.poste_codes.get(key)
+        return 0
+
+    def headcount(self, by=DEPARTMENT):
+        """[(libellé, effectif)], les plus grands groupes d'abord."""
+        with self._lock:
+            self._ensure_fresh()
+            label = self._labels(by)
+            counts = [(label(code), len(values)) for code, values in self.groups[by].salaries.items()]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))
+
+    def salary_summary(self, by=DEPARTMENT):
+        """Par groupe : effectif, minimum, percentiles (PERCENTILES), maximum et moyenne des salaires."""
+        with self._lock:
+            self._ensure_fresh()
+            groups, label = self.groups[by], self._labels(by)
+            summary = []
+            for code, values in groups.salaries.items():
+                mean = (Decimal(groups.sums[code]) / len(values)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+                summary.append({
+                    'label': label(code),
+                    'count': len(values),
+                    'min': _money(values[0]),
+                    'max': _money(values[-1]),
+                    'mean': _money(mean),
+                    **{f'p{p}': _money(rank(values, p)) for p in PERCENTILES},
+                })
+        return sorted(summary, key=lambda row: (-row['count'], row['label']))
+
+    def percentile(self, p, by=ALL, key=None):
+        """Salaire au percentile ``p`` d'un groupe (``key`` : id du département ou libellé du poste) ; None si vide."""
+        with self._lock:
+            self._ensure_fresh()
+            values = self.groups[by].salaries.get(self._code(by, key))
+            return _money(rank(values, p)) if values else None
+
+    def histogram(self, bins=HISTOGRAM_BINS, by=ALL, key=None):
+        """[(borne basse, borne haute exclue, effectif)] en ``bins`` tranches de même largeur."""
+        with self._lock:
+            self._ensure_fresh()
+            values = self.groups[by].salaries.get(self._code(by, key))
+            if not values:
+                return []
+            low = values[0]
+            width = (values[-1] - low) // bins + 1
+            result, start = [], 0
+            for index in range(bins):
+                end = bisect.bisect_left(values, low + (index + 1) * width)
+                result.append((_money(low + index * width), _money(low + (index + 1) * width), end - start))
+                start = end
+        return result
+
+    def hiring_trend(self, months=24, today=None):
+        """[(premier jour du mois, embauches)] pour les ``months`` derniers mois, mois sans embauche compris."""
+        today = today or timezone.localdate()
+        with self._lock:
+            self._ensure_fresh()
+            last = max([today.year * 12 + today.month - 1, *self.hires])
+            return [
+                (datetime.date(month // 12, month % 12 + 1, 1), self.hires.get(month, 0))
+                for month in range(last - months + 1, last + 1)
+            ]
+
+
+snapshot = OrgSnapshot()
@@ -0,0 +1,252 @@
+import hashlib
+import hmac
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import cache as object_cache
+from .archive import merged, partitions
+from .models import Attendance, Department, Employe, LeaveRequest
+from .pagination import decode_cursor, encode_cursor
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+
+def _integer(value):
+    return int(value)
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Resource:
+    """Ressource en lecture seule : champs publics (nom -> chemin ORM) et filtres autorisés.
+
+    ``depends`` : versions du cache objet (employe/cache.py) des tables lues, champs liés
+    et filtres compris (renommer un employé change les présences qui affichent son nom,
+    supprimer un département vide le ``department_name`` de ses employés).
+    ``partitions`` : filtres -> modèles lus ensemble (même schéma, ids disjoints), pour
+    les présences réparties entre table chaude et archive.
+    """
+
+    def __init__(self, model, fields, filters, depends, partitions=None):
+        self.model = model
+        self.fields = fields
+        self.filters = dict(filters, updated_since=('updated_at__gte', _datetime))
+        self.depends = depends
+        self.partitions = partitions
+
+    def models(self, lookups=None):
+        return self.partitions(lookups or {}) if self.partitions else [self.model]
+
+    def validators(self, *parts):
+        """ETag et Last-Modified tirés des versions du cache, sans requête : une écriture
+        sur une table lue (signaux, ou appel explicite sur les chemins en masse) les change."""
+        etag = _etag(*parts, *object_cache.versions(*self.depends))
+        return etag, object_cache.changed_at(*self.depends)
+
+    def querysets(self, params):
+        lookups = {}
+        for name, (lookup, parse) in self.filters.items():
+            value = params.get(name)
+            if value in (None, ''):
+                continue
+            try:
+                lookups[lookup] = parse(value)
+            except (ValueError, ValidationError):
+                raise ValueError(f"Valeur invalide pour {name} : {value}")
+        return [model.objects.filter(**lookups) for model in self.models(lookups)]
+
+    def select(self, requested):
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Champ(s) inconnu(s) : {', '.join(unknown)}")
+        # l'id sert de curseur : toujours renvoyé
+        return ['id'] + [name for name in names if name != 'id']
+
+
+RESOURCES = {
+    'employes': Resource(Employe, {
+        'id': 'id',
+        'nom': 'nom',
+        'email': 'email',
+        'poste': 'poste',
+        'salaire': 'salaire',
+        'department': 'department_id',
+        'department_name': 'department__name',
+        'hire_date': 'hire_date',
+        'updated_at': 'updated_at',
+    }, {
+        'department': ('department_id', _integer),
+        'poste': ('poste', str),
+        'hired_after': ('hire_date__gte', _date),
+        'hired_before': ('hire_date__lte', _date),
+    }, depends=('employe', 'department')),
+    'departements': Resource(Department, {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }, {
+        'name': ('name', str),
+    }, depends=('department',)),
+    'attendance': Resource(Attendance, {
+        'id': 'id',
+        'employee': 'employee_id',
+        'employee_name': 'employee__nom',
+        'work_date': 'work_date',
+        'check_in': 'check_in',
+        'check_out': 'check_out',
+        'worked_hours': 'worked_hours',
+        'updated_at': 'updated_at',
+    }, {
+        'employee': ('employee_id', _integer),
+        'department': ('employee__department_id', _integer),
+        'start': ('work_date__gte', _date),
+        'end': ('work_date__lte', _date),
+    }, depends=('attendance', 'employe'),
+        partitions=lambda lookups: partitions(lookups.get('work_date__gte'))),
+    'conges': Resource(LeaveRequest, {
+        'id': 'id',
+        'employee': 'employee_id',
+        'employee_name': 'employee__nom',
+        'type': 'type',
+        'status': 'status',
+        'start_date': 'start_date',
+        'end_date': 'end_date',
+        'reason': 'reason',
+        'approved_by': 'approved_by',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }, {
+        'employee': ('employee_id', _integer),
+        'department': ('employee__department_id', _integer),
+        'status': ('status', str),
+        'type': ('type', str),
+        # congés qui chevauchent la période, comme l'export
+        'start': ('end_date__gte', _date),
+        'end': ('start_date__lte', _date),
+    }, depends=('leave', 'employe')),
+}
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _authorized(request):
+    if request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser):
+        return True
+    # intégrations : jeton partagé API_TOKEN (désactivé si vide)
+    token = getattr(settings, 'API_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    # en octets : compare_digest refuse les str non ASCII (en-tête « Bearer sécret »)
+    return bool(token) and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+
+
+def _conditional(request, etag, last_modified, build):
+    """304 si le client a déjà cette version ; sinon ``build()`` est appelé et renvoyé en JSON
+    (404 s'il renvoie ``None``)."""
+    # à la seconde, comme If-Modified-Since : sinon les fractions font toujours échouer la comparaison
+    timestamp = int(last_modified) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        body = build()
+        if body is None:
+            return _error("Introuvable.", 404)
+        response = JsonResponse(body, encoder=DjangoJSONEncoder)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
+
+
+def _etag(*parts):
+    return '"' + hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+
+@require_safe
+def resource_list(request, resource):
+    spec = RESOURCES.get(resource)
+    if spec is None:
+        return _error("Ressource inconnue.", 404)
+    if not _authorized(request):
+        return _error("Authentification requise.", 401)
+    try:
+        querysets = spec.querysets(request.GET)
+        names = spec.select(request.GET.get('fields'))
+        limit = min(int(request.GET.get('limit') or API_DEFAULT_LIMIT), API_MAX_LIMIT)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    if limit < 1:
+        return _error("limit doit être positif.", 400)
+
+    # Validateurs lus avant la page : une écriture concurrente donne au pire un ETag
+    # ancien sur des données neuves, jamais l'inverse.
+    etag, last_modified = spec.validators(resource, request.GET.urlencode())
+
+    cursor = request.GET.get('after')
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values or values[0] != 'id' or not isinstance(values[1], int):
+            return _error("Curseur invalide.", 400)
+        querysets = [qs.filter(id__gt=values[1]) for qs in querysets]
+
+    def page():
+        # l'id est toujours la première colonne : les partitions sont fusionnées sur lui
+        paths = [spec.fields[name] for name in names]
+        rows = list(islice(merged(
+            (qs.order_by('id').values_list(*paths)[:limit + 1] for qs in querysets), itemgetter(0),
+        ), limit + 1))
+        results = [dict(zip(names, row)) for row in rows[:limit]]
+        next_cursor = encode_cursor(['id', results[-1]['id']]) if len(rows) > limit else None
+        return {'results': results, 'next_cursor': next_cursor}
+
+    return _conditional(request, etag, last_modified, page)
+
+
+@require_safe
+def resource_detail(request, resource, id):
+    spec = RESOURCES.get(resource)
+    if spec is None:
+        return _error("Ressource inconnue.", 404)
+    if not _authorized(request):
+        return _error("Authentification requise.", 401)
+    try:
+        names = spec.select(request.GET.get('fields'))
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    # une suppression change la version : un ETag encore valide désigne une ligne existante
+    etag, last_modified = spec.validators(resource, id, ','.join(names))
+
+    def detail():
+        for model in spec.models():
+            row = model.objects.filter(pk=id).values_list(*[spec.fields[name] for name in names]).first()
+            if row is not None:
+                return dict(zip(names, row))
+    return _conditional(request, etag, last_modified, detail)
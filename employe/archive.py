@@ -0,0 +1,102 @@
+import datetime
+import heapq
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedAttendance, Attendance
+
+# Partitionnement des présences dans le temps : la table chaude (Attendance) garde les
+# ATTENDANCE_HOT_MONTHS derniers mois, l'archive (ArchivedAttendance) les mois clos.
+# Un mois n'est jamais réparti entre les deux et rien d'archivé n'est postérieur au début
+# de la période chaude : une lecture qui commence après ce jour ignore l'archive.
+COLUMNS = ('id', 'employee_id', 'work_date', 'check_in', 'check_out', 'worked_hours', 'updated_at')
+
+
+def hot_months():
+    return max(1, int(getattr(settings, 'ATTENDANCE_HOT_MONTHS', 3)))
+
+
+def _month_start(day, back=0):
+    index = day.year * 12 + day.month - 1 - back
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def hot_since(today=None):
+    """Premier jour de la période chaude : les présences antérieures peuvent être archivées."""
+    return _month_start(today or timezone.localdate(), hot_months() - 1)
+
+
+def partitions(start=None):
+    """Modèles à lire pour des présences à partir de ``start``, archive d'abord."""
+    if start is not None and start >= hot_since():
+        return [Attendance]
+    return [ArchivedAttendance, Attendance]
+
+
+def merged(querysets, key):
+    """Parcourt plusieurs querysets triés de la même façon comme un seul (fusion, sans tri global)."""
+    return heapq.merge(*(iter(qs) for qs in querysets), key=key)
+
+
+def archived_keys(keys):
+    """Parmi des (employee_id, work_date), ceux déjà archivés (journées closes, non modifiables)."""
+    since = hot_since()
+    old = {(employee_id, day) for employee_id, day in keys if day < since}
+    if not old:
+        return set()
+    match = Q()
+    for employee_id, day in old:
+        match |= Q(employee_id=employee_id, work_date=day)
+    return set(ArchivedAttendance.objects.filter(match).values_list('employee_id', 'work_date'))
+
+
+def _move(source, target, start, end, extra=None):
+    # INSERT ... SELECT puis DELETE en SQL brut : aucun signal, les agrégats mensuels
+    # (qui couvrent les deux tables) restent justes
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datefield_value
+    columns = ', '.join(quote(column) for column in COLUMNS)
+    extra = extra or {}
+    extra_columns = ''.join(f', {quote(column)}' for column in extra)
+    extra_values = ''.join(', %s' for _ in extra)
+    where = f'{quote("work_date")} >= %s AND {quote("work_date")} < %s'
+    bounds = [adapt(start), adapt(end)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(target._meta.db_table)} ({columns}{extra_columns}) '
+            f'SELECT {columns}{extra_values} FROM {quote(source._meta.db_table)} WHERE {where}',
+            [*extra.values(), *bounds],
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'DELETE FROM {quote(source._meta.db_table)} WHERE {where}', bounds)
+    return moved
+
+
+def archive(before=None):
+    """Déplace les mois antérieurs à ``before`` (par défaut le début de la période chaude).
+
+    Un mois par transaction : les écritures concurrentes ne sont bloquées que le temps
+    d'un mois. Renvoie [(premier jour du mois, lignes déplacées)].
+    """
+    since = hot_since()
+    before = min(_month_start(before), since) if before else since
+    archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    done = []
+    for month in Attendance.objects.filter(work_date__lt=before).dates('work_date', 'month'):
+        following = _month_start(month, -1)
+        with transaction.atomic():
+            done.append((month, _move(Attendance, ArchivedAttendance, month, following, {'archived_at': archived_at})))
+    return done
+
+
+def restore(since):
+    """Ramène dans la table chaude les présences archivées à partir du mois de ``since``."""
+    since = _month_start(since)
+    done = []
+    for month in ArchivedAttendance.objects.filter(work_date__gte=since).dates('work_date', 'month'):
+        with transaction.atomic():
+            done.append((month, _move(ArchivedAttendance, Attendance, month, _month_start(month, -1))))
+    return done
@@ -0,0 +1,148 @@
+import contextvars
+import datetime
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attendance, AuditEntry, Department, Employe, LeaveRequest, audit_state
+
+# Nom d'entité dans le journal (mêmes noms que les ressources de l'API)
+ENTITIES = {
+    Employe: 'employes',
+    Department: 'departements',
+    Attendance: 'attendance',
+    LeaveRequest: 'conges',
+}
+MODELS = {entity: model for model, entity in ENTITIES.items()}
+
+CREATED, UPDATED, DELETED = 'c', 'u', 'd'
+
+# Auteur des modifications en cours : l'utilisateur de la requête (AuditActorMiddleware)
+# ou un nom posé par acting_as() ; suit le contexte à travers sync_to_async
+_actor = contextvars.ContextVar('audit_actor', default=None)
+
+
+def _batch_size():
+    return getattr(settings, 'AUDIT_BATCH_SIZE', 200)
+
+
+def _json(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def diff(before, after):
+    """{champ: [avant, après]} pour les champs dont la valeur a changé."""
+    changes = {}
+    for name in before.keys() | after.keys():
+        old, new = before.get(name), after.get(name)
+        if old != new:
+            changes[name] = [_json(old), _json(new)]
+    return dict(sorted(changes.items()))
+
+
+def current_actor():
+    actor = _actor.get()
+    if callable(actor):
+        # utilisateur de la requête : résolu seulement si une entrée est écrite
+        actor = actor()
+    if actor is None or isinstance(actor, str):
+        return actor or ''
+    return actor.get_username() if actor.is_authenticated else ''
+
+
+@contextmanager
+def acting_as(actor):
+    """Attribue les modifications faites dans le bloc à ``actor`` (nom, utilisateur ou
+    fonction qui renvoie l'utilisateur)."""
+    token = _actor.set(actor)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+class _Batch:
+    """Entrées d'un même bloc atomique (même pile de points de sauvegarde), écrites en un
+    seul bulk_create quand la transaction est validée."""
+
+    def __init__(self):
+        self.entries = []
+        self.written = False
+
+    def write(self):
+        # inscrit une fois par entrée ajoutée : seul le premier appel écrit
+        if not self.written:
+            self.written = True
+            AuditEntry.objects.bulk_create(self.entries, batch_size=_batch_size())
+
+
+def _entry(model, pk, action, changes, actor, at):
+    return AuditEntry(entity=ENTITIES[model], entity_id=pk, action=action, changes=changes, actor=actor, at=at)
+
+
+def _after_commit(entries):
+    """Écrit ``entries`` après validation de la transaction ; rien si elle est annulée.
+
+    Les entrées d'un même bloc rejoignent le lot déjà en attente pour lui : un seul
+    INSERT par bloc. Un lot n'est partagé qu'entre entrées enregistrées sous les mêmes
+    points de sauvegarde, pour être abandonné avec eux en cas d'annulation partielle.
+    """
+    if not entries:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        AuditEntry.objects.bulk_create(entries, batch_size=_batch_size())
+        return
+    savepoints = set(connection.savepoint_ids)
+    for callback_savepoints, func, _ in reversed(connection.run_on_commit):
+        batch = getattr(func, '__self__', None)
+        if isinstance(batch, _Batch) and callback_savepoints == savepoints and not batch.written:
+            break
+    else:
+        batch = _Batch()
+    batch.entries.extend(entries)
+    transaction.on_commit(batch.write)
+
+
+def record(instance, action):
+    """Entrée pour un enregistrement ou une suppression (signaux) ; rien si aucun champ suivi n'a changé."""
+    before = getattr(instance, '_audit_state', None) or {}
+    after = audit_state(instance) if action != DELETED else {}
+    if action == UPDATED and not before:
+        # instance construite à la main (jamais chargée) : on ne connaît pas l'état précédent
+        before = {name: None for name in after}
+    changes = diff(before, after)
+    instance._audit_state = after
+    if changes:
+        _after_commit([_entry(type(instance), instance.pk, action, changes, current_actor(), timezone.now())])
+
+
+def record_created(instances):
+    """Créations passées par bulk_create, sans signaux (import d'employés)."""
+    actor, at = current_actor(), timezone.now()
+    entries = []
+    for instance in instances:
+        instance._audit_state = audit_state(instance)
+        entries.append(_entry(type(instance), instance.pk, CREATED, diff({}, instance._audit_state), actor, at))
+    _after_commit(entries)
+
+
+def record_updates(model, changes_by_pk):
+    """Modifications faites par UPDATE en masse : {id: {champ: [avant, après]}}."""
+    actor, at = current_actor(), timezone.now()
+    _after_commit([
+        _entry(model, pk, UPDATED, {name: [_json(old), _json(new)] for name, (old, new) in sorted(changes.items())}, actor, at)
+        for pk, changes in changes_by_pk.items()
+    ])
+
+
+def history(model, pk):
+    """Entrées d'une entité, les plus récentes d'abord (index ``audit_entity_idx``)."""
+    return AuditEntry.objects.filter(entity=ENTITIES[model], entity_id=pk)
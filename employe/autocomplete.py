@@ -0,0 +1,59 @@
+from django.db import connection
+from django.db.models.functions import Lower
+
+from .cache import departments
+from .models import Employe
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX = 50
+
+# Borne haute d'un intervalle de préfixe : plus grand point de code Unicode
+_PREFIX_END = '\U0010ffff'
+
+
+def _fold(text):
+    # LOWER() de SQLite ne replie que l'ASCII : même traitement pour la saisie
+    if connection.vendor == 'sqlite':
+        return ''.join(char.lower() if char.isascii() else char for char in text)
+    return text.lower()
+
+
+def label(nom, email):
+    return f"{nom} ({email})"
+
+
+def prefix_matches(field, prefix, limit):
+    return (
+        Employe.objects.annotate(key=Lower(field))
+        .filter(key__gte=prefix, key__lt=prefix + _PREFIX_END)
+        .order_by('key', 'id')
+        .values('id', 'nom', 'email', 'department_id')[:limit]
+    )
+
+
+def suggest(query, limit=AUTOCOMPLETE_LIMIT):
+    """Employés dont le nom ou l'email commence par ``query`` (casse ignorée), triés par nom.
+
+    Chaque champ est lu comme un intervalle ``[préfixe, préfixe + U+10FFFF)`` sur un index
+    d'expression ``LOWER(champ), id`` : au plus ``limit`` lignes parcourues par champ, quel
+    que soit l'effectif (un ``LIKE``/``istartswith`` ne profiterait pas de l'index).
+    """
+    prefix = _fold(query.strip())
+    if not prefix:
+        return []
+    found = {}
+    for field in ('nom', 'email'):
+        for row in prefix_matches(field, prefix, limit):
+            found.setdefault(row['id'], row)
+    by_id = departments()
+    results = []
+    for row in sorted(found.values(), key=lambda row: (row['nom'].lower(), row['id']))[:limit]:
+        department = by_id.get(row['department_id'])
+        results.append({
+            'id': row['id'],
+            'nom': row['nom'],
+            'email': row['email'],
+            'department': department.name if department else None,
+            'label': label(row['nom'], row['email']),
+        })
+    return results
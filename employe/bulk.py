@@ -0,0 +1,26 @@
+from django.db import connection
+
+
+def insert_rows(model, columns, rows, batch_size):
+    """INSERT brut par lots (executemany) de tuples dans l'ordre de ``columns`` ; renvoie le nombre de lignes.
+
+    Pour les gros volumes (paie, jeux de données) : instancier des centaines de milliers
+    d'objets ORM coûte plus cher que l'écriture elle-même. Ni signaux, ni valeurs par défaut.
+    """
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns)),
+    )
+    count = 0
+    with connection.cursor() as cursor:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
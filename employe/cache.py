@@ -0,0 +1,120 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Department, Employe
+
+# Cache des départements et des employés (listes de choix, objets par id).
+# Chaque clé embarque la version des modèles dont elle dépend : une écriture incrémente
+# la version (signaux, ou appel explicite sur les chemins en masse) et les anciennes
+# entrées, jamais relues, expirent d'elles-mêmes. Partagé entre processus avec DJANGO_CACHE_DIR.
+# Les présences et les congés ont aussi une version ('attendance', 'leave') : l'API s'en
+# sert comme validateurs HTTP, sans requête.
+VERSION_KEY = 'objcache:version:{}'
+CHANGED_KEY = 'objcache:changed:{}'
+
+
+def _ttl():
+    return getattr(settings, 'OBJECT_CACHE_TTL', 300)
+
+
+def _versions(names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Départ horodaté : une version évincée du cache ne peut pas retomber
+            # sur une valeur déjà utilisée (et donc sur des entrées périmées).
+            cache.add(key, time.time_ns() // 1000, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def versions(*names):
+    """Versions courantes des modèles : changent à chaque écriture (instantané de employe/analytics.py)."""
+    return tuple(_versions(names))
+
+
+def changed_at(*names):
+    """Instant (secondes epoch) de la dernière écriture sur ces modèles, ``None`` si inconnu."""
+    stamps = cache.get_many([CHANGED_KEY.format(name) for name in names]).values()
+    return max(stamps, default=None)
+
+
+def invalidate(*names):
+    """Passe à la version suivante pour chaque modèle (``'department'``, ``'employe'``,
+    ``'attendance'``, ``'leave'``).
+
+    Une seconde fois au commit : une lecture concurrente faite entre-temps a pu
+    remettre l'ancien état en cache sous la nouvelle version.
+    """
+    _bump(names)
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    now = time.time()
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, None)
+        cache.set(CHANGED_KEY.format(name), now, None)
+
+
+def _cached(name, depends, build):
+    versions = _versions(depends)
+    key = f"objcache:{name}:" + ':'.join(f'{dep}{version}' for dep, version in zip(depends, versions))
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, _ttl())
+    return value
+
+
+def departments():
+    """Tous les départements par id, dans l'ordre alphabétique (table petite et stable)."""
+    return _cached('departments', ('department',), lambda: {
+        department.pk: department for department in Department.objects.order_by('name')
+    })
+
+
+def get_department(pk):
+    return departments().get(pk)
+
+
+def department_choices():
+    return [(pk, department.name) for pk, department in departments().items()]
+
+
+def department_list():
+    """Départements avec leur nombre d'employés (page ``departements/``)."""
+    return _cached('department_list', ('department', 'employe'), lambda: list(
+        Department.objects.annotate(employee_count=Count('employees')).order_by('name')
+    ))
+
+
+def attach_departments(employes):
+    """Renseigne ``employe.department`` depuis le cache plutôt que par jointure."""
+    by_id = departments()
+    for employe in employes:
+        department = by_id.get(employe.department_id)
+        if department is not None:
+            Employe.department.field.set_cached_value(employe, department)
+    return employes
+
+
+def get_employe(pk):
+    """Employé par id, ``None`` s'il n'existe pas (les absences ne sont pas mises en cache)."""
+    (version,) = _versions(('employe',))
+    key = f'objcache:employe:{pk}:employe{version}'
+    employe = cache.get(key)
+    if employe is None:
+        employe = Employe.objects.filter(pk=pk).first()
+        if employe is not None:
+            cache.set(key, employe, _ttl())
+    return employe
@@ -0,0 +1,303 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import archived_keys
+from .audit import record_created, record_updates
+from .cache import invalidate
+from .models import Attendance, Employe, audit_state, compute_worked_hours
+from .kpis import invalidate_kpis
+from .rollups import refresh_attendance_keys
+
+# Résultats d'un pointage
+RECORDED = 'recorded'
+ALREADY_DONE = 'already_done'
+NO_RECORD = 'no_record'
+
+
+def _table():
+    return connection.ops.quote_name(Attendance._meta.db_table)
+
+
+def _hours_since_check_in_sql():
+    # Heures entre le paramètre et check_in, arrondies au centième, calculées par la base
+    if connection.vendor == 'postgresql':
+        return "ROUND(CAST(EXTRACT(EPOCH FROM (%s - check_in)) / 3600.0 AS numeric), 2)"
+    # SQLite : écart en millisecondes entières, puis arrondi au centième « half up » en
+    # arithmétique entière pour retomber exactement sur le résultat de Attendance.save
+    elapsed_ms = "CAST(ROUND((julianday(%s) - julianday(check_in)) * 86400000) AS INTEGER)"
+    return f"(({elapsed_ms} * 100 + 1800000) / 3600000) / 100.0"
+
+
+def _returning(sql, *columns):
+    # valeurs de la ligne écrite lues dans la même instruction (SQLite >= 3.35, PostgreSQL)
+    if connection.features.can_return_columns_from_insert:
+        return f"{sql} RETURNING {', '.join(columns)}"
+    return sql
+
+
+def _written(cursor, employee_id, work_date, *columns):
+    """Colonnes de la ligne insérée ou modifiée par la dernière instruction ; None si aucune."""
+    if connection.features.can_return_columns_from_insert:
+        return cursor.fetchone()
+    if cursor.rowcount != 1:
+        return None
+    return Attendance.objects.filter(employee_id=employee_id, work_date=work_date).values_list(*columns).get()
+
+
+def clock_in(employee_id, when=None):
+    """Pointage d'entrée : INSERT ... ON CONFLICT DO NOTHING, ou UPDATE conditionnel si la
+    ligne du jour existe déjà sans entrée.
+
+    Une entrée déjà enregistrée n'est jamais écrasée, même si plusieurs requêtes
+    arrivent en même temps.
+    """
+    when = when or timezone.now()
+    work_date = timezone.localdate(when)
+    table = _table()
+    date_value = connection.ops.adapt_datefield_value(work_date)
+    check_in = connection.ops.adapt_datetimefield_value(when)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    # agrégats mensuels dans la même transaction : elle commence par l'écriture, le verrou
+    # est pris d'emblée (et attendu) au lieu d'être promu après lecture, ce qui échoue
+    # aussitôt sous SQLite ; un échec annule aussi le pointage
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_returning(f"""
+                INSERT INTO {table} (employee_id, work_date, check_in, worked_hours, updated_at)
+                VALUES (%s, %s, %s, 0, %s)
+                ON CONFLICT (employee_id, work_date) DO NOTHING
+            """, 'id'), [employee_id, date_value, check_in, now])
+            created = _written(cursor, employee_id, work_date, 'id')
+            updated = None
+            if created is None:
+                # ligne du jour déjà là (saisie sans entrée) : l'entrée n'est posée que si elle manque
+                cursor.execute(_returning(f"""
+                    UPDATE {table} SET check_in = %s, updated_at = %s
+                    WHERE employee_id = %s AND work_date = %s AND check_in IS NULL
+                """, 'id'), [check_in, now, employee_id, date_value])
+                updated = _written(cursor, employee_id, work_date, 'id')
+        if created is None and updated is None:
+            return ALREADY_DONE
+        if created is not None:
+            record_created([Attendance(id=created[0], employee_id=employee_id, work_date=work_date, check_in=when)])
+        else:
+            # seules les lignes sans entrée sont modifiées : l'état précédent est connu
+            record_updates(Attendance, {updated[0]: {'check_in': (None, when)}})
+        invalidate_kpis()
+        invalidate('attendance')
+        refresh_attendance_keys({(employee_id, work_date)})
+    return RECORDED
+
+
+def clock_out(employee_id, when=None):
+    """Pointage de sortie par un UPDATE conditionnel ; les heures sont calculées en SQL."""
+    when = when or timezone.now()
+    work_date = timezone.localdate(when)
+    check_out = connection.ops.adapt_datetimefield_value(when)
+    sql = f"""
+        UPDATE {_table()}
+        SET check_out = %s,
+            worked_hours = CASE WHEN %s > check_in THEN {_hours_since_check_in_sql()} ELSE worked_hours END,
+            updated_at = %s
+        WHERE employee_id = %s AND work_date = %s AND check_out IS NULL
+    """
+    # comme clock_in : écriture d'abord, agrégats dans la même transaction
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_returning(sql, 'id', 'worked_hours'), [
+                check_out, check_out, check_out,
+                connection.ops.adapt_datetimefield_value(timezone.now()),
+                employee_id, connection.ops.adapt_datefield_value(work_date),
+            ])
+            written = _written(cursor, employee_id, work_date, 'id', 'worked_hours')
+        if written is not None:
+            pk, hours = written
+            # heures précédentes inconnues sans relecture : None, comme pour une instance jamais chargée
+            record_updates(Attendance, {pk: {
+                'check_out': (None, when),
+                'worked_hours': (None, Decimal(str(hours)).quantize(Decimal('0.01'))),
+            }})
+            invalidate_kpis()
+            invalidate('attendance')
+            refresh_attendance_keys({(employee_id, work_date)})
+            return RECORDED
+    # Chemin d'échec uniquement : distinguer « déjà sorti » de « pas de pointage »
+    if Attendance.objects.filter(employee_id=employee_id, work_date=work_date).exists():
+        return ALREADY_DONE
+    return NO_RECORD
+
+
+# Nombre maximal d'événements acceptés par lot
+BATCH_MAX_EVENTS = 1000
+INVALID = 'invalid'
+UNKNOWN_EMPLOYEE = 'unknown_employee'
+
+
+def parse_event(raw):
+    """Valide un événement de badgeuse ; renvoie (employee_id, horodatage, sens) ou lève ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("événement invalide")
+    employee_id = raw.get('employee_id')
+    if isinstance(employee_id, bool) or not isinstance(employee_id, int):
+        raise ValueError("employee_id doit être un entier")
+    direction = raw.get('direction')
+    if direction not in ('in', 'out'):
+        raise ValueError("direction doit valoir 'in' ou 'out'")
+    when = parse_datetime(raw.get('timestamp') or '') if isinstance(raw.get('timestamp'), str) else None
+    if when is None:
+        raise ValueError("timestamp doit être une date ISO 8601")
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return employee_id, when, direction
+
+
+# Lignes par instruction d'upsert (5 paramètres chacune)
+UPSERT_CHUNK = 500
+
+
+def _upsert_rows(rows):
+    """Écrit les lignes d'un lot ({(employee_id, work_date): Attendance}) ; renvoie {clé: id} des lignes écrites.
+
+    Comme clock_in, la mise à jour est conditionnelle : une ligne existante n'est
+    modifiée que si ses pointages sont encore ceux lus par le lot (vides ou identiques).
+    select_for_update ne verrouille rien sous SQLite : sans cette garde, une entrée ou
+    une sortie enregistrée entre la lecture et l'écriture serait écrasée.
+    """
+    table = _table()
+    ops = connection.ops
+    now = ops.adapt_datetimefield_value(timezone.now())
+    # work_date en texte : RETURNING renvoie la valeur brute sous SQLite
+    written = {}
+    items = list(rows.items())
+    for start in range(0, len(items), UPSERT_CHUNK):
+        chunk = items[start:start + UPSERT_CHUNK]
+        sql = f"""
+            INSERT INTO {table} (employee_id, work_date, check_in, check_out, worked_hours, updated_at)
+            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))}
+            ON CONFLICT (employee_id, work_date) DO UPDATE SET
+                check_in = excluded.check_in, check_out = excluded.check_out,
+                worked_hours = excluded.worked_hours, updated_at = excluded.updated_at
+            WHERE ({table}.check_in IS NULL OR {table}.check_in = excluded.check_in)
+              AND ({table}.check_out IS NULL OR {table}.check_out = excluded.check_out)
+        """
+        params = []
+        for (employee_id, work_date), row in chunk:
+            params += [
+                employee_id,
+                ops.adapt_datefield_value(work_date),
+                ops.adapt_datetimefield_value(row.check_in),
+                ops.adapt_datetimefield_value(row.check_out),
+                ops.adapt_decimalfield_value(row.worked_hours),
+                now,
+            ]
+        with connection.cursor() as cursor:
+            cursor.execute(_returning(sql, 'id', 'employee_id', 'work_date'), params)
+            if connection.features.can_return_columns_from_insert:
+                written.update(((employee_id, str(work_date)), pk) for pk, employee_id, work_date in cursor.fetchall())
+    if not connection.features.can_return_columns_from_insert:
+        # sans RETURNING : relire les lignes pour savoir lesquelles ont été écrites
+        stored = Attendance.objects.filter(
+            employee_id__in={employee_id for employee_id, _ in rows},
+            work_date__in={work_date for _, work_date in rows},
+        ).values_list('id', 'employee_id', 'work_date', 'check_in', 'check_out')
+        for pk, employee_id, work_date, check_in, check_out in stored:
+            row = rows.get((employee_id, work_date))
+            if row is not None and (row.check_in, row.check_out) == (check_in, check_out):
+                written[(employee_id, str(work_date))] = pk
+    return {key: written[(key[0], str(key[1]))] for key in rows if (key[0], str(key[1])) in written}
+
+
+def _audit_rows(rows, ids):
+    # lignes neuves : créations ; lignes relues par le lot : différences avec leur état chargé
+    created, changes = [], {}
+    for key, row in rows.items():
+        if row.pk is None:
+            row.pk = ids[key]
+            created.append(row)
+            continue
+        before = row._audit_state
+        changes[row.pk] = {
+            name: (before.get(name), value) for name, value in audit_state(row).items() if before.get(name) != value
+        }
+    record_created(created)
+    record_updates(Attendance, changes)
+
+
+def apply_batch(raw_events):
+    """Applique un lot d'événements de badgeuse dans une seule transaction.
+
+    Les événements sont rejoués dans l'ordre chronologique avec les mêmes règles que
+    clock_in/clock_out (le premier pointage l'emporte) ; les lignes touchées sont
+    écrites par upsert conditionnel (_upsert_rows). Renvoie un résultat par événement,
+    dans l'ordre d'envoi.
+    """
+    results = [None] * len(raw_events)
+    events = []
+    for index, raw in enumerate(raw_events):
+        try:
+            events.append((index, *parse_event(raw)))
+        except ValueError as exc:
+            results[index] = {'status': INVALID, 'error': str(exc)}
+    events.sort(key=lambda event: event[2])
+
+    with transaction.atomic():
+        employee_ids = {employee_id for _, employee_id, _, _ in events}
+        known = set(Employe.objects.filter(id__in=employee_ids).values_list('id', flat=True))
+        keys = {(employee_id, timezone.localdate(when)) for _, employee_id, when, _ in events if employee_id in known}
+        closed = archived_keys(keys)
+        rows = {}
+        if keys:
+            existing = Attendance.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in keys},
+                work_date__in={work_date for _, work_date in keys},
+            )
+            rows = {(r.employee_id, r.work_date): r for r in existing if (r.employee_id, r.work_date) in keys}
+
+        touched, recorded = {}, defaultdict(list)
+        for index, employee_id, when, direction in events:
+            if employee_id not in known:
+                results[index] = {'status': UNKNOWN_EMPLOYEE}
+                continue
+            key = (employee_id, timezone.localdate(when))
+            if key in closed:
+                results[index] = {'status': INVALID, 'error': "journée archivée (période close)"}
+                continue
+            row = rows.get(key)
+            if direction == 'in':
+                if row is None:
+                    row = rows[key] = Attendance(employee_id=employee_id, work_date=key[1])
+                if row.check_in:
+                    results[index] = {'status': ALREADY_DONE}
+                    continue
+                row.check_in = when
+            else:
+                if row is None:
+                    results[index] = {'status': NO_RECORD}
+                    continue
+                if row.check_out:
+                    results[index] = {'status': ALREADY_DONE}
+                    continue
+                row.check_out = when
+            hours = compute_worked_hours(row.check_in, row.check_out)
+            if hours is not None:
+                row.worked_hours = hours
+            touched[key] = row
+            recorded[key].append(index)
+            results[index] = {'status': RECORDED}
+
+        ids = _upsert_rows(touched)
+        # pointages enregistrés entre-temps par une autre requête : ils l'emportent
+        for key in [key for key in touched if key not in ids]:
+            del touched[key]
+            for index in recorded[key]:
+                results[index] = {'status': ALREADY_DONE}
+        _audit_rows(touched, ids)
+        if touched:
+            invalidate_kpis()
+            invalidate('attendance')
+            refresh_attendance_keys(touched.keys())
+    return results
@@ -0,0 +1,96 @@
+import csv
+import datetime
+import json
+from decimal import Decimal
+from operator import itemgetter
+
+from .archive import merged, partitions
+from .models import LeaveRequest
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (champ ORM, en-tête) : lu avec values_list, sans instancier de modèles
+ATTENDANCE_COLUMNS = (
+    ('work_date', 'date'),
+    ('employee_id', 'employe_id'),
+    ('employee__nom', 'employe'),
+    ('employee__department__name', 'departement'),
+    ('check_in', 'arrivee'),
+    ('check_out', 'depart'),
+    ('worked_hours', 'heures'),
+)
+
+LEAVE_COLUMNS = (
+    ('id', 'id'),
+    ('employee_id', 'employe_id'),
+    ('employee__nom', 'employe'),
+    ('employee__department__name', 'departement'),
+    ('type', 'type'),
+    ('start_date', 'debut'),
+    ('end_date', 'fin'),
+    ('status', 'statut'),
+    ('approved_by', 'valide_par'),
+    ('created_at', 'cree_le'),
+)
+
+
+class Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def attendance_rows(start=None, end=None, department=None, employee=None):
+    lookups = {}
+    if start:
+        lookups['work_date__gte'] = start
+    if end:
+        lookups['work_date__lte'] = end
+    if department:
+        lookups['employee__department_id'] = department
+    if employee:
+        lookups['employee_id'] = employee
+    fields = [field for field, _ in ATTENDANCE_COLUMNS]
+    # archive et table chaude, chacune lue dans l'ordre de ses index puis fusionnées par date
+    return merged((
+        model.objects.filter(**lookups).order_by('work_date', 'id').values_list(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for model in partitions(start)
+    ), itemgetter(0))
+
+
+def leave_rows(start=None, end=None, department=None, employee=None):
+    qs = LeaveRequest.objects.all()
+    # Congés qui chevauchent la période demandée
+    if start:
+        qs = qs.filter(end_date__gte=start)
+    if end:
+        qs = qs.filter(start_date__lte=end)
+    if department:
+        qs = qs.filter(employee__department_id=department)
+    if employee:
+        qs = qs.filter(employee_id=employee)
+    fields = [field for field, _ in LEAVE_COLUMNS]
+    return qs.order_by('start_date', 'id').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for _, header in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(columns, rows):
+    headers = [header for _, header in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=_json_default, ensure_ascii=False) + '\n'
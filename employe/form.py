@@ -1,5 +1,79 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
 from .models import Employe, Department, Attendance, LeaveRequest
+from .leave_coverage import overlapping
+from . import cache
+from .archive import archived_keys
+from .autocomplete import label
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from self.field.cached_choices()
+
+    def __len__(self):
+        return len(self.field.cached_choices()) + (self.field.empty_label is not None)
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """Options et validation servies par employe.cache : aucune requête une fois le cache chaud.
+
+    ``choices_fn()`` renvoie les options [(id, libellé)] ; ``lookup_fn(pk)`` l'objet ou
+    None. Sans ``choices_fn``, aucune option n'est listée (widget à suggestions).
+    """
+    iterator = CachedChoiceIterator
+
+    def __init__(self, queryset, *, lookup_fn, choices_fn=None, **kwargs):
+        self.lookup_fn = lookup_fn
+        self.choices_fn = choices_fn
+        super().__init__(queryset, **kwargs)
+
+    def cached_choices(self):
+        return self.choices_fn() if self.choices_fn is not None else []
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.lookup_fn(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+        return obj
+
+
+class DepartmentChoiceField(CachedModelChoiceField):
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, choices_fn=cache.department_choices, lookup_fn=cache.get_department, **kwargs)
+
+
+class EmployePicker(forms.Widget):
+    # Champ texte avec suggestions (employes/autocomplete/) : la page ne contient que
+    # l'employé sélectionné, pas la liste complète
+    template_name = 'employe/widgets/employe_picker.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        selected = cache.get_employe(int(value)) if str(value or '').isdigit() else None
+        context['widget']['label'] = label(selected.nom, selected.email) if selected else ''
+        context['widget']['url'] = reverse('employe_autocomplete')
+        return context
+
+
+class EmployeChoiceField(CachedModelChoiceField):
+    # le sélecteur ne liste jamais les employés : seule la validation passe par le cache
+    widget = EmployePicker
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, lookup_fn=cache.get_employe, **kwargs)
 
 
 class EmployeForm(forms.ModelForm):
@@ -20,6 +94,7 @@ class EmployeForm(forms.ModelForm):
     class Meta:
         model = Employe
         fields = ['nom', 'email', 'poste', 'salaire', 'department', 'hire_date']
+        field_classes = {'department': DepartmentChoiceField}
         labels = {
             'nom': 'Nom',
             'email': 'Email',
@@ -99,6 +174,47 @@ class EmployeForm(forms.ModelForm):
         return salaire
 
 
+class EmployeImportForm(EmployeForm):
+    # Validation d'une ligne d'import : mêmes règles que EmployeForm,
+    # le département est résolu à part via une table de correspondance
+    class Meta(EmployeForm.Meta):
+        fields = ['nom', 'email', 'poste', 'salaire', 'hire_date']
+
+
+class ImportEmployesForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier (CSV ou XLSX)",
+        widget=forms.ClearableFileInput(attrs={'class': 'input w-full', 'accept': '.csv,.xlsx'}),
+    )
+
+    def clean_fichier(self):
+        fichier = self.cleaned_data['fichier']
+        if not fichier.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Format non supporté: utilisez un fichier .csv ou .xlsx.")
+        return fichier
+
+
+class ExportForm(forms.Form):
+    FORMATS = (
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    )
+
+    format = forms.ChoiceField(choices=FORMATS, required=False)
+    start = forms.DateField(required=False, label='Du')
+    end = forms.DateField(required=False, label='Au')
+    department = forms.IntegerField(required=False, min_value=1, label='Département')
+    employee = forms.IntegerField(required=False, min_value=1, label='Employé')
+
+    def clean(self):
+        cleaned = super().clean()
+        start = cleaned.get('start')
+        end = cleaned.get('end')
+        if start and end and end < start:
+            self.add_error('end', "La date de fin doit être postérieure à la date de début.")
+        return cleaned
+
+
 class DepartmentForm(forms.ModelForm):
     class Meta:
         model = Department
@@ -113,6 +229,7 @@ class AttendanceForm(forms.ModelForm):
     class Meta:
         model = Attendance
         fields = ['employee', 'work_date', 'check_in', 'check_out']
+        field_classes = {'employee': EmployeChoiceField}
         labels = {
             'employee': 'Employé',
             'work_date': 'Date',
@@ -120,11 +237,21 @@ class AttendanceForm(forms.ModelForm):
             'check_out': 'Heure de départ',
         }
 
+    def clean(self):
+        cleaned = super().clean()
+        employee = cleaned.get('employee')
+        work_date = cleaned.get('work_date')
+        # une journée archivée ne peut pas revenir en double dans la table des présences
+        if employee and work_date and archived_keys({(employee.pk, work_date)}):
+            self.add_error('work_date', "Cette journée est archivée (période close) : elle ne peut plus être saisie.")
+        return cleaned
+
 
 class LeaveRequestForm(forms.ModelForm):
     class Meta:
         model = LeaveRequest
         fields = ['employee', 'type', 'start_date', 'end_date', 'reason']
+        field_classes = {'employee': EmployeChoiceField}
         labels = {
             'employee': 'Employé',
             'type': 'Type de congé',
@@ -133,7 +260,7 @@ class LeaveRequestForm(forms.ModelForm):
             'reason': 'Motif',
         }
         widgets = {
-            'employee': forms.Select(attrs={'class': 'input w-full'}),
+            'employee': EmployePicker(attrs={'class': 'input w-full'}),
             'type': forms.Select(attrs={'class': 'input w-full'}),
             'start_date': forms.DateInput(attrs={'type': 'date', 'class': 'input w-full'}),
             'end_date': forms.DateInput(attrs={'type': 'date', 'class': 'input w-full'}),
@@ -146,6 +273,14 @@ class LeaveRequestForm(forms.ModelForm):
         end = cleaned.get('end_date')
         if start and end and end < start:
             self.add_error('end_date', "La date de fin doit être postérieure à la date de début.")
+        employee = cleaned.get('employee')
+        if employee and start and end and end >= start:
+            clash = overlapping(employee.pk, start, end, exclude_id=self.instance.pk).order_by('start_date').first()
+            if clash:
+                raise forms.ValidationError(
+                    f"{employee.nom} a déjà une demande du {clash.start_date:%d/%m/%Y} au "
+                    f"{clash.end_date:%d/%m/%Y} ({clash.get_status_display().lower()})."
+                )
         return cleaned
         widgets = {
             'employee': forms.Select(attrs={'class': 'input w-full'}),
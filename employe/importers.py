@@ -0,0 +1,166 @@
+import csv
+import datetime
+import io
+from itertools import chain
+
+from django.db import transaction
+
+from .form import EmployeImportForm
+from .cache import department_choices, invalidate
+from .audit import record_created
+from .kpis import invalidate_kpis
+from .search import index_employes
+from .models import Employe
+
+try:
+    import openpyxl
+except Exception:  # openpyxl not installed: XLSX import unavailable
+    openpyxl = None
+
+
+# En-têtes acceptés (minuscules) -> champ du formulaire
+COLONNES = {
+    'nom': 'nom',
+    'name': 'nom',
+    'email': 'email',
+    'poste': 'poste',
+    'salaire': 'salaire',
+    'salary': 'salaire',
+    'departement': 'department',
+    'département': 'department',
+    'department': 'department',
+    'date_embauche': 'hire_date',
+    "date d'embauche": 'hire_date',
+    'hire_date': 'hire_date',
+}
+
+
+class ImportFileError(Exception):
+    # report : bilan de l'import interrompu (lots déjà validés), renseigné par import_employes
+    report = None
+
+
+class ImportReport:
+    def __init__(self, max_errors=1000):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        # On ne garde qu'un nombre borné de messages pour que la mémoire reste constante
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def _normalise_header(header):
+    return [COLONNES.get((h or '').strip().lower(), (h or '').strip().lower()) for h in header]
+
+
+def _iter_csv(stream):
+    try:
+        first = stream.readline()
+        if not first:
+            return
+        delimiter = ';' if first.count(';') > first.count(',') else ','
+        reader = csv.reader(chain([first], stream), delimiter=delimiter)
+        header = _normalise_header(next(reader))
+        for line, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield line, dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise ImportFileError("Encodage invalide: le fichier CSV doit être en UTF-8.")
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return '' if value is None else value
+
+
+def _iter_xlsx(fileobj):
+    if openpyxl is None:
+        raise ImportFileError("L'import XLSX nécessite le paquet openpyxl.")
+    # read_only : les lignes sont lues au fil de l'eau, sans charger la feuille
+    try:
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError("Fichier XLSX illisible.")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalise_header(next(rows, None) or [])
+        for line, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == '' for v in values):
+                continue
+            yield line, {k: _cell(v) for k, v in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    """Produit ``(numéro de ligne, données)`` pour chaque ligne du fichier, en flux."""
+    if filename.lower().endswith('.xlsx'):
+        return _iter_xlsx(fileobj)
+    if isinstance(fileobj, io.TextIOBase):
+        return _iter_csv(fileobj)
+    return _iter_csv(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+
+
+def _error_text(form):
+    return '; '.join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items())
+
+
+def import_employes(rows, batch_size=500, dry_run=False, max_errors=1000):
+    """Valide et insère les employés par lots de ``batch_size`` avec ``bulk_create``.
+
+    Chaque lot est validé dans sa propre transaction : si la lecture du fichier échoue en
+    cours de route (ImportFileError, encodage invalide), les lots déjà insérés restent en
+    base et ``exc.report.created`` indique combien.
+    """
+    report = ImportReport(max_errors)
+    # Une seule requête pour résoudre tous les noms de départements
+    departements = {name.strip().lower(): pk for pk, name in department_choices()}
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            with transaction.atomic():
+                Employe.objects.bulk_create(batch, batch_size=batch_size)
+                index_employes(batch)
+                record_created(batch)
+        report.created += len(batch)
+        batch.clear()
+
+    try:
+        for line, data in rows:
+            form = EmployeImportForm(data=data)
+            nom_departement = str(data.get('department') or '').strip()
+            department_id = departements.get(nom_departement.lower())
+            if not form.is_valid():
+                report.add_error(line, _error_text(form))
+                continue
+            if not nom_departement:
+                report.add_error(line, "department: Le département est obligatoire.")
+                continue
+            if department_id is None:
+                report.add_error(line, f"department: Département inconnu « {nom_departement} ».")
+                continue
+            employe = form.instance
+            employe.department_id = department_id
+            batch.append(employe)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except ImportFileError as exc:
+        # le lot en cours est abandonné, les précédents sont validés
+        batch.clear()
+        exc.report = report
+        raise
+    finally:
+        if report.created and not dry_run:
+            # bulk_create n'envoie pas de signaux
+            invalidate_kpis()
+            invalidate('employe')
+    return report
@@ -0,0 +1,128 @@
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .aio import gather_queries
+from .models import Employe, Department, Attendance, LeaveRequest
+
+KPI_CACHE_KEY = 'kpis:snapshot'
+# Incrémenté à chaque invalidation : le tableau des présences en direct (employe/live.py)
+# ne relit la base que lorsqu'il change
+KPI_VERSION_KEY = 'kpis:version'
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _hours(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _totals(day):
+    """Compteurs et heures du jour en un seul aller-retour SQL."""
+    employes, departements = _table(Employe), _table(Department)
+    presences, conges = _table(Attendance), _table(LeaveRequest)
+    # Sous-requêtes scalaires : une seule requête pour toutes les tables
+    sql = f"""
+        SELECT
+            (SELECT COUNT(*) FROM {employes}),
+            (SELECT COUNT(*) FROM {departements}),
+            (SELECT COUNT(*) FROM {conges} WHERE status = %s),
+            (SELECT COUNT(DISTINCT employee_id) FROM {presences}
+                WHERE work_date = %s AND check_in IS NOT NULL),
+            (SELECT AVG(worked_hours) FROM {presences} WHERE work_date = %s),
+            (SELECT SUM(worked_hours) FROM {presences} WHERE work_date = %s)
+    """
+    work_date = connection.ops.adapt_datefield_value(day)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ['pending', work_date, work_date, work_date])
+        return cursor.fetchone()
+
+
+def _recent_employees():
+    return list(Employe.objects.order_by('-id').values('id', 'nom', 'email', 'poste')[:5])
+
+
+def _snapshot(day, totals, recent_employees):
+    total_employees, total_departments, pending_leaves, present_count, avg_hours, total_hours = totals
+    attendance_rate = (present_count / total_employees * 100) if total_employees else 0
+    return {
+        'day': day,
+        'total_employees': total_employees,
+        'total_departments': total_departments,
+        'pending_leaves': pending_leaves,
+        'present_count': present_count,
+        'attendance_rate': round(attendance_rate, 2),
+        'avg_hours': _hours(avg_hours),
+        'total_hours': _hours(total_hours),
+        'recent_employees': recent_employees,
+    }
+
+
+def compute_kpis(day=None):
+    """Calcule tous les indicateurs du tableau de bord."""
+    day = day or timezone.localdate()
+    return _snapshot(day, _totals(day), _recent_employees())
+
+
+async def acompute_kpis(day=None):
+    """Comme ``compute_kpis``, les deux requêtes indépendantes étant lancées en parallèle."""
+    day = day or timezone.localdate()
+    totals, recent_employees = await gather_queries((_totals, day), (_recent_employees,))
+    return _snapshot(day, totals, recent_employees)
+
+
+def get_kpis():
+    """Indicateurs du jour, servis depuis le cache tant qu'aucune donnée n'a changé."""
+    today = timezone.localdate()
+    snapshot = cache.get(KPI_CACHE_KEY)
+    if snapshot is None or snapshot['day'] != today:
+        snapshot = compute_kpis(today)
+        cache.set(KPI_CACHE_KEY, snapshot, getattr(settings, 'KPI_CACHE_TTL', 30))
+    return snapshot
+
+
+async def aget_kpis():
+    today = timezone.localdate()
+    snapshot = await cache.aget(KPI_CACHE_KEY)
+    if snapshot is None or snapshot['day'] != today:
+        snapshot = await acompute_kpis(today)
+        await cache.aset(KPI_CACHE_KEY, snapshot, getattr(settings, 'KPI_CACHE_TTL', 30))
+    return snapshot
+
+
+def kpi_version():
+    version = cache.get(KPI_VERSION_KEY)
+    if version is None:
+        # départ horodaté, comme les versions de employe/cache.py
+        cache.add(KPI_VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(KPI_VERSION_KEY)
+    return version
+
+
+async def akpi_version():
+    version = await cache.aget(KPI_VERSION_KEY)
+    if version is None:
+        await cache.aadd(KPI_VERSION_KEY, time.time_ns() // 1000, None)
+        version = await cache.aget(KPI_VERSION_KEY)
+    return version
+
+
+def _changed():
+    cache.delete(KPI_CACHE_KEY)
+    try:
+        cache.incr(KPI_VERSION_KEY)
+    except ValueError:
+        cache.add(KPI_VERSION_KEY, time.time_ns() // 1000, None)
+
+
+def invalidate_kpis():
+    """Indicateurs à recalculer ; une seconde fois au commit, une lecture faite entre-temps
+    ayant pu remettre en cache (ou diffuser en direct) l'état d'avant."""
+    _changed()
+    transaction.on_commit(_changed)
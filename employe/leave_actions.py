@@ -0,0 +1,104 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .audit import record_updates
+from .cache import invalidate
+from .kpis import invalidate_kpis
+from .leave_ledger import post_entries
+from .models import LeaveRequest
+
+# Action -> statut final ; seules les demandes en attente peuvent être traitées
+DECISIONS = {
+    'approve': 'approved',
+    'reject': 'rejected',
+}
+
+# Nombre maximal de demandes par lot (une variable SQL par id)
+BULK_MAX_IDS = 1000
+
+
+def _without_overlaps(candidates):
+    """Écarte les demandes qui chevaucheraient un congé approuvé du même employé.
+
+    Les demandes du lot sont prises par date de début : la première l'emporte.
+    Une seule requête pour les congés approuvés de tous les employés concernés.
+    """
+    approved = defaultdict(list)
+    if candidates:
+        for employee_id, start, end in LeaveRequest.objects.filter(
+            status='approved',
+            employee_id__in={c[1] for c in candidates},
+            end_date__gte=min(c[3] for c in candidates),
+            start_date__lte=max(c[4] for c in candidates),
+        ).values_list('employee_id', 'start_date', 'end_date'):
+            approved[employee_id].append((start, end))
+    accepted, clashing = [], []
+    for candidate in sorted(candidates, key=lambda c: (c[3], c[0])):
+        pk, employee_id, _, start, end = candidate
+        if any(start <= other_end and other_start <= end for other_start, other_end in approved[employee_id]):
+            clashing.append(pk)
+        else:
+            approved[employee_id].append((start, end))
+            accepted.append(candidate)
+    return accepted, clashing
+
+
+def _update_pending(ids, status, username):
+    """Un seul ``UPDATE ... WHERE id IN (...) AND status = 'pending'`` ; renvoie les ids modifiés.
+
+    RETURNING (SQLite >= 3.35, PostgreSQL) donne exactement les lignes touchées : une
+    demande traitée entre-temps par quelqu'un d'autre est signalée, pas écrasée.
+    """
+    if not ids:
+        return set()
+    table = connection.ops.quote_name(LeaveRequest._meta.db_table)
+    sql = f"""
+        UPDATE {table} SET status = %s, approved_by = %s, updated_at = %s
+        WHERE id IN ({', '.join(['%s'] * len(ids))}) AND status = 'pending'
+        RETURNING id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [status, username, connection.ops.adapt_datetimefield_value(timezone.now()), *ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def decide(ids, action, username):
+    """Approuve ou rejette un lot de demandes en attente.
+
+    Renvoie ``{'updated': [...], 'skipped': [...], 'overlapping': [...]}`` : les ids
+    traités, ceux ignorés parce qu'ils n'étaient plus en attente (ou inexistants) et,
+    pour une approbation, ceux qui chevauchent un congé déjà approuvé.
+    """
+    status = DECISIONS[action]
+    ids = sorted(set(ids))
+    clashing = []
+    with transaction.atomic():
+        if status == 'approved':
+            candidates, clashing = _without_overlaps(list(
+                LeaveRequest.objects.filter(id__in=ids, status='pending')
+                .values_list('id', 'employee_id', 'type', 'start_date', 'end_date')
+            ))
+            updated = _update_pending([c[0] for c in candidates], status, username)
+            # UPDATE sans signaux : débits passés ici, comme pour une approbation unitaire
+            post_entries(
+                (employee_id, type, 'debit', -Decimal((end - start).days + 1), pk)
+                for pk, employee_id, type, start, end in candidates
+                if pk in updated
+            )
+        else:
+            updated = _update_pending(ids, status, username)
+        # seules les demandes en attente (sans valideur) sont modifiées : l'état précédent est connu
+        record_updates(LeaveRequest, {
+            pk: {'status': ('pending', status), 'approved_by': ('', username)} for pk in updated
+        })
+    if updated:
+        invalidate_kpis()
+        invalidate('leave')
+    return {
+        'updated': sorted(updated),
+        'skipped': sorted(set(ids) - updated - set(clashing)),
+        'overlapping': sorted(clashing),
+    }
@@ -0,0 +1,133 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Employe, LeaveRequest
+
+# Demandes qui occupent des dates : une nouvelle demande ne peut pas les chevaucher
+ACTIVE_STATUSES = ('pending', 'approved')
+
+
+def min_coverage():
+    # Part minimale de l'effectif d'un département qui doit rester présente
+    return float(getattr(settings, 'LEAVE_MIN_COVERAGE', 0.5))
+
+
+def overlapping(employee_id, start, end, statuses=ACTIVE_STATUSES, exclude_id=None):
+    """Demandes de l'employé qui chevauchent [start, end] (index leave_employee_range_idx)."""
+    qs = LeaveRequest.objects.filter(
+        employee_id=employee_id, end_date__gte=start, start_date__lte=end, status__in=statuses,
+    )
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs
+
+
+def who_is_off(department_id, start, end):
+    """Congés approuvés des membres du département qui chevauchent [start, end].
+
+    Une recherche d'index par membre (département -> employés, puis employé + date de
+    fin -> demandes) : le coût suit le nombre de congés trouvés, pas l'historique.
+    """
+    return (
+        LeaveRequest.objects
+        .filter(employee__department_id=department_id, status='approved', end_date__gte=start, start_date__lte=end)
+        .values_list('employee_id', 'employee__nom', 'start_date', 'end_date')
+        .order_by('start_date', 'employee__nom')
+    )
+
+
+def _merge(intervals):
+    # Union des intervalles d'un même employé : deux demandes ne le comptent pas deux fois
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def peak_absences(intervals, start, end):
+    """Balayage : nombre maximal d'employés absents le même jour et premier jour concerné.
+
+    ``intervals`` : (employee_id, début, fin), bornés ici à [start, end].
+    """
+    per_employee = defaultdict(list)
+    for employee_id, first, last in intervals:
+        first, last = max(first, start), min(last, end)
+        if first <= last:
+            per_employee[employee_id].append((first, last))
+    events = defaultdict(int)
+    for spans in per_employee.values():
+        for first, last in _merge(spans):
+            events[first] += 1
+            events[last + datetime.timedelta(days=1)] -= 1
+    peak, peak_day, current = 0, None, 0
+    for day in sorted(events):
+        current += events[day]
+        if current > peak:
+            peak, peak_day = current, day
+    return peak, peak_day
+
+
+def coverage(department_id, start, end, candidate=None):
+    """Effectif, pic d'absences et taux de présence minimal du département sur [start, end].
+
+    ``candidate`` (LeaveRequest) est compté comme approuvé : c'est la demande à
+    créer ou à approuver (déjà approuvée, la fusion par employé l'absorbe).
+    """
+    headcount = Employe.objects.filter(department_id=department_id).count()
+    intervals = [(employee_id, first, last) for employee_id, _, first, last in who_is_off(department_id, start, end)]
+    if candidate is not None:
+        intervals.append((candidate.employee_id, candidate.start_date, candidate.end_date))
+    peak, peak_day = peak_absences(intervals, start, end)
+    return {
+        'headcount': headcount,
+        'peak_absent': peak,
+        'peak_day': peak_day,
+        'present_ratio': (headcount - peak) / headcount if headcount else 1.0,
+    }
+
+
+def coverage_warning(leave):
+    """Message d'alerte si la demande fait passer la présence du département sous le seuil."""
+    department_id = Employe.objects.filter(pk=leave.employee_id).values_list('department_id', flat=True).first()
+    if department_id is None:
+        return None
+    return _warning(coverage(department_id, leave.start_date, leave.end_date, candidate=leave), "le département")
+
+
+def coverage_warnings(leave_ids):
+    """Alertes après une approbation groupée : une par département passé sous le seuil.
+
+    Un calcul par département, sur la période couverte par ses demandes (déjà approuvées,
+    donc comptées par ``who_is_off``).
+    """
+    spans = {}
+    rows = (
+        LeaveRequest.objects
+        .filter(pk__in=leave_ids, employee__department_id__isnull=False)
+        .values_list('employee__department_id', 'employee__department__name', 'start_date', 'end_date')
+    )
+    for department_id, name, start, end in rows:
+        _, first, last = spans.get(department_id, (name, start, end))
+        spans[department_id] = (name, min(first, start), max(last, end))
+    warnings = []
+    for department_id, (name, start, end) in sorted(spans.items(), key=lambda item: item[1]):
+        warning = _warning(coverage(department_id, start, end), f"le département {name}")
+        if warning:
+            warnings.append(warning)
+    return warnings
+
+
+def _warning(stats, label):
+    threshold = min_coverage()
+    if stats['present_ratio'] >= threshold:
+        return None
+    return (
+        f"Couverture insuffisante le {stats['peak_day']:%d/%m/%Y} : {stats['peak_absent']} absent(s) "
+        f"sur {stats['headcount']} dans {label} ({stats['present_ratio']:.0%} présents, "
+        f"minimum {threshold:.0%})."
+    )
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.utils import timezone
+
+from .models import Employe, LeaveBalance, LeaveLedgerEntry
+
+
+def post_entries(entries):
+    """Inscrit des mouvements au grand livre et met à jour les soldes dans la même transaction.
+
+    ``entries`` : (employee_id, type, kind, days, leave_id). Les soldes concernés sont
+    verrouillés et réécrits en un seul UPDATE, quel que soit le nombre de mouvements.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    keys = {(employee_id, type) for employee_id, type, *_ in entries}
+    with transaction.atomic():
+        LeaveBalance.objects.bulk_create(
+            (LeaveBalance(employee_id=employee_id, type=type) for employee_id, type in keys),
+            ignore_conflicts=True,
+        )
+        balances = {
+            (row.employee_id, row.type): row
+            for row in LeaveBalance.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in keys}, type__in={type for _, type in keys},
+            )
+            if (row.employee_id, row.type) in keys
+        }
+        created = []
+        for employee_id, type, kind, days, leave_id in entries:
+            balance = balances[(employee_id, type)]
+            balance.balance += days
+            created.append(LeaveLedgerEntry(
+                employee_id=employee_id, type=type, kind=kind, days=days,
+                balance_after=balance.balance, leave_id=leave_id,
+            ))
+        LeaveBalance.objects.filter(pk__in=[row.pk for row in balances.values()]).update(
+            balance=Case(*(When(pk=row.pk, then=Value(row.balance)) for row in balances.values())),
+            updated_at=timezone.now(),
+        )
+        return LeaveLedgerEntry.objects.bulk_create(created)
+
+
+def record_change(leave_id, previous, current):
+    """Passe les écritures entre deux états (voir ``ledger_state``) d'une même demande.
+
+    Une approbation débite le solde ; une demande approuvée puis rejetée, annulée ou
+    supprimée est restituée ; une modification des dates d'une demande approuvée
+    restitue l'ancienne durée puis débite la nouvelle.
+    """
+    if previous == current:
+        return
+    entries = []
+    if previous:
+        employee_id, type, days = previous
+        entries.append((employee_id, type, 'credit', days, leave_id))
+    if current:
+        employee_id, type, days = current
+        entries.append((employee_id, type, 'debit', -days, leave_id))
+    post_entries(entries)
+
+
+def accrue(days, type='annual', period=''):
+    """Crédite ``days`` jours à tous les employés pour une période, une seule fois par période.
+
+    Trois requêtes quel que soit le nombre d'employés : création des soldes manquants,
+    UPDATE des soldes pas encore crédités pour la période, puis insertion des écritures.
+    Renvoie le nombre d'employés crédités.
+    """
+    days = Decimal(days)
+    with transaction.atomic():
+        LeaveBalance.objects.bulk_create(
+            (LeaveBalance(employee_id=pk, type=type) for pk in Employe.objects.values_list('id', flat=True)),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        pending = LeaveBalance.objects.filter(type=type).filter(~Exists(
+            LeaveLedgerEntry.objects.filter(
+                employee_id=OuterRef('employee_id'), type=type, kind='accrual', period=period,
+            )
+        ))
+        credited = list(pending.values_list('employee_id', 'balance'))
+        pending.update(balance=F('balance') + days, updated_at=timezone.now())
+        LeaveLedgerEntry.objects.bulk_create(
+            (
+                LeaveLedgerEntry(
+                    employee_id=employee_id, type=type, kind='accrual', days=days,
+                    balance_after=balance + days, period=period,
+                )
+                for employee_id, balance in credited
+            ),
+            batch_size=1000,
+        )
+    return len(credited)
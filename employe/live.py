@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .aio import in_own_thread
+from .kpis import akpi_version, get_kpis, kpi_version
+from .models import Attendance
+
+logger = logging.getLogger('employe.live')
+
+# Messages en attente par navigateur : au-delà, l'abonné trop lent est déconnecté et
+# reçoit un instantané complet en se reconnectant
+QUEUE_SIZE = 100
+# Délai de reconnexion demandé au navigateur (EventSource), en millisecondes
+RETRY_MS = 3000
+# Sous WSGI chaque connexion ne sert qu'un envoi : le navigateur revient à ce rythme
+FALLBACK_RETRY_MS = 5000
+# Au-delà de ce nombre de lignes modifiées, la journée est relue en entier plutôt que par id
+REFETCH_ALL_AFTER = 500
+
+ROW_FIELDS = ('id', 'employee_id', 'employee__nom', 'check_in', 'check_out', 'worked_hours')
+
+
+def _poll_seconds():
+    return getattr(settings, 'LIVE_POLL_SECONDS', 1)
+
+
+def _heartbeat_seconds():
+    return getattr(settings, 'LIVE_HEARTBEAT_SECONDS', 15)
+
+
+def _time(value):
+    return timezone.localtime(value).strftime('%H:%M') if value else ''
+
+
+def _row(values):
+    pk, employee_id, nom, check_in, check_out, worked_hours = values
+    return {
+        'id': pk,
+        'employee_id': employee_id,
+        'employee': nom,
+        'check_in': _time(check_in),
+        'check_out': _time(check_out),
+        'worked_hours': str(worked_hours),
+    }
+
+
+def _counters(kpis):
+    return {
+        'attendance_rate': kpis['attendance_rate'],
+        'present_count': kpis['present_count'],
+        'avg_hours': str(kpis['avg_hours']),
+        'total_hours': str(kpis['total_hours']),
+    }
+
+
+def _read(day, stamps):
+    """Lignes du jour modifiées depuis ``stamps`` ({id: updated_at}) et compteurs.
+
+    Renvoie (nouveaux stamps, lignes modifiées, ids supprimés, compteurs). Les compteurs
+    viennent du cache des indicateurs : un seul calcul pour tous les processus.
+    """
+    today = Attendance.objects.filter(work_date=day)
+    current = dict(today.values_list('id', 'updated_at'))
+    changed = {pk for pk, updated_at in current.items() if stamps.get(pk) != updated_at}
+    removed = sorted(stamps.keys() - current.keys())
+    if not changed:
+        rows = []
+    elif len(changed) <= REFETCH_ALL_AFTER:
+        rows = today.filter(id__in=changed).values_list(*ROW_FIELDS)
+    else:
+        rows = [row for row in today.values_list(*ROW_FIELDS) if row[0] in changed]
+    return current, [_row(row) for row in rows], removed, _counters(get_kpis())
+
+
+def _snapshot(day, rows, counters):
+    return {
+        'day': day.isoformat(),
+        'counters': counters,
+        'rows': sorted(rows, key=lambda row: (row['employee'], row['id'])),
+    }
+
+
+def _event(name, version, payload):
+    return f"id: {version}\nevent: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+class Board:
+    """Présences du jour partagées par les flux en direct d'un processus.
+
+    Une seule tâche surveille la version des indicateurs (``invalidate_kpis``) tant
+    qu'un navigateur est connecté ; à chaque changement elle relit une fois les lignes
+    modifiées et les compteurs, puis envoie le même delta à tous les abonnés.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._task = None
+        self._stamps = {}
+        self.version = None
+        self.day = None
+        self.rows = {}
+        self.counters = {}
+
+    @property
+    def ready(self):
+        return self.version is not None
+
+    def snapshot(self):
+        return _snapshot(self.day, self.rows.values(), self.counters)
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self._subscribers.add(queue)
+        running = self._task is not None and not self._task.done()
+        if not running or self._task.get_loop() is not asyncio.get_running_loop():
+            # état d'une surveillance précédente : peut-être périmé, relu en entier
+            self.version = None
+            self._task = asyncio.create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, message):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # vidé puis fermé (None) : le navigateur se reconnecte avec son dernier id
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _watch(self):
+        while True:
+            version, day = await akpi_version(), timezone.localdate()
+            if version != self.version or day != self.day:
+                full = not self.ready or day != self.day
+                try:
+                    stamps, rows, removed, counters = await in_own_thread(_read)(day, {} if full else self._stamps)
+                except DatabaseError:
+                    logger.exception("Lecture des présences du jour impossible")
+                else:
+                    self._apply(version, day, full, stamps, rows, removed, counters)
+            await asyncio.sleep(_poll_seconds())
+
+    def _apply(self, version, day, full, stamps, rows, removed, counters):
+        changed = rows or removed or counters != self.counters
+        if full:
+            self.rows = {}
+        for pk in removed:
+            self.rows.pop(pk, None)
+        self.rows.update((row['id'], row) for row in rows)
+        self._stamps, self.version, self.day, self.counters = stamps, version, day, counters
+        if full:
+            self._publish(('snapshot', version, self.snapshot()))
+        elif changed:
+            self._publish(('delta', version, {'counters': counters, 'rows': rows, 'removed': removed}))
+
+
+board = Board()
+
+
+async def stream(since=None):
+    """Flux SSE sans fin : instantané si ``since`` (dernier id reçu) n'est plus à jour, puis deltas."""
+    queue = board.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if board.ready and since != str(board.version):
+            yield _event('snapshot', board.version, board.snapshot())
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), _heartbeat_seconds())
+            except asyncio.TimeoutError:
+                # garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            name, version, payload = message
+            if name == 'snapshot' and str(version) == since:
+                continue
+            yield _event(name, version, payload)
+    finally:
+        board.unsubscribe(queue)
+
+
+def once(since=None):
+    """Un seul envoi puis fin du flux (serveur WSGI) : le navigateur se reconnecte tout seul."""
+    yield f"retry: {FALLBACK_RETRY_MS}\n\n"
+    version = kpi_version()
+    if since != str(version):
+        day = timezone.localdate()
+        _, rows, _, counters = _read(day, {})
+        yield _event('snapshot', version, _snapshot(day, rows, counters))
@@ -0,0 +1,24 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def bench_database():
+    """Base de test jetable pour les commandes de mesure, supprimée à la sortie du bloc.
+
+    Sous SQLite, un fichier temporaire : une base en mémoire partagée ne reflète ni le
+    verrouillage ni les écritures réelles.
+    """
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
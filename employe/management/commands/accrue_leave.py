@@ -0,0 +1,26 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employe.leave_ledger import accrue
+from employe.models import LeaveRequest
+
+
+class Command(BaseCommand):
+    help = "Crédite les soldes de congés de tous les employés pour une période (une seule fois par période)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', default='2.5', help="Jours acquis par employé (défaut 2.5)")
+        parser.add_argument('--type', default='annual', choices=[code for code, _ in LeaveRequest.LEAVE_TYPES])
+        parser.add_argument('--period', default=timezone.localdate().strftime('%Y-%m'), help="Période AAAA-MM")
+
+    def handle(self, *args, **options):
+        try:
+            days = Decimal(options['days'])
+        except InvalidOperation:
+            raise CommandError("--days doit être un nombre.")
+        credited = accrue(days, type=options['type'], period=options['period'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{credited} employé(s) crédité(s) de {days} jour(s) pour {options['period']}."
+        ))
@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employe.archive import archive, hot_since, restore
+
+
+def _month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Mois invalide : {value} (format AAAA-MM).")
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les présences des mois clos (avant la période chaude, ATTENDANCE_HOT_MONTHS) "
+        "dans l'archive, ou les ramène avec --restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Archiver seulement les mois antérieurs à AAAA-MM")
+        parser.add_argument('--restore', metavar='AAAA-MM', help="Ramener les mois archivés à partir de AAAA-MM")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            done, verb = restore(_month(options['restore'])), "ramenée(s) dans la table des présences"
+        else:
+            before = _month(options['before']) if options['before'] else None
+            done, verb = archive(before), "archivée(s)"
+        for month, count in done:
+            self.stdout.write(f"  {month:%Y-%m} : {count} présence(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(count for _, count in done)} présence(s) {verb} ; période chaude depuis le {hot_since():%d/%m/%Y}."
+        ))
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from employe import clock
+from employe.management.benchdb import bench_database
+from employe.models import Employe
+
+
+def run_taps(action, employee_ids, workers):
+    """Exécute un pointage par identifiant, en parallèle ; renvoie (résultats, secondes)."""
+    def tap(employee_id):
+        try:
+            return action(employee_id)
+        except DatabaseError:
+            # « database is locked » : le badgeage est perdu, on le compte comme échec
+            return 'error'
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(tap, employee_ids))
+    return results, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de pointage entrée/sortie sous charge, sur une base de test jetable."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taps', type=int, default=500, help="Nombre de badgeages simultanés")
+        parser.add_argument('--workers', type=int, default=50, help="Nombre de threads")
+        parser.add_argument('--employees', type=int, default=100, help="Nombre d'employés distincts")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            Employe.objects.bulk_create(
+                Employe(nom=f'Employé {i}', email=f'e{i}@example.com', poste='Agent', salaire=1000)
+                for i in range(options['employees'])
+            )
+            ids = list(Employe.objects.values_list('id', flat=True))
+            taps = [ids[i % len(ids)] for i in range(options['taps'])]
+            for label, action in (('entrée', clock.clock_in), ('sortie', clock.clock_out)):
+                results, elapsed = run_taps(action, taps, options['workers'])
+                self.stdout.write(
+                    f"Pointage {label}: {len(taps)} badgeages en {elapsed:.3f}s "
+                    f"({len(taps) / elapsed:.0f}/s), {results.count(clock.RECORDED)} enregistré(s), "
+                    f"{results.count('error')} échec(s)"
+                )
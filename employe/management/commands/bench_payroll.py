@@ -0,0 +1,73 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from employe import payroll
+from employe.management.benchdb import bench_database
+from employe.models import Employe, LeaveRequest, MonthlyAttendance
+
+
+class Command(BaseCommand):
+    help = "Mesure le calcul d'un lot de paie sur une base de test jetable."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100000)
+        parser.add_argument('--unpaid-ratio', type=float, default=0.05, help="Part des employés en congé sans solde")
+
+    def seed(self, count, unpaid_ratio, year, month):
+        first = datetime.date(year, month, 1)
+        rng = random.Random(42)
+        Employe.objects.bulk_create(
+            (
+                Employe(
+                    nom=f'Employé {i}', email=f'e{i}@example.com', poste='Agent',
+                    salaire=Decimal(rng.randint(100000, 900000)).scaleb(-2),
+                    # un sur vingt embauché en cours de mois
+                    hire_date=first + datetime.timedelta(days=rng.randint(1, 27)) if i % 20 == 0 else datetime.date(2020, 1, 1),
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        ids = list(Employe.objects.values_list('id', flat=True))
+        LeaveRequest.objects.bulk_create(
+            (
+                LeaveRequest(
+                    employee_id=pk, type='unpaid', status='approved',
+                    start_date=first + datetime.timedelta(days=start),
+                    end_date=first + datetime.timedelta(days=start + rng.randint(0, 5)),
+                )
+                for pk in rng.sample(ids, int(len(ids) * unpaid_ratio))
+                for start in [rng.randint(0, 20)]
+            ),
+            batch_size=5000,
+        )
+        MonthlyAttendance.objects.bulk_create(
+            (
+                MonthlyAttendance(employee_id=pk, year=year, month=month, days_present=20, total_hours=Decimal('160.00'))
+                for pk in ids
+            ),
+            batch_size=5000,
+        )
+
+    def handle(self, *args, **options):
+        year, month = 2024, 3
+        with bench_database():
+            self.seed(options['employees'], options['unpaid_ratio'], year, month)
+
+            started = time.perf_counter()
+            columns, period_days = payroll.load_columns(year, month)
+            loaded = time.perf_counter()
+            payroll.prorate(columns['salary_cents'], columns['start_offset'], columns['unpaid_days'], period_days)
+            computed = time.perf_counter()
+            run = payroll.run_payroll(year, month)
+            total = time.perf_counter()
+
+            self.stdout.write(
+                f"{run.employees} employé(s) : chargement {loaded - started:.2f}s, "
+                f"calcul {(computed - loaded) * 1000:.1f}ms, lot complet (chargement + calcul + écriture) "
+                f"{total - computed:.2f}s, brut total {run.total_gross}"
+            )
@@ -0,0 +1,275 @@
+import datetime
+import io
+import json
+import math
+import os
+import platform
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from employe.management.benchdb import bench_database
+from employe.models import Attendance, Department, Employe, LeaveRequest
+from employe.urls import urlpatterns
+
+KIOSK_TOKEN = 'bench-kiosk'
+
+
+def _month(ctx):
+    return {'annee': ctx['today'].year, 'mois': ctx['today'].month}
+
+
+def _week(ctx):
+    return {'start': ctx['today'] - datetime.timedelta(days=7), 'end': ctx['today'], 'department': ctx['department']}
+
+
+def _batch(ctx):
+    stamp = timezone.localtime().replace(hour=8, minute=0, second=0, microsecond=0).isoformat()
+    return json.dumps({'events': [
+        {'employee_id': pk, 'timestamp': stamp, 'direction': 'in'} for pk in ctx['batch_employees']
+    ]})
+
+
+# Nom de route -> (méthode, paramètres d'URL, données) à partir des objets du jeu de données.
+# Les routes de suppression et de confirmation sont mesurées sur leur page (GET), sans rien supprimer.
+SCENARIOS = {
+    'dashboard': lambda ctx: ('get', {}, None),
+    'liste_employes': lambda ctx: ('get', {}, {'tri': 'nom'}),
+    'recherche_employes': lambda ctx: ('get', {}, {'q': 'diallo'}),
+    'employe_autocomplete': lambda ctx: ('get', {}, {'q': 'awa'}),
+    'ajouter_employe': lambda ctx: ('get', {}, None),
+    'importer_employes': lambda ctx: ('get', {}, None),
+    'modifier_employe': lambda ctx: ('get', {'id': ctx['employee']}, None),
+    'supprimer_employe': lambda ctx: ('get', {'id': ctx['employee']}, None),
+    'login': lambda ctx: ('get', {}, None),
+    'signup': lambda ctx: ('get', {}, None),
+    'verify_email': lambda ctx: ('get', {}, None),
+    'logout': lambda ctx: ('get', {}, None),
+    'liste_departements': lambda ctx: ('get', {}, None),
+    'ajouter_departement': lambda ctx: ('get', {}, None),
+    'modifier_departement': lambda ctx: ('get', {'id': ctx['department']}, None),
+    'supprimer_departement': lambda ctx: ('get', {'id': ctx['department']}, None),
+    'analytics': lambda ctx: ('get', {}, None),
+    'attendance_dashboard': lambda ctx: ('get', {}, None),
+    # client de test synchrone (WSGI) : un instantané puis fin du flux
+    'attendance_live': lambda ctx: ('get', {}, None),
+    'attendance_list': lambda ctx: ('get', {}, None),
+    'attendance_export': lambda ctx: ('get', {}, _week(ctx)),
+    'attendance_report': lambda ctx: ('get', {}, _month(ctx)),
+    'attendance_create': lambda ctx: ('get', {}, None),
+    'attendance_edit': lambda ctx: ('get', {'id': ctx['attendance']}, None),
+    'attendance_delete': lambda ctx: ('get', {'id': ctx['attendance']}, None),
+    'clock_in': lambda ctx: ('get', {'employee_id': ctx['clock_employee']}, None),
+    'clock_out': lambda ctx: ('get', {'employee_id': ctx['clock_employee']}, None),
+    'clock_batch': lambda ctx: ('post', {}, _batch(ctx)),
+    'leave_list': lambda ctx: ('get', {}, None),
+    'leave_create': lambda ctx: ('get', {}, None),
+    'leave_export': lambda ctx: ('get', {}, _week(ctx)),
+    'leave_edit': lambda ctx: ('get', {'id': ctx['leave']}, None),
+    'leave_delete': lambda ctx: ('get', {'id': ctx['leave']}, None),
+    'leave_approve': lambda ctx: ('get', {'id': ctx['leave_to_approve']}, None),
+    'leave_reject': lambda ctx: ('get', {'id': ctx['leave_to_reject']}, None),
+    'leave_bulk': lambda ctx: ('post', {}, {'action': 'reject', 'ids': ctx['leaves_to_bulk']}),
+    'api_list': lambda ctx: ('get', {'resource': 'attendance'}, {'department': ctx['department'], 'limit': 100}),
+    'api_detail': lambda ctx: ('get', {'resource': 'employes', 'id': ctx['employee']}, None),
+    'audit_history': lambda ctx: ('get', {'entity': 'conges', 'id': ctx['leave_to_approve']}, None),
+    'sql_stats': lambda ctx: ('get', {}, None),
+}
+
+# Métriques comparées à la référence et plancher absolu sous lequel un écart est du bruit
+METRICS = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 0, 'peak_kb': 256.0}
+
+
+def route_names():
+    return {pattern.name for pattern in urlpatterns if isinstance(pattern, URLPattern) and pattern.name}
+
+
+def missing_scenarios():
+    return sorted(route_names() - set(SCENARIOS))
+
+
+def percentile(samples, fraction):
+    """Rang le plus proche : la valeur sous laquelle se trouvent ``fraction`` des mesures."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def compare(baseline, current, threshold):
+    """Régressions de ``current`` par rapport à ``baseline`` (dictionnaires route -> métriques)."""
+    regressions = []
+    for name, metrics in sorted(current.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if before.get('status') != metrics.get('status'):
+            # autre réponse (redirection, erreur) : les mesures ne sont plus comparables
+            regressions.append(f"{name} statut : {before.get('status')} -> {metrics.get('status')}")
+            continue
+        for metric, floor in METRICS.items():
+            old, new = before.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append(f"{name} {metric} : {old} -> {new}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure chaque route de employe/urls.py (latences p50/p95/p99, requêtes SQL, pic mémoire) "
+        "sur une base jetable remplie par generate_data, et compare à une référence JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=5000)
+        parser.add_argument('--departments', type=int, default=100)
+        parser.add_argument('--days', type=int, default=40)
+        parser.add_argument('--leaves', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=20, help="Requêtes mesurées par route")
+        parser.add_argument('--warmup', type=int, default=2, help="Requêtes non mesurées par route")
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'bench_routes.json'))
+        parser.add_argument('--threshold', type=float, default=0.25, help="Régression tolérée (0.25 = +25 %%)")
+        parser.add_argument('--save', action='store_true', help="Enregistre les mesures comme nouvelle référence")
+        parser.add_argument('--route', action='append', help="Limiter à certaines routes (répétable)")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        missing = missing_scenarios()
+        if missing:
+            raise CommandError(f"Route(s) sans scénario de benchmark : {', '.join(missing)}")
+        names = options['route'] or list(SCENARIOS)
+        unknown = sorted(set(names) - set(SCENARIOS))
+        if unknown:
+            raise CommandError(f"Route(s) inconnue(s) : {', '.join(unknown)}")
+        dataset = {key: options[key] for key in ('employees', 'departments', 'days', 'leaves')}
+
+        with bench_database():
+            call_command('generate_data', seed=42, stdout=io.StringIO(), **dataset)
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], KIOSK_API_TOKEN=KIOSK_TOKEN):
+                results = self.run_routes(names, self.context(), options['repeat'], options['warmup'])
+
+        self.report(results)
+        self.check_baseline(results, dataset, options)
+
+    def context(self):
+        today = timezone.localdate()
+        employees = list(Employe.objects.order_by('id').values_list('id', flat=True)[:25])
+        pending = list(LeaveRequest.objects.filter(status='pending').order_by('id').values_list('id', flat=True)[:12])
+        if len(employees) < 25 or len(pending) < 12:
+            raise CommandError("Jeu de données trop petit : au moins 25 employés et 12 congés en attente.")
+        return {
+            'today': today,
+            'employee': employees[0],
+            'clock_employee': employees[1],
+            'batch_employees': employees[5:25],
+            'department': Department.objects.order_by('id').values_list('id', flat=True).first(),
+            'attendance': Attendance.objects.order_by('id').values_list('id', flat=True).first(),
+            'leave': pending[0],
+            'leave_to_approve': pending[1],
+            'leave_to_reject': pending[2],
+            'leaves_to_bulk': pending[3:12],
+        }
+
+    def request(self, client, method, path, data):
+        if method == 'post' and isinstance(data, str):
+            response = client.post(path, data, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {KIOSK_TOKEN}')
+        else:
+            response = getattr(client, method)(path, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        # messages flash jamais affichés (redirections non suivies) : on ne les laisse pas s'accumuler
+        client.cookies.pop('messages', None)
+        return response
+
+    def run_routes(self, names, ctx, repeat, warmup):
+        user = User.objects.create_user('bench', password='bench', is_staff=True)
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for name in names:
+            method, kwargs, data = SCENARIOS[name](ctx)
+            path = reverse(name, kwargs=kwargs)
+            durations, queries, status = [], 0, None
+            for i in range(warmup + repeat):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = self.request(client, method, path, data)
+                    elapsed = time.perf_counter() - started
+                if name == 'logout':
+                    client.force_login(user)
+                if i >= warmup:
+                    durations.append(elapsed * 1000)
+                    queries = max(queries, len(captured))
+                    status = response.status_code
+            # pic mémoire sur une passe à part : tracemalloc ralentit l'exécution
+            tracemalloc.start()
+            try:
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                self.request(client, method, path, data)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            if name == 'logout':
+                client.force_login(user)
+            if self.verbosity > 1:
+                self.stderr.write(f"{name} : {percentile(durations, 0.5):.1f} ms")
+            results[name] = {
+                'method': method.upper(),
+                'path': path,
+                'status': status,
+                'p50_ms': round(percentile(durations, 0.50), 2),
+                'p95_ms': round(percentile(durations, 0.95), 2),
+                'p99_ms': round(percentile(durations, 0.99), 2),
+                'queries': queries,
+                'peak_kb': round((peak - current) / 1024, 1),
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"{'route':<24} {'statut':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'requêtes':>9} {'pic Ko':>9}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<24} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                f"{r['queries']:>9} {r['peak_kb']:>9.1f}"
+            )
+
+    def check_baseline(self, results, dataset, options):
+        path = options['baseline']
+        document = {
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'recorded_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'routes': results,
+        }
+        if options['save'] or not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(document, handle, indent=2, ensure_ascii=False)
+                handle.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée dans {path}."))
+            return
+        with open(path, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('dataset') != dataset:
+            raise CommandError(
+                f"La référence {path} a été mesurée sur un autre jeu de données ({baseline.get('dataset')}) : "
+                "relancer avec les mêmes options ou --save."
+            )
+        regressions = compare(baseline.get('routes', {}), results, options['threshold'])
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} régression(s) au-delà de {options['threshold']:.0%} :\n  " + '\n  '.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f"Aucune régression par rapport à {path}."))
@@ -0,0 +1,135 @@
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    work_date DATE NOT NULL,
+    check_in DATETIME NULL,
+    check_out DATETIME NULL,
+    worked_hours DECIMAL NOT NULL DEFAULT 0,
+    UNIQUE (employee_id, work_date)
+);
+CREATE INDEX attendance_work_date_idx ON attendance (work_date);
+"""
+
+WRITE_SQL = """
+INSERT INTO attendance (employee_id, work_date, check_in, worked_hours) VALUES (?, ?, ?, 0)
+ON CONFLICT (employee_id, work_date) DO UPDATE SET check_out = excluded.check_in
+"""
+
+READ_SQL = """
+SELECT COUNT(DISTINCT employee_id), AVG(worked_hours), SUM(worked_hours)
+FROM attendance WHERE work_date = ?
+"""
+
+
+class Profile:
+    def __init__(self, name, timeout, pragmas):
+        self.name = name
+        self.timeout = timeout
+        self.pragmas = pragmas
+
+    def connect(self, path):
+        # isolation_level=None : autocommit, comme Django
+        conn = sqlite3.connect(path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+
+PROFILES = (
+    Profile('défaut', 5, []),
+    Profile('production', 20, settings.SQLITE_PRODUCTION_PRAGMAS),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare le débit lecture/écriture SQLite entre la configuration par défaut et le profil de production."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5, help="Durée de chaque mesure")
+        parser.add_argument('--writers', type=int, default=8, help="Threads écrivains (pointages)")
+        parser.add_argument('--readers', type=int, default=8, help="Threads lecteurs (tableau de bord)")
+        parser.add_argument('--employees', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=60, help="Jours d'historique pré-remplis")
+
+    def seed(self, conn, employees, days):
+        today = datetime.date.today()
+        conn.executescript(SCHEMA)
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO attendance (employee_id, work_date, check_in, worked_hours) VALUES (?, ?, ?, 8)',
+            (
+                (e, (today - datetime.timedelta(days=d)).isoformat(), f'{today - datetime.timedelta(days=d)} 08:00:00')
+                for d in range(1, days + 1) for e in range(1, employees + 1)
+            ),
+        )
+        conn.execute('COMMIT')
+
+    def run_profile(self, profile, options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            setup = profile.connect(path)
+            self.seed(setup, options['employees'], options['days'])
+            setup.close()
+            today = datetime.date.today().isoformat()
+            counts = {'write': 0, 'read': 0, 'error': 0}
+            lock = threading.Lock()
+            stop = threading.Event()
+
+            def worker(kind):
+                conn = profile.connect(path)
+                done = errors = 0
+                while not stop.is_set():
+                    try:
+                        if kind == 'write':
+                            employee = random.randint(1, options['employees'])
+                            conn.execute(WRITE_SQL, (employee, today, datetime.datetime.now().isoformat(' ')))
+                        else:
+                            conn.execute(READ_SQL, (today,)).fetchone()
+                        done += 1
+                    except sqlite3.OperationalError:
+                        errors += 1
+                conn.close()
+                with lock:
+                    counts[kind] += done
+                    counts['error'] += errors
+
+            threads = [threading.Thread(target=worker, args=('write',)) for _ in range(options['writers'])]
+            threads += [threading.Thread(target=worker, args=('read',)) for _ in range(options['readers'])]
+            for thread in threads:
+                thread.start()
+            time.sleep(options['seconds'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+            return counts
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        self.stdout.write(
+            f"{options['writers']} écrivain(s), {options['readers']} lecteur(s), {seconds:g}s par profil, "
+            f"{options['employees'] * options['days']} lignes pré-remplies"
+        )
+        for profile in PROFILES:
+            counts = self.run_profile(profile, options)
+            self.stdout.write(
+                f"{profile.name:>10}: écritures {counts['write'] / seconds:8.0f}/s  "
+                f"lectures {counts['read'] / seconds:8.0f}/s  "
+                f"« database is locked » {counts['error']}"
+            )
@@ -0,0 +1,252 @@
+import datetime
+import random
+import time
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from employe import rollups, search
+from employe.bulk import insert_rows
+from employe.cache import invalidate
+from employe.kpis import invalidate_kpis
+from employe.models import (
+    Attendance, Department, Employe, LeaveBalance, LeaveLedgerEntry, LeaveRequest, compute_worked_hours,
+)
+
+PRENOMS = [
+    'Awa', 'Moussa', 'Hélène', 'Fatou', 'Ibrahima', 'Aïssatou', 'Mamadou', 'Khadija', 'Ousmane', 'Marième',
+    'Jean', 'Chloé', 'Noël', 'Binta', 'Cheikh', 'Adama', 'Ndeye', 'Abdoulaye', 'Sokhna', 'Lamine',
+    'Mariama', 'Pape', 'Rokhaya', 'Seydou', 'Astou', 'François', 'Amélie', 'Théo', 'Léa', 'Gaëlle',
+]
+NOMS = [
+    'Diallo', 'Ndiaye', 'Faye', 'Sow', 'Ba', 'Diop', 'Fall', 'Sarr', 'Gueye', 'Mbaye', 'Niang', 'Cissé',
+    'Kane', 'Camara', 'Touré', 'Sy', 'Seck', 'Thiam', 'Martin', 'Dubois', 'Lefèvre', 'Bernard', 'Mercier',
+]
+FONCTIONS = [
+    'Finance', 'Comptabilité', 'Ressources humaines', 'Informatique', 'Logistique', 'Ventes', 'Marketing',
+    'Juridique', 'Achats', 'Production', 'Qualité', 'Support client', 'Recherche', 'Communication', 'Sécurité',
+]
+SITES = [
+    'Dakar', 'Thiès', 'Saint-Louis', 'Ziguinchor', 'Kaolack', 'Touba', 'Mbour', 'Rufisque', 'Louga', 'Tambacounda',
+    'Kolda', 'Fatick', 'Kédougou', 'Matam', 'Sédhiou', 'Kaffrine', 'Diourbel', 'Abidjan', 'Bamako', 'Paris',
+]
+POSTES = [
+    'Agent', 'Comptable', 'Développeur', 'Chargée de paie', 'Analyste', 'Technicien', 'Commercial',
+    'Assistant', 'Chef de projet', 'Responsable', 'Juriste', 'Acheteur', 'Opérateur', 'Contrôleur qualité',
+]
+# (type, poids, durée max en jours)
+TYPES_CONGE = [('annual', 6, 15), ('sick', 3, 5), ('unpaid', 1, 10), ('other', 1, 3)]
+
+# Acquisition mensuelle de congés annuels inscrite au grand livre
+ACQUISITION_MENSUELLE = Decimal('2.5')
+
+
+def _ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower().replace(' ', '')
+
+
+class Command(BaseCommand):
+    help = (
+        "Remplit une base vide avec un jeu de données réaliste (départements, employés, présences, "
+        "congés, grand livre) par insertions en masse, puis reconstruit agrégats et index de recherche."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100000)
+        parser.add_argument('--departments', type=int, default=500)
+        parser.add_argument('--days', type=int, default=215, help="Jours ouvrés de présences, jusqu'à hier (~20 M lignes pour 100 000 employés)")
+        parser.add_argument('--leaves', type=int, default=1000000, help="Nombre de demandes de congé visé (moins si elles ne tiennent pas sans chevauchement)")
+        parser.add_argument('--presence', type=float, default=0.93, help="Probabilité de présence un jour ouvré")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if Employe.objects.exists() or Department.objects.exists():
+            raise CommandError("La base contient déjà des employés ou des départements : utilisez une base vide.")
+        if options['employees'] < 1 or options['departments'] < 1:
+            raise CommandError("--employees et --departments doivent être positifs.")
+        self.rng = random.Random(options['seed'])
+        # adaptateurs liés une fois : connection.ops passe par un proxy à chaque accès
+        self.adapt_datetime = connection.ops.adapt_datetimefield_value
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        today = timezone.localdate()
+        self.work_days = self.working_days(today, options['days'])
+        self.first_day = self.work_days[0] if self.work_days else today
+
+        started = time.perf_counter()
+        department_ids = self.create_departments(options['departments'])
+        employees = self.create_employees(options['employees'], department_ids)
+        leaves, attendance = self.create_leaves_and_attendance(employees, options['leaves'], options['presence'], today)
+        ledger = self.create_ledger([pk for pk, _ in employees], today)
+        self.stdout.write(f"Agrégats mensuels : {rollups.rebuild()} ligne(s)")
+        self.stdout.write(f"Index de recherche : {search.rebuild()} employé(s)")
+        # insertions brutes : aucun signal n'a invalidé les caches
+        invalidate('department', 'employe', 'attendance', 'leave')
+        invalidate_kpis()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(department_ids)} département(s), {len(employees)} employé(s), {attendance} présence(s), "
+            f"{leaves} congé(s), {ledger} écriture(s) au grand livre en {time.perf_counter() - started:.1f}s."
+        ))
+
+    @staticmethod
+    def working_days(today, count):
+        days, day = [], today - datetime.timedelta(days=1)
+        while len(days) < count:
+            if day.weekday() < 5:
+                days.append(day)
+            day -= datetime.timedelta(days=1)
+        return days[::-1]
+
+    def create_departments(self, count):
+        base = [(fonction, site) for site in SITES for fonction in FONCTIONS]
+        # au-delà des combinaisons fonction/site : « Finance Dakar 2 », « Finance Dakar 3 »...
+        services = [(f'{fonction} {site}', fonction, site) for fonction, site in base] + [
+            (f'{fonction} {site} {n}', fonction, site)
+            for n in range(2, count // len(base) + 2) for fonction, site in base
+        ]
+        now = self.adapt_datetime(self.now)
+        with transaction.atomic():
+            insert_rows(Department, ['name', 'description', 'created_at', 'updated_at'], (
+                (name, f"{fonction} — site de {site}", now, now) for name, fonction, site in services[:count]
+            ), self.batch_size)
+        return list(Department.objects.order_by('id').values_list('id', flat=True))
+
+    def create_employees(self, count, department_ids):
+        rng = self.rng
+        # tailles de départements inégales : quelques gros services, beaucoup de petits
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(len(department_ids))]
+        departments = rng.choices(department_ids, weights=weights, k=count)
+        now = self.adapt_datetime(self.now)
+        adapt_decimal = connection.ops.adapt_decimalfield_value
+        adapt_date = connection.ops.adapt_datefield_value
+        today = timezone.localdate()
+
+        def rows():
+            for i in range(count):
+                prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+                hired = today - datetime.timedelta(days=int(rng.expovariate(1 / 1500)))
+                yield (
+                    f'{prenom} {nom}', f'{_ascii(prenom)}.{_ascii(nom)}{i}@entreprise.sn', rng.choice(POSTES),
+                    adapt_decimal(Decimal(rng.randrange(150000, 2500000, 500)), 10, 2), departments[i],
+                    adapt_date(hired), now,
+                )
+        with transaction.atomic():
+            insert_rows(Employe, ['nom', 'email', 'poste', 'salaire', 'department_id', 'hire_date', 'updated_at'],
+                    rows(), self.batch_size)
+        self.stdout.write(f"{count} employé(s) créé(s)")
+        return list(Employe.objects.order_by('id').values_list('id', 'hire_date'))
+
+    def plan_leaves(self, count, start, end):
+        """Congés sans chevauchement entre ``start`` et ``end`` : (type, début, fin), triés."""
+        rng = self.rng
+        span = (end - start).days
+        if count <= 0 or span <= 0:
+            return []
+        planned, cursor = [], None
+        for offset in sorted(rng.randrange(span) for _ in range(count)):
+            type, _, longest = rng.choices(TYPES_CONGE, weights=[t[1] for t in TYPES_CONGE])[0]
+            first = start + datetime.timedelta(days=offset)
+            if cursor and first <= cursor:
+                first = cursor + datetime.timedelta(days=1)
+            last = first + datetime.timedelta(days=rng.randint(1, longest) - 1)
+            if last > end:
+                break
+            planned.append((type, first, last))
+            cursor = last
+        return planned
+
+    def leave_status(self, start, today):
+        roll = self.rng.random()
+        if start > today:
+            return 'pending' if roll < 0.6 else 'approved'
+        return 'approved' if roll < 0.8 else 'rejected' if roll < 0.92 else 'cancelled'
+
+    def create_leaves_and_attendance(self, employees, leave_count, presence, today):
+        rng = self.rng
+        tz = timezone.get_current_timezone()
+        adapt_date = connection.ops.adapt_datefield_value
+        adapt_decimal = connection.ops.adapt_decimalfield_value
+        now = self.adapt_datetime(self.now)
+        horizon = today + datetime.timedelta(days=60)
+        per_employee = leave_count / len(employees)
+        adapt_datetime = self.adapt_datetime
+        # minuit local de chaque jour ouvré, converti une fois en UTC (changements d'heure compris)
+        midnights = {
+            day: timezone.make_aware(datetime.datetime.combine(day, datetime.time()), tz).astimezone(datetime.timezone.utc)
+            for day in self.work_days
+        }
+        leave_columns = ['employee_id', 'start_date', 'end_date', 'type', 'reason', 'status', 'approved_by', 'created_at', 'updated_at']
+        attendance_columns = ['employee_id', 'work_date', 'check_in', 'check_out', 'worked_hours', 'updated_at']
+        leaves_left, leaves_total, attendance_total = leave_count, 0, 0
+
+        for chunk_start in range(0, len(employees), 1000):
+            leave_rows, attendance_rows = [], []
+            for pk, hired in employees[chunk_start:chunk_start + 1000]:
+                wanted = min(leaves_left, int(per_employee) + (rng.random() < per_employee % 1))
+                off = set()
+                for type, start, end in self.plan_leaves(wanted, max(hired, self.first_day), horizon):
+                    status = self.leave_status(start, today)
+                    asked = start - datetime.timedelta(days=rng.randint(5, 30))
+                    created = min(self.now, timezone.make_aware(datetime.datetime.combine(asked, datetime.time(10)), tz))
+                    leave_rows.append((
+                        pk, adapt_date(start), adapt_date(end), type, '', status,
+                        'rh' if status in ('approved', 'rejected') else '', self.adapt_datetime(created), now,
+                    ))
+                    if status == 'approved':
+                        off.update(start + datetime.timedelta(days=n) for n in range((end - start).days + 1))
+                leaves_left -= wanted
+                for day in self.work_days:
+                    if day < hired or day in off or rng.random() >= presence:
+                        continue
+                    check_in = midnights[day] + datetime.timedelta(minutes=int(rng.gauss(8 * 60 + 30, 25)))
+                    check_out = check_in + datetime.timedelta(minutes=rng.randint(7 * 60 + 30, 9 * 60 + 30))
+                    attendance_rows.append((
+                        pk, adapt_date(day), adapt_datetime(check_in), adapt_datetime(check_out),
+                        adapt_decimal(compute_worked_hours(check_in, check_out), 6, 2), now,
+                    ))
+            with transaction.atomic():
+                leaves_total += insert_rows(LeaveRequest, leave_columns, leave_rows, self.batch_size)
+                attendance_total += insert_rows(Attendance, attendance_columns, attendance_rows, self.batch_size)
+            if (chunk_start // 1000) % 10 == 9:
+                self.stdout.write(f"  {chunk_start + 1000} employé(s) : {attendance_total} présence(s), {leaves_total} congé(s)")
+        return leaves_total, attendance_total
+
+    def create_ledger(self, employee_ids, today):
+        """Acquisitions mensuelles et débits des congés approuvés, soldes courants en fin de compte."""
+        months = sorted({(day.year, day.month) for day in self.work_days} | {(today.year, today.month)})
+        adapt_decimal = connection.ops.adapt_decimalfield_value
+        tz = timezone.get_current_timezone()
+        columns = ['employee_id', 'type', 'kind', 'days', 'balance_after', 'leave_id', 'period', 'created_at']
+        entries_total = 0
+        for chunk_start in range(0, len(employee_ids), 2000):
+            chunk = employee_ids[chunk_start:chunk_start + 2000]
+            events = defaultdict(list)
+            for pk in chunk:
+                for year, month in months:
+                    events[pk].append((datetime.date(year, month, 1), 'annual', 'accrual', ACQUISITION_MENSUELLE, None, f'{year}-{month:02d}'))
+            for leave_id, pk, type, start, end in (
+                LeaveRequest.objects.filter(employee_id__in=chunk, status='approved')
+                .values_list('id', 'employee_id', 'type', 'start_date', 'end_date')
+            ):
+                events[pk].append((start, type, 'debit', -Decimal((end - start).days + 1), leave_id, ''))
+            rows, balances = [], defaultdict(Decimal)
+            for pk, items in events.items():
+                for day, type, kind, days, leave_id, period in sorted(items, key=lambda item: (item[0], item[2] != 'accrual')):
+                    balances[(pk, type)] += days
+                    created = timezone.make_aware(datetime.datetime.combine(min(day, today), datetime.time(12)), tz)
+                    rows.append((
+                        pk, type, kind, adapt_decimal(days, 7, 2), adapt_decimal(balances[(pk, type)], 7, 2),
+                        leave_id, period, self.adapt_datetime(created),
+                    ))
+            now = self.adapt_datetime(self.now)
+            with transaction.atomic():
+                entries_total += insert_rows(LeaveLedgerEntry, columns, rows, self.batch_size)
+                insert_rows(LeaveBalance, ['employee_id', 'type', 'balance', 'updated_at'], (
+                    (pk, type, adapt_decimal(balance, 7, 2), now) for (pk, type), balance in balances.items()
+                ), self.batch_size)
+        return entries_total
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employe.importers import ImportFileError, import_employes, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Importe des employés depuis un fichier CSV ou XLSX (lecture en flux, insertion par lots)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv ou .xlsx")
+        parser.add_argument('--batch-size', type=int, default=500, help="Nombre de lignes par bulk_create")
+        parser.add_argument('--dry-run', action='store_true', help="Valider sans rien écrire")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif.")
+        try:
+            with open(path, 'rb') as fileobj:
+                report = import_employes(
+                    iter_rows(fileobj, path),
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except ImportFileError as exc:
+            if exc.report is not None and exc.report.created and not options['dry_run']:
+                raise CommandError(f"{exc} {exc.report.created} employé(s) déjà importé(s) avant l'erreur.")
+            raise CommandError(str(exc))
+        except OSError as exc:
+            raise CommandError(str(exc))
+        for line, message in report.errors:
+            self.stderr.write(f"Ligne {line}: {message}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... et {report.error_count - len(report.errors)} autre(s) erreur(s).")
+        verb = "validé(s)" if options['dry_run'] else "importé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} employé(s) {verb}, {report.error_count} ligne(s) en erreur."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from employe.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats mensuels de présence (par employé et par département)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{created} agrégat(s) mensuel(s) par employé reconstruit(s)."))
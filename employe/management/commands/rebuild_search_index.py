@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from employe.search import backend, rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des employés."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} employé(s) indexé(s) ({type(backend()).__name__})."
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employe.payroll import run_payroll
+
+
+class Command(BaseCommand):
+    help = "Calcule la paie d'un mois (salaire au prorata des jours payés) et l'enregistre comme un lot."
+
+    def add_arguments(self, parser):
+        today = timezone.localdate()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--month', type=int, default=today.month)
+        parser.add_argument('--by', default='', help="Auteur du lot")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['month'] <= 12:
+            raise CommandError("--month doit être compris entre 1 et 12.")
+        run = run_payroll(options['year'], options['month'], created_by=options['by'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Lot #{run.pk} : {run.employees} employé(s), brut total {run.total_gross}."
+        ))
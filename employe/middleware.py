@@ -0,0 +1,174 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .audit import acting_as
+
+logger = logging.getLogger('employe.sql')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN \((?:[^()]*)\)", re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """Forme d'une requête : littéraux et listes IN (...) remplacés, pour regrouper les doublons."""
+    sql = _LITERALS.sub('?', sql)
+    return _IN_LISTS.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper qui compte les requêtes, leur durée et leurs formes."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.shapes.values() if n > 1)
+
+
+class ViewStats:
+    """Statistiques cumulées par vue pour ce processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, total, sql, queries, duplicates, n_plus_one):
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sql_ms': 0.0,
+                'queries': 0, 'max_queries': 0, 'duplicates': 0, 'n_plus_one_alerts': 0,
+            })
+            stats['requests'] += 1
+            stats['total_ms'] += total * 1000
+            stats['max_ms'] = max(stats['max_ms'], total * 1000)
+            stats['sql_ms'] += sql * 1000
+            stats['queries'] += queries
+            stats['max_queries'] = max(stats['max_queries'], queries)
+            stats['duplicates'] += duplicates
+            stats['n_plus_one_alerts'] += bool(n_plus_one)
+
+    def snapshot(self):
+        with self._lock:
+            views = {name: dict(stats) for name, stats in self._views.items()}
+        for stats in views.values():
+            n = stats['requests']
+            stats['avg_ms'] = round(stats['total_ms'] / n, 2)
+            stats['avg_sql_ms'] = round(stats['sql_ms'] / n, 2)
+            stats['avg_queries'] = round(stats['queries'] / n, 2)
+        return views
+
+
+view_stats = ViewStats()
+
+
+class SQLInstrumentationMiddleware:
+    """Mesure, pour chaque requête HTTP, le nombre de requêtes SQL, leur durée, les
+    doublons et le temps hors SQL (vue + rendu du gabarit).
+
+    Les mesures sont renvoyées dans l'en-tête ``Server-Timing``, cumulées par vue
+    (voir la vue ``sql_stats``) et une alerte N+1 est journalisée quand une même forme
+    de requête se répète plus de ``SQL_N_PLUS_ONE_THRESHOLD`` fois.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _wrap_connections(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self._wrap_connections(recorder):
+            response = self.get_response(request)
+        return self._report(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # Les connexions sont propres à chaque thread : les wrappers sont posés dans le thread
+        # où sync_to_async exécute le code synchrone de cette requête (ORM, rendu).
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(self._wrap_connections)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._report(request, response, recorder, time.perf_counter() - started)
+
+    def _report(self, request, response, recorder, total):
+        match = getattr(request, 'resolver_match', None)
+        # pas de chemin brut pour les URL non résolues : le nombre de clés reste borné
+        view = (match.view_name if match else None) or '<non résolue>'
+        threshold = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 10)
+        repeated = [(shape, n) for shape, n in recorder.shapes.items() if n > threshold]
+        for shape, n in repeated:
+            logger.warning("N+1 probable dans %s : %d exécutions de %s", view, n, shape)
+        view_stats.record(view, total, recorder.duration, recorder.count, recorder.duplicates, repeated)
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries, {recorder.duplicates} dup"',
+            # tout le temps hors SQL (vue, gabarit, middlewares), pas seulement le rendu
+            f'app;dur={(total - recorder.duration) * 1000:.2f};desc="hors SQL"',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        return response
+
+
+class AuditActorMiddleware:
+    """Attribue au journal d'audit les modifications faites pendant la requête à son utilisateur."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with acting_as(self._user_of(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # la variable de contexte suit la requête dans les threads de sync_to_async
+        with acting_as(self._user_of(request)):
+            return await self.get_response(request)
+
+    @staticmethod
+    def _user_of(request):
+        # une fonction plutôt que request.user : asgiref compare les valeurs du contexte en
+        # passant d'async à sync, ce qui chargerait l'utilisateur (SQL) dans la boucle
+        return lambda: getattr(request, 'user', None)
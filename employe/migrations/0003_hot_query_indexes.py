@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0002_department_employe_hire_date_employe_department_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['work_date'], name='attendance_work_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(fields=['nom', 'id'], name='employe_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(fields=['hire_date', 'id'], name='employe_hire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(fields=['salaire', 'id'], name='employe_salaire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['-created_at'], name='leave_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at'], name='leave_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0005_payroll_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('annual', 'Congé annuel'), ('sick', 'Maladie'), ('unpaid', 'Sans solde'), ('other', 'Autre')], max_length=20)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='employe.employe')),
+            ],
+            options={
+                'unique_together': {('employee', 'type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('annual', 'Congé annuel'), ('sick', 'Maladie'), ('unpaid', 'Sans solde'), ('other', 'Autre')], max_length=20)),
+                ('kind', models.CharField(choices=[('accrual', 'Acquisition'), ('debit', 'Prise'), ('credit', 'Restitution')], max_length=20)),
+                ('days', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('period', models.CharField(blank=True, max_length=7)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='employe.employe')),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='employe.leaverequest')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['employee', 'type', '-created_at'], name='leave_ledger_employee_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'accrual')), fields=('employee', 'type', 'period'), name='leave_ledger_accrual_once')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:25
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(django.db.models.functions.text.Lower('nom'), models.F('id'), name='employe_nom_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employe',
+            index=models.Index(django.db.models.functions.text.Lower('email'), models.F('id'), name='employe_email_lower_idx'),
+        ),
+    ]
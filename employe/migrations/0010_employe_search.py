@@ -0,0 +1,44 @@
+# Index plein texte des employés (SQLite FTS5). Sans FTS5 ou sur un autre moteur,
+# la recherche utilise l'index inversé en mémoire de employe/search.py.
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+CREATE = """
+    CREATE VIRTUAL TABLE employe_search USING fts5(
+        nom, email, poste, department, department_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+FILL = """
+    INSERT INTO employe_search (rowid, nom, email, poste, department, department_id)
+    SELECT e.id, e.nom, e.email, e.poste, COALESCE(d.name, ''), e.department_id
+    FROM employe_employe e LEFT JOIN employe_department d ON d.id = e.department_id
+"""
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE)
+    except OperationalError:
+        return
+    schema_editor.execute(FILL)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS employe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0009_employe_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
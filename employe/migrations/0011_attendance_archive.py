@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0010_employe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('work_date', models.DateField()),
+                ('check_in', models.DateTimeField(blank=True, null=True)),
+                ('check_out', models.DateTimeField(blank=True, null=True)),
+                ('worked_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=6)),
+                ('updated_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='employe.employe')),
+            ],
+            options={
+                'ordering': ['-work_date', '-check_in'],
+                'indexes': [models.Index(fields=['work_date'], name='attendance_archive_date_idx')],
+                'unique_together': {('employee', 'work_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employe', '0011_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20)),
+                ('entity_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('c', 'Création'), ('u', 'Modification'), ('d', 'Suppression')], max_length=1)),
+                ('changes', models.JSONField(default=dict)),
+                ('actor', models.CharField(blank=True, max_length=150)),
+                ('at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-at', '-id'],
+                'indexes': [models.Index(fields=['entity', 'entity_id', 'at', 'id'], name='audit_entity_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -7,10 +8,21 @@ class Department(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # dernière modification : validateurs ETag/Last-Modified de l'API
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # champs suivis par le journal d'audit (employe/audit.py)
+    AUDIT_FIELDS = ('name', 'description')
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_state = audit_state(instance)
+        return instance
+
 class Employe(models.Model):
     #cree un champ de chain de charactere
     nom = models.CharField(max_length=100)
@@ -21,11 +33,45 @@ class Employe(models.Model):
     # optional link to Department to align with HR structure
     department = models.ForeignKey(Department, null=True, blank=True, on_delete=models.SET_NULL, related_name='employees')
     hire_date = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # tris de l'annuaire (pagination par curseur : champ puis id)
+        indexes = [
+            models.Index(fields=['nom', 'id'], name='employe_nom_idx'),
+            models.Index(fields=['hire_date', 'id'], name='employe_hire_date_idx'),
+            models.Index(fields=['salaire', 'id'], name='employe_salaire_idx'),
+            # recherche par préfixe de l'autocomplétion, casse ignorée
+            models.Index(Lower('nom'), models.F('id'), name='employe_nom_lower_idx'),
+            models.Index(Lower('email'), models.F('id'), name='employe_email_lower_idx'),
+        ]
+
+    AUDIT_FIELDS = ('nom', 'email', 'poste', 'salaire', 'department_id', 'hire_date')
 
     #fonction(constructeur) 
     def __str__(self):
         return self.nom
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_state = audit_state(instance)
+        return instance
+
+
+def audit_state(instance):
+    # valeurs suivies par le journal d'audit telles que chargées (champs différés absents)
+    values = instance.__dict__
+    return {name: values[name] for name in instance.AUDIT_FIELDS if name in values}
+
+
+def compute_worked_hours(check_in, check_out):
+    # Heures travaillées arrondies au centième, None si les horaires sont incomplets
+    if check_in and check_out and check_out > check_in:
+        total_seconds = (check_out - check_in).total_seconds()
+        return Decimal(total_seconds / 3600).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return None
+
 
 class Attendance(models.Model):
     employee = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='attendance_records')
@@ -33,26 +79,118 @@ class Attendance(models.Model):
     check_in = models.DateTimeField(null=True, blank=True)
     check_out = models.DateTimeField(null=True, blank=True)
     worked_hours = models.DecimalField(max_digits=6, decimal_places=2, default=Decimal('0.00'))
+    # les pointages en SQL brut et par lots le renseignent eux-mêmes
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('employee', 'work_date')
         ordering = ['-work_date', '-check_in']
+        indexes = [
+            # tableaux de bord et exports : filtre sur la date seule
+            models.Index(fields=['work_date'], name='attendance_work_date_idx'),
+        ]
+
+    AUDIT_FIELDS = ('employee_id', 'work_date', 'check_in', 'check_out', 'worked_hours')
 
     def __str__(self):
         return f"{self.employee.nom} - {self.work_date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # (employé, date) tels que chargés : l'ancien mois doit être recalculé si on les modifie
+        instance._loaded_key = (instance.__dict__.get('employee_id'), instance.__dict__.get('work_date'))
+        instance._audit_state = audit_state(instance)
+        return instance
+
     def save(self, *args, **kwargs):
         # Auto derive work_date from check_in if missing
         if not self.work_date and self.check_in:
             self.work_date = self.check_in.date()
         # Compute worked hours when both timestamps present
-        if self.check_in and self.check_out and self.check_out > self.check_in:
-            total_seconds = (self.check_out - self.check_in).total_seconds()
-            hours = Decimal(total_seconds / 3600).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        hours = compute_worked_hours(self.check_in, self.check_out)
+        if hours is not None:
             self.worked_hours = hours
         super().save(*args, **kwargs)
 
 
+class ArchivedAttendance(models.Model):
+    # Présences des mois clos, déplacées hors de Attendance par archive_attendance :
+    # mêmes colonnes, même id. Les lectures d'historique passent par employe.archive.
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='archived_attendance')
+    work_date = models.DateField()
+    check_in = models.DateTimeField(null=True, blank=True)
+    check_out = models.DateTimeField(null=True, blank=True)
+    worked_hours = models.DecimalField(max_digits=6, decimal_places=2, default=Decimal('0.00'))
+    # conservé tel quel : l'archivage ne change pas la ligne
+    updated_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('employee', 'work_date')
+        ordering = ['-work_date', '-check_in']
+        indexes = [
+            models.Index(fields=['work_date'], name='attendance_archive_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.nom} - {self.work_date}"
+
+
+class MonthlyAttendance(models.Model):
+    # Agrégat mensuel par employé, tenu à jour à chaque enregistrement/suppression d'Attendance
+    employee = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='monthly_attendance')
+    # département de l'employé au moment du calcul
+    department = models.ForeignKey(Department, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    days_present = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=Decimal('0.00'))
+    late_arrivals = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('employee', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'month', 'department'], name='monthly_att_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.nom} {self.month:02d}/{self.year}"
+
+    @property
+    def average_hours(self):
+        if not self.days_present:
+            return Decimal('0.00')
+        return (self.total_hours / self.days_present).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class DepartmentMonthlyAttendance(models.Model):
+    # Agrégat mensuel par département (department vide : employés sans département)
+    department = models.ForeignKey(Department, null=True, blank=True, on_delete=models.CASCADE, related_name='monthly_attendance')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    employees = models.PositiveIntegerField(default=0)
+    days_present = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    late_arrivals = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('department', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'month'], name='dept_monthly_att_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.department or '-'} {self.month:02d}/{self.year}"
+
+    @property
+    def average_hours(self):
+        if not self.days_present:
+            return Decimal('0.00')
+        return (self.total_hours / self.days_present).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
 class LeaveRequest(models.Model):
     LEAVE_TYPES = (
         ('annual', 'Congé annuel'),
@@ -75,9 +213,19 @@ class LeaveRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS, default='pending')
     approved_by = models.CharField(max_length=120, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='leave_created_at_idx'),
+            # index partiel : seules les demandes en attente y figurent
+            models.Index(fields=['-created_at'], condition=models.Q(status='pending'), name='leave_pending_idx'),
+            # chevauchements : employé puis date de fin (seules les demandes finissant après D1 sont lues)
+            models.Index(fields=['employee', 'end_date', 'start_date'], name='leave_employee_range_idx'),
+        ]
+
+    AUDIT_FIELDS = ('employee_id', 'type', 'start_date', 'end_date', 'reason', 'status', 'approved_by')
 
     def __str__(self):
         return f"{self.employee.nom} {self.start_date} → {self.end_date} ({self.get_status_display()})"
@@ -86,3 +234,145 @@ class LeaveRequest(models.Model):
         if self.end_date and self.start_date and self.end_date < self.start_date:
             from django.core.exceptions import ValidationError
             raise ValidationError('La date de fin doit être postérieure à la date de début.')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # état tel que chargé : le grand livre des soldes ne passe que la différence
+        instance._ledger_state = ledger_state(instance)
+        instance._audit_state = audit_state(instance)
+        return instance
+
+    @property
+    def days(self):
+        return (self.end_date - self.start_date).days + 1
+
+
+def ledger_state(leave):
+    # (employé, type, jours) d'une demande approuvée ; None sinon (ou champs non chargés)
+    values = leave.__dict__
+    if values.get('status') != 'approved' or not values.get('start_date') or not values.get('end_date'):
+        return None
+    return (values.get('employee_id'), values.get('type'), Decimal(leave.days))
+
+
+class LeaveBalance(models.Model):
+    # Solde courant par employé et type de congé, tenu à jour par le grand livre
+    employee = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='leave_balances')
+    type = models.CharField(max_length=20, choices=LeaveRequest.LEAVE_TYPES)
+    balance = models.DecimalField(max_digits=7, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employee', 'type')
+
+    def __str__(self):
+        return f"{self.employee.nom} {self.get_type_display()} : {self.balance}"
+
+
+class LeaveLedgerEntry(models.Model):
+    KINDS = (
+        ('accrual', 'Acquisition'),
+        ('debit', 'Prise'),
+        ('credit', 'Restitution'),
+    )
+
+    employee = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='leave_ledger')
+    type = models.CharField(max_length=20, choices=LeaveRequest.LEAVE_TYPES)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    # signé : positif pour une acquisition ou une restitution, négatif pour une prise
+    days = models.DecimalField(max_digits=7, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=7, decimal_places=2)
+    leave = models.ForeignKey(LeaveRequest, null=True, blank=True, on_delete=models.SET_NULL, related_name='ledger_entries')
+    # période d'acquisition (AAAA-MM) : une seule acquisition par employé, type et mois
+    period = models.CharField(max_length=7, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['employee', 'type', '-created_at'], name='leave_ledger_employee_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'type', 'period'], condition=models.Q(kind='accrual'),
+                name='leave_ledger_accrual_once',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.nom} {self.get_kind_display()} {self.days} ({self.get_type_display()})"
+
+
+class PayrollRun(models.Model):
+    # Lot de paie d'un mois : chaque exécution est conservée
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.CharField(max_length=120, blank=True)
+    employees = models.PositiveIntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='payroll_run_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"Paie {self.month:02d}/{self.year} ({self.employees} employés)"
+
+
+class PayrollLine(models.Model):
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='lines')
+    # le bulletin survit à la suppression de l'employé : nom et salaire sont recopiés
+    employee = models.ForeignKey(Employe, null=True, on_delete=models.SET_NULL, related_name='payroll_lines')
+    employee_name = models.CharField(max_length=100)
+    base_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    paid_days = models.PositiveSmallIntegerField()
+    unpaid_days = models.PositiveSmallIntegerField(default=0)
+    days_present = models.PositiveSmallIntegerField(default=0)
+    worked_hours = models.DecimalField(max_digits=8, decimal_places=2, default=Decimal('0.00'))
+    gross_pay = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('run', 'employee')
+
+    def __str__(self):
+        return f"{self.employee_name} : {self.gross_pay}"
+
+
+class AuditEntry(models.Model):
+    # Journal d'audit en ajout seul : une ligne par création, modification ou suppression,
+    # avec les seuls champs changés. Pas de clé étrangère : l'historique survit à l'entité.
+    ACTIONS = (
+        ('c', 'Création'),
+        ('u', 'Modification'),
+        ('d', 'Suppression'),
+    )
+
+    entity = models.CharField(max_length=20)
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=1, choices=ACTIONS)
+    # {champ: [avant, après]}, valeurs converties en JSON (décimaux et dates en texte)
+    changes = models.JSONField(default=dict)
+    actor = models.CharField(max_length=150, blank=True)
+    at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-at', '-id']
+        indexes = [
+            # historique d'une entité, du plus récent au plus ancien
+            models.Index(fields=['entity', 'entity_id', 'at', 'id'], name='audit_entity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} #{self.entity_id} {self.get_action_display()} ({self.at:%d/%m/%Y %H:%M})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Le journal d'audit est en ajout seul.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Le journal d'audit est en ajout seul.")
@@ -0,0 +1,91 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    return values
+
+
+class KeysetPaginator:
+    """Pagination par curseur (keyset) : le coût d'une page ne dépend pas de sa position.
+
+    Le tri se fait sur ``sort_field`` puis sur ``id`` pour départager les égalités,
+    ce qui rend les liens de page stables même si des lignes sont ajoutées entre-temps.
+    """
+
+    def __init__(self, queryset, sort_field, descending=False, per_page=50):
+        self.queryset = queryset
+        self.sort_field = sort_field
+        self.descending = descending
+        self.per_page = per_page
+        self.field = queryset.model._meta.get_field(sort_field)
+
+    def _ordering(self, reverse=False):
+        desc = self.descending != reverse
+        prefix = '-' if desc else ''
+        return [f'{prefix}{self.sort_field}', f'{prefix}id']
+
+    def _after(self, value, pk, reverse=False):
+        # (champ, id) strictement après le curseur dans le sens de parcours
+        desc = self.descending != reverse
+        op = 'lt' if desc else 'gt'
+        # la borne large (>= / <=) permet à la base de démarrer directement dans l'index
+        return Q(**{f'{self.sort_field}__{op}e': value}) & (
+            Q(**{f'{self.sort_field}__{op}': value})
+            | Q(**{f'id__{op}': pk})
+        )
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor) if cursor else None
+        if values is None:
+            return None
+        try:
+            return self.field.to_python(values[0]), int(values[1])
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _cursor_for(self, obj):
+        return encode_cursor([getattr(obj, self.sort_field), obj.pk])
+
+    def page(self, after=None, before=None):
+        qs = self.queryset
+        reverse = False
+        position = self._parse(before)
+        if position is not None:
+            reverse = True
+            qs = qs.filter(self._after(*position, reverse=True))
+        else:
+            position = self._parse(after)
+            if position is not None:
+                qs = qs.filter(self._after(*position))
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(qs.order_by(*self._ordering(reverse))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        return {
+            'object_list': rows,
+            'has_next': has_next and bool(rows),
+            'has_previous': has_previous and bool(rows),
+            'next_cursor': self._cursor_for(rows[-1]) if rows else None,
+            'previous_cursor': self._cursor_for(rows[0]) if rows else None,
+        }
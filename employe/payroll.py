@@ -0,0 +1,111 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .bulk import insert_rows
+from .models import Employe, LeaveRequest, MonthlyAttendance, PayrollLine, PayrollRun
+from .rollups import month_bounds
+
+PAYROLL_BATCH_SIZE = 2000
+
+
+def _cents(value):
+    return int(value * 100)
+
+
+def _from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def load_columns(year, month):
+    """Charge en colonnes (une entrée par employé, triées par id) les données de paie du mois.
+
+    Salaires en centimes, premier jour payé (embauche en cours de mois), jours de congé
+    sans solde approuvés et heures travaillées lues dans les agrégats mensuels.
+    """
+    first, following = month_bounds(year, month)
+    columns = {
+        'ids': [], 'names': [], 'salary_cents': [], 'start_offset': [],
+        'unpaid_days': [], 'days_present': [], 'worked_hours': [],
+    }
+    employees = (
+        Employe.objects.filter(hire_date__lt=following)
+        .order_by('id')
+        .values_list('id', 'nom', 'salaire', 'hire_date')
+    )
+    for pk, nom, salaire, hire_date in employees.iterator(chunk_size=PAYROLL_BATCH_SIZE):
+        columns['ids'].append(pk)
+        columns['names'].append(nom)
+        columns['salary_cents'].append(_cents(salaire))
+        columns['start_offset'].append(max((hire_date - first).days, 0))
+
+    # Jours sans solde : union des congés (des demandes qui se chevauchent ne comptent qu'une fois)
+    unpaid = defaultdict(set)
+    leaves = LeaveRequest.objects.filter(
+        type='unpaid', status='approved', start_date__lt=following, end_date__gte=first,
+    ).values_list('employee_id', 'start_date', 'end_date')
+    last = following - datetime.timedelta(days=1)
+    for employee_id, start, end in leaves.iterator(chunk_size=PAYROLL_BATCH_SIZE):
+        unpaid[employee_id].update(range((max(start, first) - first).days, (min(end, last) - first).days + 1))
+
+    attendance = dict(
+        (employee_id, (days, hours))
+        for employee_id, days, hours in MonthlyAttendance.objects.filter(year=year, month=month)
+        .values_list('employee_id', 'days_present', 'total_hours')
+        .iterator(chunk_size=PAYROLL_BATCH_SIZE)
+    )
+    for pk, start_offset in zip(columns['ids'], columns['start_offset']):
+        # un congé antérieur à l'embauche n'est pas déduit une seconde fois
+        columns['unpaid_days'].append(sum(1 for day in unpaid.get(pk, ()) if day >= start_offset))
+        days, hours = attendance.get(pk, (0, Decimal('0.00')))
+        columns['days_present'].append(days)
+        columns['worked_hours'].append(_cents(hours))
+    return columns, (following - first).days
+
+
+def prorate(salary_cents, start_offset, unpaid_days, period_days):
+    """Salaire brut au prorata des jours payés, en centimes.
+
+    Le calcul est entier : ``salaire * jours payés / jours du mois`` arrondi au demi
+    supérieur (à l'écart de zéro), soit exactement ``Decimal.quantize(ROUND_HALF_UP)``.
+    Renvoie (jours payés, brut en centimes) sous forme de listes.
+    """
+    paid = [max(period_days - start - off, 0) for start, off in zip(start_offset, unpaid_days)]
+    gross = [
+        (1 if s >= 0 else -1) * ((2 * abs(s) * p + period_days) // (2 * period_days))
+        for s, p in zip(salary_cents, paid)
+    ]
+    return paid, gross
+
+
+LINE_COLUMNS = (
+    'run_id', 'employee_id', 'employee_name', 'base_salary', 'paid_days',
+    'unpaid_days', 'days_present', 'worked_hours', 'gross_pay',
+)
+
+
+def run_payroll(year, month, created_by='', batch_size=PAYROLL_BATCH_SIZE):
+    """Calcule la paie du mois pour tous les employés et l'enregistre comme un nouveau lot."""
+    columns, period_days = load_columns(year, month)
+    paid, gross = prorate(columns['salary_cents'], columns['start_offset'], columns['unpaid_days'], period_days)
+    with transaction.atomic():
+        run = PayrollRun.objects.create(
+            year=year, month=month, created_by=created_by,
+            employees=len(columns['ids']), total_gross=_from_cents(sum(gross)),
+        )
+        insert_rows(
+            PayrollLine,
+            LINE_COLUMNS,
+            (
+                (run.pk, pk, name, _from_cents(salary), paid_days, unpaid_days,
+                 days_present, _from_cents(hours), _from_cents(gross_cents))
+                for pk, name, salary, paid_days, unpaid_days, days_present, hours, gross_cents in zip(
+                    columns['ids'], columns['names'], columns['salary_cents'], paid,
+                    columns['unpaid_days'], columns['days_present'], columns['worked_hours'], gross,
+                )
+            ),
+            batch_size,
+        )
+    return run
@@ -0,0 +1,245 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .archive import merged, partitions
+from .models import MonthlyAttendance, DepartmentMonthlyAttendance
+
+
+def late_after():
+    # Heure locale au-delà de laquelle une arrivée compte comme un retard
+    return datetime.time.fromisoformat(getattr(settings, 'ATTENDANCE_LATE_AFTER', '09:00'))
+
+
+def month_bounds(year, month):
+    first = datetime.date(year, month, 1)
+    following = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return first, following
+
+
+def _attendance_totals(**group):
+    return dict(
+        days_present=Count('id', filter=Q(check_in__isnull=False)),
+        total_hours=Sum('worked_hours'),
+        late_arrivals=Count('id', filter=Q(check_in__time__gt=late_after())),
+        **group,
+    )
+
+
+def _combine(parts):
+    # additionne des totaux (_attendance_totals) calculés séparément ; Sum vaut None sans ligne
+    combined = {}
+    for part in parts:
+        for key in ('rows', 'days_present', 'total_hours', 'late_arrivals'):
+            if key not in part:
+                continue
+            value = part[key]
+            if value is not None:
+                combined[key] = (combined.get(key) or 0) + value
+            else:
+                combined.setdefault(key, None)
+    return combined
+
+
+def _department_scope(department_ids):
+    # department_id__in ne couvre pas NULL (employés sans département)
+    scope = Q(department_id__in=[pk for pk in department_ids if pk is not None])
+    if None in department_ids:
+        scope |= Q(department_id__isnull=True)
+    return scope
+
+
+def refresh_month(employee_ids, year, month):
+    """Recalcule les agrégats d'un mois pour un ensemble d'employés, en requêtes groupées.
+
+    Un GROUP BY par partition, un upsert des agrégats employés, puis les départements
+    concernés (anciens et nouveaux) : le nombre de requêtes ne dépend pas du nombre d'employés.
+    """
+    first, following = month_bounds(year, month)
+    employee_ids = sorted(employee_ids)
+    parts, departments_now = defaultdict(list), {}
+    # un mois clos peut être dans l'archive : somme sur les partitions concernées
+    for model in partitions(first):
+        rows = (
+            model.objects.filter(employee_id__in=employee_ids, work_date__gte=first, work_date__lt=following)
+            .values('employee_id', 'employee__department_id')
+            .annotate(rows=Count('id'), **_attendance_totals())
+            .order_by()
+        )
+        for row in rows:
+            parts[row['employee_id']].append(row)
+            departments_now[row['employee_id']] = row['employee__department_id']
+    previous = dict(
+        MonthlyAttendance.objects.filter(employee_id__in=employee_ids, year=year, month=month)
+        .values_list('employee_id', 'department_id')
+    )
+    gone = [pk for pk in previous if pk not in parts]
+    if gone:
+        MonthlyAttendance.objects.filter(employee_id__in=gone, year=year, month=month).delete()
+    if parts:
+        rows = []
+        for employee_id, employee_parts in parts.items():
+            totals = _combine(employee_parts)
+            rows.append(MonthlyAttendance(
+                employee_id=employee_id,
+                department_id=departments_now[employee_id],
+                year=year,
+                month=month,
+                days_present=totals['days_present'],
+                total_hours=totals['total_hours'] or Decimal('0.00'),
+                late_arrivals=totals['late_arrivals'],
+            ))
+        MonthlyAttendance.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=['department', 'days_present', 'total_hours', 'late_arrivals'],
+        )
+    refresh_department_months(set(previous.values()) | set(departments_now.values()), year, month)
+
+
+def refresh_department_months(department_ids, year, month):
+    """Recalcule les agrégats d'un mois pour des départements, à partir des agrégats de leurs employés."""
+    if not department_ids:
+        return
+    totals = {
+        row['department_id']: row
+        for row in MonthlyAttendance.objects.filter(_department_scope(department_ids), year=year, month=month)
+        .values('department_id')
+        .annotate(
+            employees=Count('id'),
+            sum_days=Sum('days_present'),
+            sum_hours=Sum('total_hours'),
+            sum_late=Sum('late_arrivals'),
+        )
+        .order_by()
+    }
+    empty = set(department_ids) - totals.keys()
+    if empty:
+        DepartmentMonthlyAttendance.objects.filter(_department_scope(empty), year=year, month=month).delete()
+    rows = [
+        DepartmentMonthlyAttendance(
+            department_id=department_id,
+            year=year,
+            month=month,
+            employees=row['employees'],
+            days_present=row['sum_days'],
+            total_hours=row['sum_hours'] or Decimal('0.00'),
+            late_arrivals=row['sum_late'],
+        )
+        for department_id, row in totals.items()
+    ]
+    named = [row for row in rows if row.department_id is not None]
+    if named:
+        DepartmentMonthlyAttendance.objects.bulk_create(
+            named,
+            update_conflicts=True,
+            unique_fields=['department', 'year', 'month'],
+            update_fields=['employees', 'days_present', 'total_hours', 'late_arrivals'],
+        )
+    for row in rows:
+        if row.department_id is None:
+            # NULL n'entre pas en conflit dans un index unique : pas d'upsert possible
+            DepartmentMonthlyAttendance.objects.update_or_create(
+                department_id=None, year=year, month=month,
+                defaults={field: getattr(row, field) for field in ('employees', 'days_present', 'total_hours', 'late_arrivals')},
+            )
+
+
+def refresh_attendance_keys(keys):
+    """Met à jour les agrégats touchés par des lignes (employee_id, work_date) modifiées, mois par mois."""
+    months = defaultdict(set)
+    for employee_id, day in keys:
+        if employee_id and day:
+            months[(day.year, day.month)].add(employee_id)
+    with transaction.atomic():
+        for (year, month), employee_ids in sorted(months.items()):
+            refresh_month(employee_ids, year, month)
+
+
+def employee_departments(employee_id):
+    """{(année, mois): ids des départements} des agrégats d'un employé, à lire avant sa suppression."""
+    months = defaultdict(set)
+    rows = MonthlyAttendance.objects.filter(employee_id=employee_id).values_list('department_id', 'year', 'month')
+    for department_id, year, month in rows:
+        months[(year, month)].add(department_id)
+    return months
+
+
+def refresh_department_keys(months):
+    """Met à jour les agrégats de départements ({(année, mois): ids}), mois par mois."""
+    with transaction.atomic():
+        for (year, month), department_ids in sorted(months.items()):
+            refresh_department_months(department_ids, year, month)
+
+
+def rebuild(batch_size=1000):
+    """Reconstruit tous les agrégats en deux requêtes GROUP BY."""
+    with transaction.atomic():
+        DepartmentMonthlyAttendance.objects.all().delete()
+        MonthlyAttendance.objects.all().delete()
+        key = itemgetter('employee_id', 'year', 'month')
+        rows = merged((
+            model.objects
+            .annotate(year=ExtractYear('work_date'), month=ExtractMonth('work_date'))
+            .values('employee_id', 'employee__department_id', 'year', 'month')
+            .annotate(**_attendance_totals())
+            .order_by('employee_id', 'year', 'month')
+            .iterator(chunk_size=batch_size)
+            for model in partitions()
+        ), key)
+        batch = []
+        created = 0
+        for _, parts in groupby(rows, key):
+            parts = list(parts)
+            row = {**parts[0], **_combine(parts)} if len(parts) > 1 else parts[0]
+            batch.append(MonthlyAttendance(
+                employee_id=row['employee_id'],
+                department_id=row['employee__department_id'],
+                year=row['year'],
+                month=row['month'],
+                days_present=row['days_present'],
+                total_hours=row['total_hours'] or Decimal('0.00'),
+                late_arrivals=row['late_arrivals'],
+            ))
+            if len(batch) >= batch_size:
+                MonthlyAttendance.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        MonthlyAttendance.objects.bulk_create(batch)
+        created += len(batch)
+
+        departments = (
+            MonthlyAttendance.objects
+            .values('department_id', 'year', 'month')
+            .annotate(
+                employees=Count('id'),
+                sum_days=Sum('days_present'),
+                sum_hours=Sum('total_hours'),
+                sum_late=Sum('late_arrivals'),
+            )
+            .order_by()
+        )
+        DepartmentMonthlyAttendance.objects.bulk_create(
+            (
+                DepartmentMonthlyAttendance(
+                    department_id=row['department_id'],
+                    year=row['year'],
+                    month=row['month'],
+                    employees=row['employees'],
+                    days_present=row['sum_days'],
+                    total_hours=row['sum_hours'],
+                    late_arrivals=row['sum_late'],
+                )
+                for row in departments.iterator(chunk_size=batch_size)
+            ),
+            batch_size=batch_size,
+        )
+    return created
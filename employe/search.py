@@ -0,0 +1,265 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from .cache import departments
+from .models import Department, Employe
+
+SEARCH_LIMIT = 50
+SEARCH_TABLE = 'employe_search'
+
+# Poids des colonnes dans le classement : un nom qui correspond compte plus qu'un poste
+WEIGHTS = {'nom': 10.0, 'email': 5.0, 'poste': 2.0, 'department': 1.0}
+
+# Même découpage que le tokenizer unicode61 : lettres et chiffres, le reste sépare
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    """Minuscules sans accents : « Hélène » et « helene » donnent le même mot."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokens(text):
+    return _TOKEN.findall(normalize(text))
+
+
+def _documents(employes):
+    names = {pk: department.name for pk, department in departments().items()}
+    for employe in employes:
+        yield (employe.pk, employe.nom, employe.email, employe.poste,
+               names.get(employe.department_id, ''), employe.department_id)
+
+
+def _all_employes(batch_size=2000):
+    batch = []
+    for employe in Employe.objects.only('id', 'nom', 'email', 'poste', 'department').iterator(chunk_size=batch_size):
+        batch.append(employe)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FTS5Index:
+    """Table virtuelle FTS5 (migration 0010) : mise à jour dans la transaction de l'écriture."""
+
+    def search(self, query, limit):
+        words = tokens(query)
+        if not words:
+            return []
+        # Mots entre guillemets (aucune syntaxe FTS5 possible depuis la saisie), dernier en préfixe
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        weights = ', '.join(str(weight) for weight in WEIGHTS.values())
+        sql = f"""
+            SELECT rowid, bm25({SEARCH_TABLE}, {weights}, 0) AS score FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s ORDER BY score LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match, limit])
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+    def index(self, employes):
+        rows = list(_documents(employes))
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, nom, email, poste, department, department_id) '
+                f'VALUES (%s, %s, %s, %s, %s, %s)', rows,
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def department_changed(self, department_id, name):
+        with connection.cursor() as cursor:
+            if name is None:
+                cursor.execute(
+                    f"UPDATE {SEARCH_TABLE} SET department = '', department_id = NULL WHERE department_id = %s",
+                    [department_id],
+                )
+            else:
+                cursor.execute(
+                    f'UPDATE {SEARCH_TABLE} SET department = %s WHERE department_id = %s', [name, department_id],
+                )
+
+    def rebuild(self):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            count = 0
+            for batch in _all_employes():
+                self.index(batch)
+                count += len(batch)
+        return count
+
+
+class InvertedIndex:
+    """Index inversé en mémoire, par processus : mot -> {id employé: poids de la meilleure colonne}.
+
+    Construit au premier usage, tenu à jour par les signaux de ce processus (après commit)
+    et reconstruit quand un autre processus a modifié les employés ou les départements,
+    ce que révèlent le nombre de lignes et le dernier ``updated_at``.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.vocabulary = []
+        self.documents = {}
+        self.stamp = None
+        self.built = False
+
+    @staticmethod
+    def _current_stamp():
+        return (
+            Employe.objects.aggregate(rows=Count('id'), last=Max('updated_at')),
+            Department.objects.aggregate(rows=Count('id'), last=Max('updated_at')),
+        )
+
+    def _ensure_fresh(self):
+        stamp = self._current_stamp()
+        if not self.built or (self.stamp is not None and stamp != self.stamp):
+            self.rebuild()
+        # après une mise à jour locale, l'état courant est celui de l'index
+        self.stamp = stamp
+
+    def _add(self, pk, nom, email, poste, department, department_id):
+        weights = {}
+        for column, text in zip(WEIGHTS, (nom, email, poste, department)):
+            for word in tokens(text):
+                weights[word] = max(weights.get(word, 0), WEIGHTS[column])
+        for word, weight in weights.items():
+            if word not in self.postings:
+                bisect.insort(self.vocabulary, word)
+            self.postings[word][pk] = weight
+        self.documents[pk] = (set(weights), department_id)
+
+    def _discard(self, pk):
+        words, _ = self.documents.pop(pk, ((), None))
+        for word in words:
+            self.postings[word].pop(pk, None)
+
+    def _prefixed(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            yield word
+
+    def search(self, query, limit):
+        words = tokens(query)
+        if not words:
+            return []
+        self._ensure_fresh()
+        scores = None
+        for position, word in enumerate(words):
+            matched = {}
+            for candidate in (self._prefixed(word) if position == len(words) - 1 else (word,)):
+                for pk, weight in self.postings.get(candidate, {}).items():
+                    if weight > matched.get(pk, 0):
+                        matched[pk] = weight
+            if scores is not None:
+                matched = {pk: scores[pk] + weight for pk, weight in matched.items() if pk in scores}
+            scores = matched
+            if not scores:
+                return []
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _after_commit(self, update):
+        # l'index n'est pas transactionnel : rien n'est appliqué si l'écriture est annulée
+        if not self.built:
+            return
+
+        def apply():
+            update()
+            self.stamp = None
+        transaction.on_commit(apply)
+
+    def index(self, employes):
+        rows = list(_documents(employes))
+
+        def update():
+            for row in rows:
+                self._discard(row[0])
+                self._add(*row)
+        self._after_commit(update)
+
+    def remove(self, ids):
+        ids = list(ids)
+
+        def update():
+            for pk in ids:
+                self._discard(pk)
+        self._after_commit(update)
+
+    def department_changed(self, department_id, name):
+        def update():
+            members = [pk for pk, (_, member_of) in self.documents.items() if member_of == department_id]
+            self.index_now(Employe.objects.filter(pk__in=members))
+        self._after_commit(update)
+
+    def index_now(self, employes):
+        for row in _documents(employes):
+            self._discard(row[0])
+            self._add(*row)
+
+    def rebuild(self):
+        self.postings.clear()
+        self.vocabulary = []
+        self.documents.clear()
+        for batch in _all_employes():
+            self.index_now(batch)
+        self.built = True
+        return len(self.documents)
+
+
+_backend = None
+
+
+def backend():
+    """FTS5 si la table ``employe_search`` existe (SQLite avec FTS5), sinon l'index en mémoire."""
+    global _backend
+    if _backend is None:
+        has_table = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        _backend = FTS5Index() if has_table else InvertedIndex()
+    return _backend
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """Employés correspondant à tous les mots de ``query`` (le dernier en préfixe), les plus pertinents d'abord."""
+    ranked = backend().search(query, limit)
+    employes = Employe.objects.in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, score in ranked:
+        if pk in employes:
+            employe = employes[pk]
+            employe.score = score
+            results.append(employe)
+    return results
+
+
+def index_employes(employes):
+    backend().index(employes)
+
+
+def remove_employes(ids):
+    backend().remove(ids)
+
+
+def department_changed(department_id, name=None):
+    """Nouveau nom d'un département pour ses employés ; ``name=None`` : département supprimé."""
+    backend().department_changed(department_id, name)
+
+
+def rebuild():
+    return backend().rebuild()
@@ -0,0 +1,135 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Employe, Department, Attendance, LeaveRequest, ledger_state
+from .cache import invalidate
+from .kpis import invalidate_kpis
+from .leave_ledger import record_change
+from .rollups import employee_departments, refresh_attendance_keys, refresh_department_keys
+from . import audit, search
+
+
+# Les indicateurs du tableau de bord sont recalculés au prochain affichage
+@receiver([post_save, post_delete], sender=Employe)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def kpis_changed(sender, **kwargs):
+    invalidate_kpis()
+
+
+# Cache des listes de choix et des objets par id
+@receiver([post_save, post_delete], sender=Employe)
+def employe_cache_changed(sender, **kwargs):
+    invalidate('employe')
+
+
+@receiver(post_save, sender=Department)
+def department_cache_changed(sender, **kwargs):
+    invalidate('department')
+
+
+@receiver(post_delete, sender=Department)
+def department_cache_deleted(sender, **kwargs):
+    # SET_NULL sur les employés : une mise à jour en masse, sans signal pour eux
+    invalidate('department', 'employe')
+
+
+# Versions des présences et des congés (validateurs de l'API)
+@receiver([post_save, post_delete], sender=Attendance)
+def attendance_cache_changed(sender, **kwargs):
+    invalidate('attendance')
+
+
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def leave_cache_changed(sender, **kwargs):
+    invalidate('leave')
+
+
+# Index de recherche plein texte (FTS5 : dans la transaction ; index en mémoire : après commit)
+@receiver(post_save, sender=Employe)
+def search_employe_saved(sender, instance, **kwargs):
+    search.index_employes([instance])
+
+
+@receiver(post_delete, sender=Employe)
+def search_employe_deleted(sender, instance, **kwargs):
+    search.remove_employes([instance.pk])
+
+
+@receiver(post_save, sender=Department)
+def search_department_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.department_changed(instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Department)
+def search_department_deleted(sender, instance, **kwargs):
+    search.department_changed(instance.pk)
+
+
+def _origin_model(origin):
+    # modèle à l'origine d'une suppression (instance ou queryset supprimé)
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin) if origin is not None else None
+
+
+# Agrégats mensuels : recalcul du mois courant et, si la ligne a changé de mois, de l'ancien
+@receiver(post_save, sender=Attendance)
+def attendance_rollups_changed(sender, instance, **kwargs):
+    keys = {(instance.employee_id, instance.work_date), getattr(instance, '_loaded_key', (None, None))}
+    refresh_attendance_keys(keys)
+    instance._loaded_key = (instance.employee_id, instance.work_date)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_rollups_deleted(sender, instance, origin=None, **kwargs):
+    # suppression en cascade d'un employé : ses agrégats partent avec lui, les
+    # départements sont recalculés une fois (employe_rollups_deleted)
+    if _origin_model(origin) is Attendance:
+        refresh_attendance_keys({(instance.employee_id, instance.work_date)})
+
+
+@receiver(pre_delete, sender=Employe)
+def employe_rollups_deleting(sender, instance, **kwargs):
+    # lus avant la cascade, qui supprime ses agrégats sans signal
+    instance._rollup_months = employee_departments(instance.pk)
+
+
+@receiver(post_delete, sender=Employe)
+def employe_rollups_deleted(sender, instance, **kwargs):
+    refresh_department_keys(getattr(instance, '_rollup_months', {}))
+
+
+# Grand livre des congés : seule la différence entre l'état chargé et l'état enregistré est passée
+@receiver(post_save, sender=LeaveRequest)
+def leave_ledger_saved(sender, instance, **kwargs):
+    current = ledger_state(instance)
+    record_change(instance.pk, getattr(instance, '_ledger_state', None), current)
+    instance._ledger_state = current
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def leave_ledger_deleted(sender, instance, origin=None, **kwargs):
+    # suppression en cascade d'un employé : son solde disparaît avec lui, rien à restituer
+    if _origin_model(origin) is LeaveRequest:
+        record_change(None, getattr(instance, '_ledger_state', None), None)
+
+
+# Journal d'audit : différences champ par champ, écrites en un lot au commit de la transaction
+@receiver(post_save, sender=Employe)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=LeaveRequest)
+def audit_saved(sender, instance, created, **kwargs):
+    audit.record(instance, audit.CREATED if created else audit.UPDATED)
+
+
+@receiver(post_delete, sender=Employe)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=LeaveRequest)
+def audit_deleted(sender, instance, **kwargs):
+    audit.record(instance, audit.DELETED)
@@ -1,20 +1,191 @@
+import asyncio
 import os
-from typing import Optional
+import threading
+import time
 
 try:
-    from supabase import create_client, Client
-except Exception:  # supabase-py not installed yet
-    create_client = None
-    Client = None
+    from supabase import acreate_client, AsyncClientOptions
+except Exception:  # supabase-py not installed, or too old for the async client
+    acreate_client = None
+    AsyncClientOptions = None
+
+try:
+    import httpx
+except Exception:  # installed alongside supabase-py
+    httpx = None
+
+
+# Délai maximal (secondes) d'un appel HTTP vers Supabase Auth
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "5"))
+# Nombre d'échecs consécutifs avant d'ouvrir le disjoncteur, puis durée d'ouverture
+SUPABASE_BREAKER_THRESHOLD = int(os.getenv("SUPABASE_BREAKER_THRESHOLD", "5"))
+SUPABASE_BREAKER_RESET = float(os.getenv("SUPABASE_BREAKER_RESET", "30"))
+
+
+class SupabaseUnavailable(Exception):
+    """Supabase Auth est lent ou hors service : utiliser l'authentification Django."""
+
+
+class CircuitBreaker:
+    """Disjoncteur : après ``failure_threshold`` échecs, les appels sont refusés
+    pendant ``reset_timeout`` secondes, puis un seul appel d'essai est autorisé."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        # appel interrompu sans réponse (annulé) : ni succès ni échec, l'essai est libéré
+        with self._lock:
+            self._trial_in_flight = False
+
+
+auth_breaker = CircuitBreaker(SUPABASE_BREAKER_THRESHOLD, SUPABASE_BREAKER_RESET)
+
+def _http_timeout():
+    return httpx.Timeout(SUPABASE_TIMEOUT, connect=min(SUPABASE_TIMEOUT, 2.0))
 
 
-def get_supabase_client() -> Optional["Client"]:
+# Client Supabase des vues d'authentification (toutes async) : un seul par processus. Un
+# httpx.AsyncClient est lié à la boucle qui l'a créé et, sous WSGI, chaque vue async tourne
+# dans une boucle éphémère (un client par connexion, jamais fermé) : le client et ses appels
+# vivent donc sur une boucle dédiée, dans un thread de fond, partagée par toutes les requêtes.
+_async_loop = None
+_async_client = None
+_async_client_config = None
+_async_http_client = None
+_async_loop_lock = threading.Lock()
+
+
+def _auth_loop():
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name='supabase-auth', daemon=True).start()
+    return _async_loop
+
+
+async def _on_auth_loop(coro):
+    # exécute ``coro`` sur la boucle dédiée ; l'appelant attend sans bloquer sa propre boucle
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _auth_loop()))
+
+
+async def _build_async_client(url, key):
+    # tourne sur la boucle dédiée : les constructions concurrentes s'y succèdent
+    global _async_client, _async_client_config, _async_http_client
+    http_client = httpx.AsyncClient(
+        timeout=_http_timeout(),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    options = AsyncClientOptions(
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=SUPABASE_TIMEOUT,
+        httpx_client=http_client,
+    )
+    try:
+        client = await acreate_client(url, key, options)
+    except Exception:
+        await http_client.aclose()
+        raise
+    if _async_client is not None and _async_client_config == (url, key):
+        # construit entre-temps par une autre requête
+        await http_client.aclose()
+        return _async_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    _async_client, _async_client_config, _async_http_client = client, (url, key), http_client
+    return client
+
+
+async def aget_supabase_client():
+    """Client partagé du processus (pool keep-alive, délais bornés) ; None si Supabase
+    n'est pas configuré ou injoignable à la création."""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_ANON_KEY")
-    if not url or not key or create_client is None:
+    if not url or not key or acreate_client is None or httpx is None:
         return None
+    if _async_client is not None and _async_client_config == (url, key):
+        return _async_client
     try:
-        return create_client(url, key)
+        return await _on_auth_loop(_build_async_client(url, key))
     except Exception:
         return None
 
+
+def reset_supabase_client():
+    """Ferme le pool HTTP et oublie le client (changement de configuration, tests)."""
+    global _async_client, _async_client_config, _async_http_client
+    if _async_http_client is not None:
+        asyncio.run_coroutine_threadsafe(_async_http_client.aclose(), _auth_loop()).result(SUPABASE_TIMEOUT)
+    _async_client = _async_client_config = _async_http_client = None
+
+
+def is_service_failure(exc):
+    # Les erreurs 4xx (identifiants invalides, email déjà utilisé...) ne sont pas des pannes
+    status = getattr(exc, 'status', None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return False
+    return True
+
+
+async def asupabase_auth(sb, method, *args):
+    """Appelle ``sb.auth.<method>`` à travers le disjoncteur.
+
+    Lève ``SupabaseUnavailable`` si le disjoncteur est ouvert ou si le service
+    est en panne ; les autres erreurs (4xx) sont propagées telles quelles.
+    """
+    if not auth_breaker.allow_request():
+        raise SupabaseUnavailable()
+    try:
+        # le client asynchrone n'est utilisable que sur la boucle qui l'a créé
+        result = await _on_auth_loop(getattr(sb.auth, method)(*args))
+    except Exception as exc:
+        if is_service_failure(exc):
+            auth_breaker.record_failure()
+            raise SupabaseUnavailable() from exc
+        auth_breaker.record_success()
+        raise
+    except BaseException:
+        # annulation (client déconnecté), interruption : l'essai du disjoncteur ne reste pas pris
+        auth_breaker.release_trial()
+        raise
+    auth_breaker.record_success()
+    return result
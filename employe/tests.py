@@ -1,3 +1,1844 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import math
+import os
+import random
+import re
+import runpy
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal, ROUND_HALF_UP
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.db.utils import ConnectionHandler
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from . import aio, analytics, archive, audit, autocomplete, cache as object_cache, clock, exports, importers, kpis, leave_coverage, leave_ledger, live, middleware, pagination, payroll, rollups, search, supabase_client, views
+from .models import (
+    Employe, Department, Attendance, ArchivedAttendance, AuditEntry, LeaveRequest, LeaveBalance, LeaveLedgerEntry,
+    MonthlyAttendance, DepartmentMonthlyAttendance,
+)
+from .form import AttendanceForm, CachedModelChoiceField, EmployeChoiceField, EmployeForm, LeaveRequestForm
+from .management.commands import bench_routes
+from .pagination import KeysetPaginator
+from .supabase_client import CircuitBreaker, reset_supabase_client
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    """Faux serveur Supabase Auth : le comportement est piloté par ``server.mode``."""
+
+    def do_POST(self):
+        self.server.hits += 1
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.server.mode == 'slow':
+            time.sleep(0.5)
+        elif self.server.mode == 'slow_invalid':
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.peak = max(self.server.peak, self.server.in_flight)
+            time.sleep(0.3)
+            with self.server.lock:
+                self.server.in_flight -= 1
+        status, body = {
+            'down': (503, {'msg': 'unavailable'}),
+            'invalid': (400, {'error': 'invalid_grant', 'error_description': 'Invalid login credentials'}),
+            'slow_invalid': (400, {'error': 'invalid_grant', 'error_description': 'Invalid login credentials'}),
+        }.get(self.server.mode, (503, {}))
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class CircuitBreakerTests(TestCase):
+    def test_opens_after_threshold_then_allows_single_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow_request())
+        now[0] = 11
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_cancelled_trial_is_released(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 11
+        started = threading.Event()
+
+        async def hang(*args):
+            started.set()
+            await asyncio.sleep(60)
+
+        sb = mock.Mock()
+        sb.auth.sign_in_with_password = hang
+
+        async def cancel_trial():
+            # essai du disjoncteur entrouvert, annulé (navigateur parti) avant la réponse
+            task = asyncio.ensure_future(supabase_client.asupabase_auth(sb, 'sign_in_with_password', {}))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.object(supabase_client, 'auth_breaker', breaker):
+            async_to_sync(cancel_trial)()
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow_request())
+
+
+@skipIf(supabase_client.acreate_client is None, "supabase-py n'est pas installé")
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SupabaseStubServerTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubAuthHandler)
+        self.server.mode = 'down'
+        self.server.hits = 0
+        self.server.lock, self.server.in_flight, self.server.peak = threading.Lock(), 0, 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        env = mock.patch.dict(os.environ, {
+            'SUPABASE_URL': f'http://127.0.0.1:{self.server.server_port}',
+            'SUPABASE_ANON_KEY': 'test-key',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        breaker = mock.patch.object(supabase_client, 'auth_breaker', CircuitBreaker(2, 60))
+        breaker.start()
+        self.addCleanup(breaker.stop)
+        timeout = mock.patch.object(supabase_client, 'SUPABASE_TIMEOUT', 0.2)
+        timeout.start()
+        self.addCleanup(timeout.stop)
+        reset_supabase_client()
+        self.addCleanup(reset_supabase_client)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        User.objects.create_user('ana', 'ana@example.com', 'secret-pass')
+
+    def login(self):
+        return self.client.post('/login/', {'email': 'ana@example.com', 'password': 'secret-pass'})
+
+    def test_outage_falls_back_to_django_auth_and_opens_breaker(self):
+        for _ in range(4):
+            self.client.logout()
+            response = self.login()
+            self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        # Après deux échecs, le disjoncteur ne contacte plus le service
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(supabase_client.auth_breaker.state, 'open')
+
+    def test_slow_service_is_cut_by_timeout(self):
+        self.server.mode = 'slow'
+        started = time.monotonic()
+        response = self.login()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+
+    async def test_async_logins_wait_concurrently(self):
+        # 8 connexions simultanées à un service qui répond en 0,3 s : l'attente ne bloque pas de thread
+        self.server.mode = 'slow_invalid'
+        with mock.patch.object(supabase_client, 'SUPABASE_TIMEOUT', 2):
+            responses = await asyncio.gather(*(
+                self.async_client.post('/login/', {'email': 'ana@example.com', 'password': 'x'})
+                for _ in range(8)
+            ))
+        self.assertEqual([r.status_code for r in responses], [200] * 8)
+        self.assertEqual(self.server.hits, 8)
+        # les appels se chevauchent chez le service au lieu de s'enchaîner
+        self.assertGreater(self.server.peak, 1)
+
+    def test_async_client_is_shared_by_short_lived_loops(self):
+        # sous WSGI chaque vue async a sa propre boucle : le client n'en dépend pas
+        self.server.mode = 'invalid'
+        first = async_to_sync(supabase_client.aget_supabase_client)()
+        self.assertIs(async_to_sync(supabase_client.aget_supabase_client)(), first)
+        for _ in range(2):
+            self.assertEqual(self.client.post('/login/', {'email': 'ana@example.com', 'password': 'x'}).status_code, 200)
+        self.assertEqual(self.server.hits, 2)
+        http_client = supabase_client._async_http_client
+        reset_supabase_client()
+        self.assertTrue(http_client.is_closed)
+
+    def test_invalid_credentials_do_not_trip_breaker(self):
+        self.server.mode = 'invalid'
+        for _ in range(3):
+            response = self.login()
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(supabase_client.auth_breaker.state, 'closed')
+
+
+class QueryPlanTests(TestCase):
+    """Les requêtes fréquentes doivent passer par un index (EXPLAIN QUERY PLAN SQLite)."""
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, queryset):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plans vérifiés sur SQLite uniquement')
+        plan = self.query_plan(queryset)
+        full_scans = [step for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+        self.assertEqual(full_scans, [], plan)
+        return plan
+
+    def keyset_page(self, sort_field, descending=False):
+        # requête d'une page suivante telle que construite par KeysetPaginator
+        paginator = KeysetPaginator(Employe.objects.select_related('department'), sort_field, descending)
+        value = Employe._meta.get_field(sort_field).to_python('2024-01-01' if sort_field == 'hire_date' else '100')
+        return paginator.queryset.filter(paginator._after(value, 1)).order_by(*paginator._ordering())[:51]
+
+    def test_attendance_by_work_date(self):
+        today = timezone.localdate()
+        plan = self.assertNoFullScan(Attendance.objects.filter(work_date=today))
+        self.assertTrue(any('attendance_work_date_idx' in step for step in plan), plan)
+        self.assertNoFullScan(Attendance.objects.filter(work_date__gte=today).order_by('work_date', 'id'))
+        plan = self.assertNoFullScan(ArchivedAttendance.objects.filter(work_date__gte=today).order_by('work_date', 'id'))
+        self.assertTrue(any('attendance_archive_date_idx' in step for step in plan), plan)
+
+    def test_pending_leaves_use_partial_index(self):
+        plan = self.assertNoFullScan(LeaveRequest.objects.filter(status='pending').order_by('-created_at'))
+        self.assertTrue(any('leave_pending_idx' in step for step in plan), plan)
+
+    def test_leave_list_ordering(self):
+        plan = self.assertNoFullScan(LeaveRequest.objects.select_related('employee').order_by('-created_at'))
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_recent_employees_walk_primary_key(self):
+        plan = self.query_plan(Employe.objects.order_by('-id')[:5])
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_leave_overlap_queries_seek_employee_range(self):
+        day = datetime.date(2025, 3, 3)
+        plan = self.assertNoFullScan(leave_coverage.overlapping(1, day, day))
+        self.assertTrue(any('leave_employee_range_idx' in step for step in plan), plan)
+        self.assertNoFullScan(leave_coverage.who_is_off(1, day, day))
+
+    def test_autocomplete_seeks_prefix_indexes(self):
+        for field in ('nom', 'email'):
+            with self.subTest(field=field):
+                plan = self.assertNoFullScan(autocomplete.prefix_matches(field, 'aw', 10))
+                self.assertTrue(any(f'employe_{field}_lower_idx' in step for step in plan), plan)
+                self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_employee_directory_sorts(self):
+        for sort_field in ('nom', 'hire_date', 'salaire'):
+            for descending in (False, True):
+                with self.subTest(sort_field=sort_field, descending=descending):
+                    plan = self.assertNoFullScan(self.keyset_page(sort_field, descending))
+                    self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+
+class DatabaseProfileTests(TestCase):
+    def profile_databases(self, profile):
+        # réglages relus comme au démarrage, avec DJANGO_DB_PROFILE=profile
+        with mock.patch.dict(os.environ, DJANGO_DB_PROFILE=profile):
+            return runpy.run_path(sys.modules[settings.SETTINGS_MODULE].__file__)['DATABASES']
+
+    def test_default_profile_has_no_pragmas(self):
+        self.assertNotIn('OPTIONS', self.profile_databases('')['default'])
+
+    def test_production_pragmas_on_each_connection(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('profil SQLite')
+        default = self.profile_databases('production')['default']
+        self.assertEqual(default['CONN_MAX_AGE'], 600)
+
+        def pragmas(path):
+            # connexion du profil de production installée comme django.db.connection de ce thread
+            connections['default'] = ConnectionHandler({'default': {**default, 'NAME': path}})['default']
+            try:
+                with connection.cursor() as cursor:
+                    values = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store'):
+                        cursor.execute(f'PRAGMA {name}')
+                        values[name] = cursor.fetchone()[0]
+                return values, connection.transaction_mode
+            finally:
+                connection.close()
+                del connections['default']
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ThreadPoolExecutor(1) as pool:
+                values, transaction_mode = pool.submit(pragmas, os.path.join(directory, 'db.sqlite3')).result()
+        # synchronous : 1 = NORMAL ; temp_store : 2 = MEMORY
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000, 'temp_store': 2})
+        self.assertEqual(transaction_mode, 'IMMEDIATE')
+
+
+class EmployeImportTests(TestCase):
+    header = 'nom;email;poste;salaire;département;date_embauche\n'
+
+    def setUp(self):
+        self.it = Department.objects.create(name='IT')
+
+    def rows(self, text, name='employes.csv'):
+        return importers.iter_rows(io.BytesIO(text.encode() if isinstance(text, str) else text), name)
+
+    def line(self, n, department='IT'):
+        return f'Agent {n};agent{n}@example.com;Agent;1000;{department};2024-01-15\n'
+
+    def command(self, content, *args, suffix='.csv'):
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as fileobj:
+            fileobj.write(content)
+        self.addCleanup(os.remove, fileobj.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_employes', fileobj.name, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_row_errors_are_reported_by_line(self):
+        report = importers.import_employes(self.rows(
+            self.header
+            + self.line(1, department='  it ')
+            + ' ;vide@example.com;Agent;1000;IT;2024-01-15\n'
+            + 'Sans poste;poste@example.com; ;1000;IT;2024-01-15\n'
+            + 'Négatif;neg@example.com;Agent;-5;IT;2024-01-15\n'
+            + 'Inconnu;inconnu@example.com;Agent;1000;Ventes;2024-01-15\n'
+            + 'Sans département;sans@example.com;Agent;1000;;2024-01-15\n'
+        ))
+        self.assertEqual(report.created, 1)
+        # département résolu sans tenir compte de la casse ni des espaces
+        self.assertEqual(Employe.objects.get().department, self.it)
+        errors = dict(report.errors)
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 7])
+        # les blancs sont retirés avant clean_nom/clean_poste : champ vide
+        self.assertEqual(errors[3], "nom: Le nom est obligatoire.")
+        self.assertEqual(errors[4], "poste: Le poste est obligatoire.")
+        self.assertEqual(errors[5], "salaire: Le salaire doit être un nombre positif.")
+        self.assertIn("Département inconnu « Ventes »", errors[6])
+        self.assertIn("Le département est obligatoire.", errors[7])
+
+    def test_departments_are_resolved_once(self):
+        text = self.header + ''.join(self.line(n) for n in range(20))
+        with CaptureQueriesContext(connection) as queries:
+            importers.import_employes(self.rows(text), batch_size=50)
+        self.assertEqual(sum('FROM "employe_department"' in q['sql'] for q in queries.captured_queries), 1)
+
+    def test_batch_size_and_dry_run(self):
+        content = (self.header + ''.join(self.line(n) for n in range(5))).encode()
+        with mock.patch.object(importers, 'index_employes', wraps=importers.index_employes) as flushed:
+            out, _ = self.command(content, '--batch-size', '2')
+        self.assertEqual(flushed.call_count, 3)
+        self.assertIn("5 employé(s) importé(s), 0 ligne(s) en erreur.", out)
+        self.assertEqual(Employe.objects.count(), 5)
+
+        out, _ = self.command(content.replace(b'@', b'+dry@'), '--dry-run')
+        self.assertIn("5 employé(s) validé(s)", out)
+        self.assertEqual(Employe.objects.count(), 5)
+        with self.assertRaises(CommandError):
+            self.command(content, '--batch-size', '0')
+
+    def test_xlsx_needs_openpyxl(self):
+        with mock.patch.object(importers, 'openpyxl', None):
+            with self.assertRaisesMessage(CommandError, "openpyxl"):
+                self.command(b'PK', suffix='.xlsx')
+
+    def test_undecodable_file_keeps_earlier_batches(self):
+        # le décodage se fait par blocs : l'erreur arrive après plusieurs lots déjà validés
+        valid = (self.header + ''.join(self.line(n) for n in range(400))).encode()
+        content = valid + b'Mauvais\xff;x@example.com;Agent;1000;IT;2024-01-15\n'
+        before = object_cache.versions('employe')
+        with self.assertRaises(importers.ImportFileError) as raised:
+            importers.import_employes(self.rows(content), batch_size=50)
+        created = raised.exception.report.created
+        self.assertGreater(created, 0)
+        self.assertLess(created, 400)
+        self.assertEqual(created % 50, 0)
+        self.assertEqual(Employe.objects.count(), created)
+        # caches invalidés malgré l'interruption
+        self.assertNotEqual(object_cache.versions('employe'), before)
+
+
+class KpiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        sales = Department.objects.create(name='Ventes')
+        self.awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000, department=sales)
+        self.ben = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        Attendance.objects.create(employee=self.awa, work_date=self.today, check_in=timezone.now(),
+                                  worked_hours=Decimal('7.50'))
+        Attendance.objects.create(employee=self.ben, work_date=self.today - datetime.timedelta(days=1),
+                                  check_in=timezone.now(), worked_hours=Decimal('8.00'))
+        LeaveRequest.objects.create(employee=self.ben, type='annual', start_date=self.today, end_date=self.today)
+
+    def test_totals_in_one_statement(self):
+        with self.assertNumQueries(1):
+            totals = kpis._totals(self.today)
+        self.assertEqual(totals[:4], (2, 1, 1, 1))
+        self.assertEqual(kpis._hours(totals[4]), Decimal('7.50'))
+        with self.assertNumQueries(2):
+            snapshot = kpis.compute_kpis(self.today)
+        self.assertEqual(snapshot['attendance_rate'], 50.0)
+        self.assertEqual(snapshot['total_hours'], Decimal('7.50'))
+        self.assertEqual([row['nom'] for row in snapshot['recent_employees']], ['Ben', 'Awa'])
+
+    def test_snapshot_served_from_cache(self):
+        snapshot = kpis.get_kpis()
+        self.assertEqual(cache.get(kpis.KPI_CACHE_KEY), snapshot)
+        with self.assertNumQueries(0):
+            self.assertEqual(kpis.get_kpis(), snapshot)
+        # instantané d'hier : recalculé
+        cache.set(kpis.KPI_CACHE_KEY, {**snapshot, 'day': self.today - datetime.timedelta(days=1)})
+        with self.assertNumQueries(2):
+            self.assertEqual(kpis.get_kpis()['day'], self.today)
+
+    def test_saves_invalidate_snapshot(self):
+        self.assertEqual(kpis.get_kpis()['present_count'], 1)
+        version = kpis.kpi_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=self.ben, work_date=self.today, check_in=timezone.now())
+        self.assertIsNone(cache.get(kpis.KPI_CACHE_KEY))
+        self.assertNotEqual(kpis.kpi_version(), version)
+        self.assertEqual(kpis.get_kpis()['present_count'], 2)
+
+        version = kpis.kpi_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Employe.objects.create(nom='Cy', email='cy@example.com', poste='Agent', salaire=1000)
+        self.assertIsNone(cache.get(kpis.KPI_CACHE_KEY))
+        self.assertNotEqual(kpis.kpi_version(), version)
+        snapshot = kpis.get_kpis()
+        self.assertEqual((snapshot['total_employees'], snapshot['attendance_rate']), (3, 66.67))
+
+
+class ClockServiceTests(TestCase):
+    def setUp(self):
+        self.employe = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        self.now = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+
+    def test_clock_in_is_idempotent(self):
+        self.assertEqual(clock.clock_in(self.employe.id, self.now), clock.RECORDED)
+        later = self.now + datetime.timedelta(minutes=5)
+        self.assertEqual(clock.clock_in(self.employe.id, later), clock.ALREADY_DONE)
+        self.assertEqual(Attendance.objects.get().check_in, self.now)
+
+    def test_clock_out_computes_hours_in_database(self):
+        self.assertEqual(clock.clock_out(self.employe.id, self.now), clock.NO_RECORD)
+        clock.clock_in(self.employe.id, self.now)
+        out = self.now + datetime.timedelta(hours=7, minutes=45, seconds=18)
+        self.assertEqual(clock.clock_out(self.employe.id, out), clock.RECORDED)
+        self.assertEqual(clock.clock_out(self.employe.id, out), clock.ALREADY_DONE)
+        record = Attendance.objects.get()
+        self.assertEqual(record.check_out, out)
+        self.assertEqual(record.worked_hours, Decimal('7.76'))
+
+    def test_punches_are_audited(self):
+        # avec RETURNING (SQLite >= 3.35, PostgreSQL) puis sans : mêmes entrées
+        for returning in (True, False):
+            with mock.patch.object(connection.features, 'can_return_columns_from_insert', returning):
+                self.assert_punches_audited(returning)
+
+    def assert_punches_audited(self, suffix):
+        awa, ben, cara = [
+            Employe.objects.create(nom=nom, email=f'{nom}-{suffix}@example.com', poste='Agent', salaire=1000)
+            for nom in ('a', 'b', 'c')
+        ]
+        out = self.now + datetime.timedelta(hours=7, minutes=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(employee=ben, work_date=self.now.date())
+            clock.clock_in(awa.id, self.now)
+            clock.clock_out(awa.id, out)
+            clock.clock_in(ben.id, self.now)
+            clock.apply_batch([
+                {'employee_id': ben.id, 'timestamp': out.isoformat(), 'direction': 'out'},
+                {'employee_id': cara.id, 'timestamp': self.now.isoformat(), 'direction': 'in'},
+            ])
+        history = lambda employe: [
+            (entry.action, entry.changes) for entry in audit.history(Attendance, Attendance.objects.get(employee=employe).pk)
+        ]
+        self.assertEqual(history(awa), [
+            ('u', {'check_out': [None, out.isoformat()], 'worked_hours': [None, '7.50']}),
+            ('c', {'check_in': [None, self.now.isoformat()], 'employee_id': [None, awa.id],
+                   'work_date': [None, self.now.date().isoformat()], 'worked_hours': [None, '0.00']}),
+        ])
+        self.assertEqual([(action, sorted(changes)) for action, changes in history(ben)], [
+            ('u', ['check_out', 'worked_hours']), ('u', ['check_in']), ('c', ['employee_id', 'work_date', 'worked_hours']),
+        ])
+        self.assertEqual(history(ben)[0][1]['worked_hours'], ['0.00', '7.50'])
+        self.assertEqual([(action, sorted(changes)) for action, changes in history(cara)], [
+            ('c', ['check_in', 'employee_id', 'work_date', 'worked_hours']),
+        ])
+
+
+@override_settings(KIOSK_API_TOKEN='secret')
+class ClockBatchTests(TestCase):
+    url = reverse_lazy('clock_batch')
+
+    def setUp(self):
+        self.awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        self.ben = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        self.day = timezone.localdate()
+
+    def at(self, hour):
+        return datetime.datetime.combine(self.day, datetime.time(hour)).isoformat()
+
+    def post(self, events, token='secret'):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token is not None else {}
+        return self.client.post(self.url, json.dumps({'events': events}), content_type='application/json', **headers)
+
+    def test_token_is_required(self):
+        event = {'employee_id': self.awa.pk, 'timestamp': self.at(8), 'direction': 'in'}
+        self.assertEqual(self.post([event], token=None).status_code, 401)
+        self.assertEqual(self.post([event], token='nope').status_code, 401)
+        self.assertEqual(self.post([event], token='sécret').status_code, 401)
+        with override_settings(KIOSK_API_TOKEN=''):
+            self.assertEqual(self.post([event], token='').status_code, 401)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_rejects_malformed_and_oversized_batches(self):
+        headers = {'HTTP_AUTHORIZATION': 'Bearer secret'}
+        self.assertEqual(self.client.post(self.url, '{', content_type='application/json', **headers).status_code, 400)
+        self.assertEqual(self.client.post(self.url, '{"events": 1}', content_type='application/json', **headers).status_code, 400)
+        event = {'employee_id': self.awa.pk, 'timestamp': self.at(8), 'direction': 'in'}
+        self.assertEqual(self.post([event] * clock.BATCH_MAX_EVENTS).status_code, 200)
+        Attendance.objects.all().delete()
+        self.assertEqual(self.post([event] * (clock.BATCH_MAX_EVENTS + 1)).status_code, 413)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_one_result_per_event_in_sent_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post([
+                # sortie envoyée avant l'entrée : rejouée après elle (ordre chronologique)
+                {'employee_id': self.awa.pk, 'timestamp': self.at(17), 'direction': 'out'},
+                {'employee_id': self.awa.pk, 'timestamp': self.at(8), 'direction': 'in'},
+                {'employee_id': self.awa.pk, 'timestamp': self.at(9), 'direction': 'in'},
+                {'employee_id': self.ben.pk, 'timestamp': self.at(17), 'direction': 'out'},
+                {'employee_id': 999999, 'timestamp': self.at(8), 'direction': 'in'},
+                {'employee_id': 'awa', 'timestamp': self.at(8), 'direction': 'in'},
+                {'employee_id': self.ben.pk, 'timestamp': 'hier', 'direction': 'in'},
+                {'employee_id': self.ben.pk, 'timestamp': self.at(8), 'direction': 'pause'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['recorded'], 2)
+        self.assertEqual([r['index'] for r in body['results']], list(range(8)))
+        self.assertEqual([r['status'] for r in body['results']], [
+            clock.RECORDED, clock.RECORDED, clock.ALREADY_DONE, clock.NO_RECORD, clock.UNKNOWN_EMPLOYEE,
+            clock.INVALID, clock.INVALID, clock.INVALID,
+        ])
+        record = Attendance.objects.get()
+        self.assertEqual(timezone.localtime(record.check_in).hour, 8)
+        self.assertEqual(record.worked_hours, Decimal('9.00'))
+        self.assertEqual(MonthlyAttendance.objects.get(employee=self.awa).total_hours, Decimal('9.00'))
+
+    def test_concurrent_punch_is_not_overwritten(self):
+        # entrée enregistrée par une autre requête après la lecture du lot (SQLite ne verrouille pas)
+        clock.clock_in(self.awa.pk, timezone.make_aware(datetime.datetime.combine(self.day, datetime.time(7))))
+        stale = Attendance(employee_id=self.awa.pk, work_date=self.day,
+                           check_in=timezone.make_aware(datetime.datetime.combine(self.day, datetime.time(8))))
+        fresh = Attendance(employee_id=self.ben.pk, work_date=self.day, check_in=stale.check_in)
+        written = clock._upsert_rows({(self.awa.pk, self.day): stale, (self.ben.pk, self.day): fresh})
+        self.assertEqual(list(written), [(self.ben.pk, self.day)])
+        self.assertEqual(timezone.localtime(Attendance.objects.get(employee=self.awa).check_in).hour, 7)
+        self.assertEqual(Attendance.objects.get(employee=self.ben).check_in, stale.check_in)
+
+
+class ClockConcurrencyTests(TransactionTestCase):
+    def test_concurrent_taps_refresh_rollups_without_lock_errors(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('verrouillage SQLite')
+        employes = [
+            Employe.objects.create(nom=f'E{index}', email=f'e{index}@example.com', poste='Agent', salaire=1000)
+            for index in range(20)
+        ]
+        start = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        connection.ensure_connection()
+        with tempfile.TemporaryDirectory() as directory:
+            # base fichier, profil par défaut : la base de test en mémoire partagée ne
+            # verrouille pas comme un vrai fichier
+            path = os.path.join(directory, 'db.sqlite3')
+            target = sqlite3.connect(path)
+            connection.connection.backup(target)
+            target.close()
+            file_settings = {**connection.settings_dict, 'NAME': path}
+
+            def on_file(func, *args):
+                connections['default'] = ConnectionHandler({'default': file_settings})['default']
+                try:
+                    return func(*args)
+                finally:
+                    connection.close()
+                    del connections['default']
+
+            taps = [employe.id for employe in employes] * 5
+            with ThreadPoolExecutor(20) as pool:
+                for action, when in ((clock.clock_in, start), (clock.clock_out, start + datetime.timedelta(hours=8))):
+                    # une erreur « database is locked » remonterait ici
+                    results = list(pool.map(lambda pk: on_file(action, pk, when), taps))
+                    self.assertEqual(results.count(clock.RECORDED), len(employes))
+                    self.assertEqual(results.count(clock.ALREADY_DONE), len(taps) - len(employes))
+                totals = pool.submit(on_file, lambda: list(
+                    MonthlyAttendance.objects.values_list('days_present', 'total_hours').distinct()
+                )).result()
+        self.assertEqual(totals, [(1, Decimal('8.00'))])
+
+
+class MonthlyRollupTests(TestCase):
+    def snapshot(self):
+        employees = MonthlyAttendance.objects.values_list(
+            'employee_id', 'department_id', 'year', 'month', 'days_present', 'total_hours', 'late_arrivals')
+        departments = DepartmentMonthlyAttendance.objects.values_list(
+            'department_id', 'year', 'month', 'employees', 'days_present', 'total_hours', 'late_arrivals')
+        return sorted(employees, key=str), sorted(departments, key=str)
+
+    def test_incremental_updates_match_rebuild(self):
+        it = Department.objects.create(name='IT')
+        awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000, department=it)
+        ben = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        day = datetime.date(2024, 1, 5)
+        at = lambda d, h, m=0: timezone.make_aware(datetime.datetime.combine(d, datetime.time(h, m)))
+        moved = Attendance.objects.create(employee=awa, work_date=day, check_in=at(day, 8), check_out=at(day, 16))
+        Attendance.objects.create(employee=awa, work_date=day.replace(day=6), check_in=at(day, 9, 30), check_out=at(day, 17))
+        clock.clock_in(ben.id, at(day, 9, 30))
+        clock.clock_out(ben.id, at(day, 18))
+        moved = Attendance.objects.get(pk=moved.pk)
+        moved.work_date = datetime.date(2024, 2, 1)
+        moved.save()
+
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(MonthlyAttendance.objects.get(employee=awa, month=1).late_arrivals, 1)
+
+        Attendance.objects.filter(employee=awa).delete()
+        self.assertFalse(DepartmentMonthlyAttendance.objects.filter(department=it).exists())
+
+    def test_batch_refresh_is_set_based(self):
+        it = Department.objects.create(name='IT')
+        at = lambda d, h: timezone.make_aware(datetime.datetime.combine(d, datetime.time(h))).isoformat()
+
+        def punch(count, year):
+            days = (datetime.date(year, 1, 31), datetime.date(year, 2, 1))
+            employes = Employe.objects.bulk_create(
+                Employe(nom=f'E{n}', email=f'e{n}-{count}@example.com', poste='Agent', salaire=1000,
+                        department=it if n % 2 else None)
+                for n in range(count)
+            )
+            events = [
+                {'employee_id': employe.pk, 'timestamp': at(day, hour), 'direction': direction}
+                for employe in employes for day in days for hour, direction in ((8, 'in'), (17, 'out'))
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                results = clock.apply_batch(events)
+            self.assertEqual({result['status'] for result in results}, {clock.RECORDED})
+            return len(queries)
+
+        # même nombre de requêtes pour 5 ou 50 employés : pas de recalcul par clé
+        self.assertEqual(punch(5, 2023), punch(50, 2024))
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(DepartmentMonthlyAttendance.objects.get(department=None, year=2024, month=2).employees, 25)
+
+    def test_employee_delete_refreshes_departments_once(self):
+        it = Department.objects.create(name='IT')
+        stays = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000, department=it)
+        at = lambda d, h: timezone.make_aware(datetime.datetime.combine(d, datetime.time(h))).isoformat()
+
+        def history(employe, step):
+            # de janvier à mars, une présence tous les ``step`` jours
+            first = datetime.date(2024, 1, 1)
+            clock.apply_batch([
+                {'employee_id': employe.pk, 'timestamp': at(first + datetime.timedelta(days=n), hour), 'direction': direction}
+                for n in range(0, 90, step) for hour, direction in ((8, 'in'), (17, 'out'))
+            ])
+
+        def delete(step):
+            leaves = Employe.objects.create(nom='Ben', email=f'ben{step}@example.com', poste='Agent', salaire=1000,
+                                            department=it)
+            history(leaves, step)
+            with CaptureQueriesContext(connection) as queries:
+                leaves.delete()
+            return len(queries)
+
+        history(stays, 1)
+        # une seule mise à jour par mois touché, pas une par présence supprimée
+        self.assertEqual(delete(9), delete(1))
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(set(DepartmentMonthlyAttendance.objects.values_list('month', 'employees')), {(1, 1), (2, 1), (3, 1)})
+
+
+class PayrollTests(TestCase):
+    def test_prorate_matches_decimal_half_up(self):
+        rng = random.Random(7)
+        salaries = [rng.randint(-10**6, 10**8) for _ in range(500)] + [1, -1, 5, 15]
+        unpaid = [rng.randint(0, 31) for _ in salaries[:-4]] + [29, 29, 27, 27]
+        paid, gross = payroll.prorate(salaries, [0] * len(salaries), unpaid, 30)
+        for salary, days, cents in zip(salaries, paid, gross):
+            expected = (Decimal(salary) * days / 30).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+            self.assertEqual(cents, int(expected))
+
+    def test_run_prorates_hires_and_unpaid_leave(self):
+        full = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=Decimal('3000.00'),
+                                      hire_date=datetime.date(2020, 1, 1))
+        hired = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=Decimal('1000.05'),
+                                       hire_date=datetime.date(2024, 2, 16))
+        Employe.objects.create(nom='Cy', email='cy@example.com', poste='Agent', salaire=1000,
+                               hire_date=datetime.date(2024, 3, 1))
+        for start, end, status in ((10, 12, 'approved'), (12, 13, 'approved'), (20, 25, 'pending')):
+            LeaveRequest.objects.create(employee=full, type='unpaid', status=status,
+                                        start_date=datetime.date(2024, 2, start), end_date=datetime.date(2024, 2, end))
+
+        run = payroll.run_payroll(2024, 2, created_by='rh')
+        lines = {line.employee_id: line for line in run.lines.all()}
+        self.assertEqual(set(lines), {full.id, hired.id})
+        self.assertEqual((lines[full.id].unpaid_days, lines[full.id].paid_days), (4, 25))
+        self.assertEqual(lines[full.id].gross_pay, Decimal('2586.21'))
+        self.assertEqual(lines[hired.id].paid_days, 14)
+        self.assertEqual(lines[hired.id].gross_pay, Decimal('482.78'))
+        run.refresh_from_db()
+        self.assertEqual(run.total_gross, Decimal('3068.99'))
+
+
+class LeaveLedgerTests(TestCase):
+    def setUp(self):
+        self.employe = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        self.staff = User.objects.create_user('rh', password='x', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def balance(self):
+        return LeaveBalance.objects.get(employee=self.employe, type='annual').balance
+
+    def test_accrual_is_once_per_period(self):
+        self.assertEqual(leave_ledger.accrue('2.5', period='2025-01'), 1)
+        self.assertEqual(leave_ledger.accrue('2.5', period='2025-01'), 0)
+        self.assertEqual(leave_ledger.accrue('2.5', period='2025-02'), 1)
+        self.assertEqual(self.balance(), Decimal('5.00'))
+
+    def test_approve_debits_and_reversals_credit_back(self):
+        leave_ledger.accrue(10, period='2025-01')
+        leave = LeaveRequest.objects.create(employee=self.employe, type='annual',
+                                            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 5))
+        self.assertEqual(self.balance(), Decimal('10.00'))
+        self.client.get(reverse('leave_approve', args=[leave.id]))
+        self.client.get(reverse('leave_approve', args=[leave.id]))
+        self.assertEqual(self.balance(), Decimal('7.00'))
+
+        leave = LeaveRequest.objects.get(pk=leave.pk)
+        leave.end_date = datetime.date(2025, 3, 3)
+        leave.save()
+        self.assertEqual(self.balance(), Decimal('9.00'))
+        self.client.get(reverse('leave_reject', args=[leave.id]))
+        self.assertEqual(self.balance(), Decimal('10.00'))
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.order_by('id').values_list('kind', 'days', 'balance_after')),
+            [('accrual', Decimal('10.00'), Decimal('10.00')), ('debit', Decimal('-3.00'), Decimal('7.00')),
+             ('credit', Decimal('3.00'), Decimal('10.00')), ('debit', Decimal('-1.00'), Decimal('9.00')),
+             ('credit', Decimal('1.00'), Decimal('10.00'))],
+        )
+
+    def test_list_shows_balances_in_one_query(self):
+        leave_ledger.accrue(5, period='2025-01')
+        other = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        for employe in (self.employe, other):
+            for type in ('annual', 'sick'):
+                LeaveRequest.objects.create(employee=employe, type=type,
+                                            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 3))
+        with self.assertNumQueries(3):  # session, utilisateur, demandes + soldes
+            response = self.client.get(reverse('leave_list'))
+        balances = {(l.employee_id, l.type): l.balance for l in response.context['leaves']}
+        self.assertEqual(balances[(self.employe.id, 'annual')], Decimal('5.00'))
+        self.assertIsNone(balances[(self.employe.id, 'sick')])
+        self.assertIsNone(balances[(other.id, 'annual')])
+
+    def test_deleting_employee_drops_ledger(self):
+        leave = LeaveRequest.objects.create(employee=self.employe, type='annual', status='approved',
+                                            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 4))
+        self.assertEqual(self.balance(), Decimal('-2.00'))
+        self.employe.delete()
+        self.assertFalse(LeaveBalance.objects.exists())
+        self.assertFalse(LeaveRequest.objects.filter(pk=leave.pk).exists())
+
+
+@override_settings(LEAVE_MIN_COVERAGE=0.5)
+class LeaveCoverageTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Support')
+        self.team = [
+            Employe.objects.create(nom=f'Agent {i}', email=f'a{i}@example.com', poste='Agent', salaire=1000,
+                                   department=self.department)
+            for i in range(4)
+        ]
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+
+    def leave(self, employe, start, end, status='approved'):
+        return LeaveRequest.objects.create(employee=employe, type='sick', status=status,
+                                           start_date=datetime.date(2025, 3, start), end_date=datetime.date(2025, 3, end))
+
+    def test_peak_counts_each_employee_once_per_day(self):
+        march = lambda d: datetime.date(2025, 3, d)
+        intervals = [(1, march(1), march(5)), (1, march(4), march(8)), (2, march(6), march(9)), (3, march(9), march(9))]
+        self.assertEqual(leave_coverage.peak_absences(intervals, march(1), march(31)), (2, march(6)))
+        self.assertEqual(leave_coverage.peak_absences(intervals, march(9), march(31)), (2, march(9)))
+        self.assertEqual(leave_coverage.peak_absences([], march(1), march(31)), (0, None))
+
+    def test_form_rejects_overlapping_request(self):
+        existing = self.leave(self.team[0], 10, 14, status='pending')
+        data = {'employee': self.team[0].pk, 'type': 'sick', 'start_date': '2025-03-14', 'end_date': '2025-03-20'}
+        form = LeaveRequestForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('14/03/2025', str(form.non_field_errors()))
+        self.assertTrue(LeaveRequestForm(dict(data, start_date='2025-03-15')).is_valid())
+        # modifier la demande existante ne la compare pas à elle-même
+        self.assertTrue(LeaveRequestForm(dict(data, start_date='2025-03-10'), instance=existing).is_valid())
+
+    def test_approve_warns_below_coverage_and_refuses_overlap(self):
+        self.leave(self.team[0], 10, 12)
+        self.leave(self.team[1], 12, 20)
+        pending = self.leave(self.team[2], 5, 10, status='pending')
+        response = self.client.get(reverse('leave_approve', args=[pending.id]), follow=True)
+        self.assertEqual([m.level_tag for m in response.context['messages']], ['success'])
+
+        pending = self.leave(self.team[3], 11, 12, status='pending')
+        response = self.client.get(reverse('leave_approve', args=[pending.id]), follow=True)
+        warnings = [str(m) for m in response.context['messages'] if m.level_tag == 'warning']
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('12/03/2025 : 3 absent(s) sur 4', warnings[0])
+
+        clash = LeaveRequest.objects.create(employee=self.team[1], type='sick', status='pending',
+                                            start_date=datetime.date(2025, 3, 20), end_date=datetime.date(2025, 3, 21))
+        self.client.get(reverse('leave_approve', args=[clash.id]))
+        clash.refresh_from_db()
+        self.assertEqual(clash.status, 'pending')
+
+    def test_bulk_approve_warns_below_coverage(self):
+        self.leave(self.team[0], 10, 12)
+        ids = [self.leave(self.team[1], 12, 20, status='pending').id, self.leave(self.team[2], 5, 10, status='pending').id]
+        response = self.client.post(reverse('leave_bulk'), {'action': 'approve', 'ids': ids}, follow=True)
+        self.assertEqual([m.level_tag for m in response.context['messages']], ['success'])
+
+        ids = [self.leave(self.team[3], 11, 12, status='pending').id]
+        response = self.client.post(reverse('leave_bulk'), {'action': 'approve', 'ids': ids}, follow=True)
+        warnings = [str(m) for m in response.context['messages'] if m.level_tag == 'warning']
+        self.assertEqual(warnings, [
+            "Couverture insuffisante le 12/03/2025 : 3 absent(s) sur 4 dans le département Support "
+            "(25% présents, minimum 50%)."
+        ])
+
+
+class LeaveBulkActionTests(TestCase):
+    def setUp(self):
+        self.awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        self.ben = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+
+    def leave(self, employe, start, end, status='pending'):
+        return LeaveRequest.objects.create(employee=employe, type='annual', status=status,
+                                           start_date=datetime.date(2025, 3, start), end_date=datetime.date(2025, 3, end))
+
+    def test_bulk_approve_updates_once_and_reports_skipped(self):
+        first = self.leave(self.awa, 3, 5)
+        second = self.leave(self.ben, 3, 4)
+        done = self.leave(self.ben, 10, 10, status='rejected')
+        clash = self.leave(self.awa, 4, 4)  # antérieure au contrôle du formulaire
+        ids = [first.id, second.id, done.id, clash.id, 9999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('leave_bulk'), {'action': 'approve', 'ids': ids}, follow=True)
+        updates = [q['sql'] for q in queries if q['sql'].strip().startswith('UPDATE "employe_leaverequest"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(
+            dict(LeaveRequest.objects.values_list('id', 'status')),
+            {first.id: 'approved', second.id: 'approved', done.id: 'rejected', clash.id: 'pending'},
+        )
+        self.assertEqual(LeaveRequest.objects.get(pk=first.pk).approved_by, 'rh')
+        self.assertEqual(LeaveBalance.objects.get(employee=self.awa, type='annual').balance, Decimal('-3.00'))
+        self.assertEqual(LeaveBalance.objects.get(employee=self.ben, type='annual').balance, Decimal('-2.00'))
+        text = [str(m) for m in response.context['messages']]
+        self.assertIn('2 demande(s) approuvée(s).', text)
+        self.assertIn(f"Ignorée(s), déjà traitée(s) ou introuvable(s) : #{done.id}, #9999", text)
+        self.assertIn(f"Non approuvée(s), chevauchement avec un congé approuvé : #{clash.id}", text)
+
+    def test_bulk_reject_and_access(self):
+        pending = self.leave(self.awa, 3, 5)
+        self.client.post(reverse('leave_bulk'), {'action': 'reject', 'ids': [pending.id]})
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.approved_by), ('rejected', 'rh'))
+        self.assertFalse(LeaveLedgerEntry.objects.exists())
+
+        other = self.leave(self.ben, 3, 5)
+        self.client.force_login(User.objects.create_user('agent'))
+        self.client.post(reverse('leave_bulk'), {'action': 'approve', 'ids': [other.id]})
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'pending')
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        # salaires en double : l'id départage
+        self.employes = [
+            Employe.objects.create(nom=f'E{index}', email=f'e{index}@example.com', poste='Agent', salaire=salaire)
+            for index, salaire in enumerate((3000, 1000, 2000, 1000, 3000, 2000, 1000))
+        ]
+
+    def ordered(self, descending=False):
+        ids = [e.id for e in sorted(self.employes, key=lambda e: (e.salaire, e.id), reverse=descending)]
+        return [ids[start:start + 3] for start in range(0, len(ids), 3)]
+
+    def walk(self, paginator, **kwargs):
+        page = paginator.page(**kwargs)
+        return [e.id for e in page['object_list']], page
+
+    def test_cursors_round_trip_both_ways(self):
+        for descending in (False, True):
+            with self.subTest(descending=descending):
+                paginator = KeysetPaginator(Employe.objects.all(), 'salaire', descending, per_page=3)
+                expected = self.ordered(descending)
+                pages, (ids, page) = [], self.walk(paginator)
+                self.assertFalse(page['has_previous'])
+                while True:
+                    pages.append(ids)
+                    if not page['has_next']:
+                        break
+                    ids, page = self.walk(paginator, after=page['next_cursor'])
+                    self.assertTrue(page['has_previous'])
+                self.assertEqual(pages, expected)
+
+                backwards = []
+                while page['has_previous']:
+                    ids, page = self.walk(paginator, before=page['previous_cursor'])
+                    self.assertTrue(page['has_next'])
+                    backwards.insert(0, ids)
+                self.assertEqual(backwards, expected[:-1])
+
+    def test_boundaries(self):
+        paginator = KeysetPaginator(Employe.objects.all(), 'salaire', per_page=3)
+        first, last = self.ordered()[0], self.ordered()[-1]
+        _, page = self.walk(paginator)
+        ids, page = self.walk(paginator, before=page['previous_cursor'])
+        self.assertEqual(ids, [])
+        self.assertEqual((page['has_next'], page['has_previous'], page['next_cursor']), (False, False, None))
+
+        ids, page = self.walk(paginator, after=paginator._cursor_for(Employe.objects.get(pk=last[-1])))
+        self.assertEqual((ids, page['has_next']), ([], False))
+        # « avant » l'avant-dernier : la page se remplit vers l'arrière, sans page précédente
+        ids, page = self.walk(paginator, before=paginator._cursor_for(Employe.objects.get(pk=first[2])))
+        self.assertEqual((ids, page['has_previous'], page['has_next']), (first[:2], False, True))
+        # « avant » prime sur « après »
+        ids, _ = self.walk(paginator, after=page['next_cursor'], before=paginator._cursor_for(Employe.objects.get(pk=last[0])))
+        self.assertEqual(ids, self.ordered()[1])
+
+    def test_tampered_cursors_fall_back_to_first_page(self):
+        paginator = KeysetPaginator(Employe.objects.all(), 'salaire', per_page=3)
+        first = self.ordered()[0]
+        for cursor in (
+            'pas un curseur!',
+            'e30',  # {} en base64
+            pagination.encode_cursor([1000]),
+            pagination.encode_cursor(['beaucoup', 1]),
+            pagination.encode_cursor([1000, 'x']),
+            pagination.encode_cursor([None, None]),
+        ):
+            for direction in ('after', 'before'):
+                with self.subTest(cursor=cursor, direction=direction):
+                    ids, page = self.walk(paginator, **{direction: cursor})
+                    self.assertEqual((ids, page['has_previous']), (first, False))
+
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+        response = self.client.get(reverse('liste_employes'), {'tri': '-salaire', 'apres': 'e30', 'avant': '%%'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e.id for e in response.context['employes']], [e.id for e in sorted(
+            self.employes, key=lambda e: (e.salaire, e.id), reverse=True)])
+
+
+class SQLInstrumentationTests(TestCase):
+    def setUp(self):
+        # cumuls propres au test (la vue sql_stats lit le même objet)
+        stats = middleware.ViewStats()
+        for module in (middleware, views):
+            patcher = mock.patch.object(module, 'view_stats', stats)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+
+    def timing(self, response):
+        return {
+            name: dict(part.split('=', 1) for part in params)
+            for name, *params in (segment.split(';') for segment in re.split(r', (?=\w+;)', response['Server-Timing']))
+        }
+
+    def test_fingerprint_groups_literals_and_in_lists(self):
+        self.assertEqual(
+            middleware.fingerprint("SELECT * FROM t WHERE id = 12 AND nom = 'l''eau' AND x IN (1, 2, 3)"),
+            "SELECT * FROM t WHERE id = ? AND nom = ? AND x IN (...)",
+        )
+
+    def test_server_timing_counts_the_request_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('liste_employes'))
+        timing = self.timing(response)
+        self.assertEqual(list(timing), ['sql', 'app', 'total'])
+        self.assertEqual(timing['sql']['desc'], f'"{len(queries)} queries, 0 dup"')
+        self.assertAlmostEqual(
+            float(timing['sql']['dur']) + float(timing['app']['dur']), float(timing['total']['dur']), delta=0.02,
+        )
+
+    @override_settings(SQL_N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_shapes_are_flagged_and_aggregated(self):
+        def get_response(request):
+            for pk in range(5):
+                Employe.objects.filter(pk=pk).exists()
+            return HttpResponse()
+
+        instrument = middleware.SQLInstrumentationMiddleware(get_response)
+        with self.assertLogs('employe.sql', 'WARNING') as logs:
+            response = instrument(RequestFactory().get('/'))
+        self.assertIn('5 exécutions', logs.output[0])
+        self.assertEqual(self.timing(response)['sql']['desc'], '"5 queries, 4 dup"')
+        with self.assertNoLogs('employe.sql', 'WARNING'):
+            instrument = middleware.SQLInstrumentationMiddleware(lambda request: HttpResponse())
+            instrument(RequestFactory().get('/'))
+
+        stats = middleware.view_stats.snapshot()['<non résolue>']
+        self.assertEqual((stats['requests'], stats['queries'], stats['max_queries']), (2, 5, 5))
+        self.assertEqual((stats['duplicates'], stats['n_plus_one_alerts']), (4, 1))
+
+    def test_stats_view_is_staff_only_and_sorted_by_time(self):
+        self.client.get(reverse('liste_employes'))
+        self.client.get(reverse('liste_departements'))
+        views = self.client.get(reverse('sql_stats')).json()['views']
+        self.assertEqual(set(views), {'liste_employes', 'liste_departements'})
+        totals = [stats['total_ms'] for stats in views.values()]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        self.assertEqual(views['liste_employes']['requests'], 1)
+
+        self.client.force_login(User.objects.create_user('agent'))
+        self.assertEqual(self.client.get(reverse('sql_stats')).status_code, 403)
+
+
+@override_settings(API_TOKEN='secret')
+class ApiTests(TestCase):
+    auth = {'HTTP_AUTHORIZATION': 'Bearer secret'}
+
+    def setUp(self):
+        self.it = Department.objects.create(name='IT')
+        self.employes = [
+            Employe.objects.create(nom=f'Agent {i}', email=f'a{i}@example.com', poste='Agent', salaire=1000,
+                                   department=self.it if i % 2 else None)
+            for i in range(5)
+        ]
+
+    def get(self, url, **headers):
+        return self.client.get(url, **self.auth, **headers)
+
+    def test_requires_staff_or_token(self):
+        url = reverse('api_list', args=['employes'])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer nope').status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer sécret').status_code, 401)
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.get(reverse('api_list', args=['inconnu'])).status_code, 404)
+
+    def test_cursor_pages_with_sparse_fields_and_filters(self):
+        url = reverse('api_list', args=['employes'])
+        first = self.get(url + '?fields=nom,department_name&limit=2').json()
+        self.assertEqual(first['results'][0], {'id': self.employes[0].id, 'nom': 'Agent 0', 'department_name': None})
+        second = self.get(url + f"?fields=nom&limit=2&after={first['next_cursor']}").json()
+        self.assertEqual([row['nom'] for row in second['results']], ['Agent 2', 'Agent 3'])
+        filtered = self.get(url + f'?department={self.it.id}&fields=nom').json()
+        self.assertEqual([row['nom'] for row in filtered['results']], ['Agent 1', 'Agent 3'])
+        self.assertIsNone(filtered['next_cursor'])
+        self.assertEqual(self.get(url + '?fields=salaire,mot_de_passe').status_code, 400)
+        self.assertEqual(self.get(url + '?department=x').status_code, 400)
+        self.assertEqual(self.get(url + '?after=zzz').status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api_list', args=['attendance']) + '?fields=employee_name'
+        Attendance.objects.create(employee=self.employes[0], work_date=datetime.date(2025, 3, 3))
+        response = self.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        # sans ETag, la date seule suffit : Last-Modified est à la seconde
+        self.assertEqual(self.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        with self.assertNumQueries(0):  # validateurs tirés des versions du cache
+            self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # un renommage change le nom affiché : la liste des présences n'est plus à jour
+        self.employes[0].nom = 'Awa'
+        self.employes[0].save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['employee_name'], 'Awa')
+        etag = response['ETag']
+        Attendance.objects.all().delete()
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # suppression du département : SET_NULL en masse, sans signal pour les employés
+        url = reverse('api_list', args=['employes']) + '?fields=department_name'
+        etag = self.get(url)['ETag']
+        self.it.delete()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['department_name'] for row in response.json()['results']}, {None})
+
+        detail = reverse('api_detail', args=['employes', self.employes[1].id])
+        response = self.get(detail)
+        self.assertEqual(response.json()['nom'], 'Agent 1')
+        self.assertEqual(self.get(detail, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(reverse('api_detail', args=['employes', 999])).status_code, 404)
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.rh = Department.objects.create(name='RH')
+        self.it = Department.objects.create(name='IT')
+        self.awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000, department=self.it)
+
+    def test_forms_render_and_validate_from_cache(self):
+        str(EmployeForm()['department'])
+        str(LeaveRequestForm()['employee'])
+        object_cache.get_employe(self.awa.pk)
+        with self.assertNumQueries(0):
+            html = str(EmployeForm()['department'])
+            form = LeaveRequestForm(initial={'employee': self.awa.pk})
+            self.assertIn('Awa', str(form['employee']))
+            self.assertEqual(form.fields['employee'].clean(str(self.awa.pk)), self.awa)
+        self.assertLess(html.index('IT'), html.index('RH'))
+        form = LeaveRequestForm(data={'employee': 999, 'type': 'annual',
+                                      'start_date': '2025-01-06', 'end_date': '2025-01-07'})
+        self.assertIn('employee', form.errors)
+
+    def test_cached_fields_take_their_sources(self):
+        field = CachedModelChoiceField(Department.objects.all(), choices_fn=lambda: [(1, 'IT')], lookup_fn={1: 'it'}.get)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(field.choices), [('', '---------'), (1, 'IT')])
+            self.assertEqual(field.clean('1'), 'it')
+            with self.assertRaises(ValidationError):
+                field.clean('2')
+            # sélecteur d'employés : aucune option listée
+            self.assertEqual(list(EmployeChoiceField(Employe.objects.all()).choices), [('', '---------')])
+        with self.assertRaises(TypeError):
+            CachedModelChoiceField(Department.objects.all())
+
+    def test_writes_bump_versions(self):
+        self.assertEqual(object_cache.department_choices(), [(self.it.pk, 'IT'), (self.rh.pk, 'RH')])
+        self.rh.name = 'Ressources humaines'
+        self.rh.save()
+        self.assertEqual(object_cache.get_department(self.rh.pk).name, 'Ressources humaines')
+
+        self.assertEqual(object_cache.get_employe(self.awa.pk).department_id, self.it.pk)
+        self.it.delete()
+        self.assertIsNone(object_cache.get_employe(self.awa.pk).department_id)
+        self.assertEqual([d.employee_count for d in object_cache.department_list()], [0])
+
+        Employe.objects.filter(pk=self.awa.pk).delete()
+        self.assertIsNone(object_cache.get_employe(self.awa.pk))
+
+    def test_employee_list_reads_departments_from_cache(self):
+        self.client.get(reverse('liste_employes'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('liste_employes'))
+        self.assertContains(response, 'IT')
+        self.assertFalse(any('employe_department' in q['sql'] for q in ctx.captured_queries))
+
+
+class EmployePickerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('agent', password='x')
+        for nom, email in [('Awa Diallo', 'awa@example.com'), ('awad Ba', 'ba@example.com'),
+                           ('Moussa', 'AWAKE@example.com'), ('Binta', 'binta@example.com')]:
+            Employe.objects.create(nom=nom, email=email, poste='Agent', salaire=1000)
+
+    def test_prefix_search_on_name_and_email(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('employe_autocomplete'), {'q': 'AWA'})
+        self.assertEqual([r['nom'] for r in response.json()['results']], ['Awa Diallo', 'awad Ba', 'Moussa'])
+        response = self.client.get(reverse('employe_autocomplete'), {'q': 'awa', 'limit': 1})
+        self.assertEqual([r['label'] for r in response.json()['results']], ['Awa Diallo (awa@example.com)'])
+        self.assertEqual(self.client.get(reverse('employe_autocomplete'), {'q': ' '}).json(), {'results': []})
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('employe_autocomplete'), {'q': 'a'}).status_code, 401)
+
+    def test_form_page_does_not_list_employees(self):
+        for i in range(50):
+            Employe.objects.create(nom=f'Employé {i}', email=f'e{i}@example.com', poste='Agent', salaire=1000)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('leave_create'))
+        self.assertNotContains(response, 'Binta')
+        self.assertContains(response, reverse('employe_autocomplete'))
+
+        binta = Employe.objects.get(nom='Binta')
+        form = LeaveRequestForm(data={'employee': binta.pk, 'type': 'annual',
+                                      'start_date': '2025-01-06', 'end_date': '2025-01-07'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIn('Binta (binta@example.com)', str(form['employee']))
+
+
+class EmployeSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.finance = Department.objects.create(name='Finance')
+        rh = Department.objects.create(name='Ressources humaines')
+        self.helene = Employe.objects.create(nom='Hélène Faye', email='helene@example.com', poste='Comptable', salaire=1000, department=self.finance)
+        self.moussa = Employe.objects.create(nom='Moussa Finance', email='moussa@example.com', poste='Agent', salaire=1000, department=rh)
+        Employe.objects.create(nom='Awa Diallo', email='awa@example.com', poste='Chargée de paie', salaire=1000, department=rh)
+
+    def names(self, query):
+        return [employe.nom for employe in search.search(query)]
+
+    def check_backend(self, index):
+        with mock.patch.object(search, '_backend', index):
+            self.assertEqual(self.names('helene'), ['Hélène Faye'])
+            self.assertEqual(self.names('HÉL'), ['Hélène Faye'])
+            self.assertEqual(self.names('chargee paie'), ['Awa Diallo'])
+            self.assertEqual(self.names('finance'), ['Moussa Finance', 'Hélène Faye'])
+            self.assertEqual(self.names('finance comptable'), ['Hélène Faye'])
+            self.assertEqual(self.names('" OR * NEAR('), [])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.finance.name = 'Trésorerie'
+                self.finance.save()
+                self.moussa.poste = 'Caissier'
+                self.moussa.save()
+            self.assertEqual(self.names('tresorerie'), ['Hélène Faye'])
+            self.assertEqual(self.names('caiss'), ['Moussa Finance'])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.finance.delete()
+                self.moussa.delete()
+            self.assertEqual(self.names('tresorerie'), [])
+            self.assertEqual(self.names('moussa'), [])
+
+    @skipIf(connection.vendor != 'sqlite', 'FTS5 : SQLite uniquement')
+    def test_fts5_index(self):
+        self.check_backend(search.FTS5Index())
+
+    def test_inverted_index(self):
+        self.check_backend(search.InvertedIndex())
+
+    def test_inverted_index_rebuilds_after_outside_write(self):
+        index = search.InvertedIndex()
+        with mock.patch.object(search, '_backend', index):
+            self.assertEqual(self.names('awa'), ['Awa Diallo'])
+            # écriture d'un autre processus : aucun signal reçu ici
+            Employe.objects.filter(nom='Awa Diallo').update(nom='Awa Ndiaye', updated_at=timezone.now())
+            self.assertEqual(self.names('ndiaye'), ['Awa Ndiaye'])
+
+    def test_search_page(self):
+        response = self.client.get(reverse('recherche_employes'), {'q': 'hélène'})
+        self.assertContains(response, 'helene@example.com')
+        self.assertContains(response, 'Finance')
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    # les requêtes parallèles ont leur propre connexion : les données doivent être validées
+
+    async def test_dashboards_gather_queries(self):
+        user = await User.objects.acreate_user('rh', is_staff=True)
+        employe = await Employe.objects.acreate(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        now = timezone.now()
+        await Attendance.objects.acreate(employee=employe, work_date=timezone.localdate(now),
+                                         check_in=now - datetime.timedelta(hours=2), check_out=now)
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_employees'], 1)
+        self.assertEqual(response.context['recent_employees'][0]['nom'], 'Awa')
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('app;dur=', response['Server-Timing'])
+
+        response = await self.async_client.get(reverse('attendance_dashboard'))
+        self.assertEqual(response.context['attendance_rate'], 100)
+        self.assertEqual([r.employee.nom for r in response.context['records']], ['Awa'])
+
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('attendance_dashboard'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    def test_pool_threads_keep_connections_within_max_age(self):
+        def closes(max_age):
+            # nouveau pool : la connexion du thread est ouverte avec ce CONN_MAX_AGE
+            pool = ThreadPoolExecutor(1)
+            self.addCleanup(pool.shutdown)
+            self.addCleanup(lambda: pool.submit(connections.close_all).result())
+            with mock.patch.object(aio, '_pool', pool), \
+                    mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': max_age}), \
+                    mock.patch.object(type(connections['default']), 'close', autospec=True) as close:
+                for _ in range(3):
+                    async_to_sync(aio.in_own_thread(Employe.objects.count))()
+            return close.call_count
+
+        # comme entre deux requêtes HTTP : fermée après chaque appel seulement si CONN_MAX_AGE=0
+        self.assertGreaterEqual(closes(0), 3)
+        self.assertEqual(closes(600), 0)
+
+
+@override_settings(LIVE_POLL_SECONDS=0.01)
+class LiveBoardTests(TransactionTestCase):
+    # le tableau en direct relit la base depuis ses propres threads : données validées
+
+    async def next_event(self, events):
+        # saute la directive retry et les messages de maintien
+        while True:
+            chunk = (await asyncio.wait_for(anext(events), 5)).decode()
+            if chunk.startswith('id:'):
+                fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+                return fields['event'], fields['id'], json.loads(fields['data'])
+
+    async def disconnect(self, events):
+        # comme un serveur ASGI quand le navigateur part : la lecture en cours est annulée
+        reading = asyncio.ensure_future(anext(events))
+        while not (await asyncio.wait([reading], timeout=0.05))[1]:
+            # message déjà en file : lu, on attend le suivant
+            reading = asyncio.ensure_future(anext(events))
+        reading.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reading
+
+    async def open_stream(self, **kwargs):
+        response = await self.async_client.get(reverse('attendance_live'), **kwargs)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        return events
+
+    async def test_one_read_per_change_fanned_out_to_every_viewer(self):
+        user = await User.objects.acreate_user('chef')
+        awa = await Employe.objects.acreate(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        ben = await Employe.objects.acreate(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        await sync_to_async(clock.clock_in)(awa.id)
+        await self.async_client.aforce_login(user)
+        page = await self.async_client.get(reverse('attendance_dashboard'))
+        version = str(page.context['live_version'])
+
+        with mock.patch.object(live, '_read', wraps=live._read) as read:
+            # page à jour : pas d'instantané ; dernier id périmé : instantané complet
+            current = await self.open_stream(data={'depuis': version})
+            stale = await self.open_stream(HTTP_LAST_EVENT_ID='0')
+            name, event_id, snapshot = await self.next_event(stale)
+            self.assertEqual((name, event_id), ('snapshot', version))
+            self.assertEqual([row['employee'] for row in snapshot['rows']], ['Awa'])
+            self.assertEqual(snapshot['counters']['present_count'], 1)
+
+            await sync_to_async(clock.clock_in)(ben.id)
+            deltas = [await self.next_event(current), await self.next_event(stale)]
+            self.assertEqual(deltas[0], deltas[1])
+            name, event_id, delta = deltas[0]
+            self.assertEqual(name, 'delta')
+            self.assertNotEqual(event_id, version)
+            self.assertEqual([row['employee'] for row in delta['rows']], ['Ben'])
+            self.assertEqual(delta['removed'], [])
+            self.assertEqual(delta['counters']['present_count'], 2)
+            # chargement initial puis un delta, quel que soit le nombre de navigateurs
+            self.assertEqual(read.call_count, 2)
+
+            record = await Attendance.objects.aget(employee=awa)
+            pk = record.pk
+            await record.adelete()
+            _, _, delta = await self.next_event(current)
+            self.assertEqual((delta['rows'], delta['removed']), ([], [pk]))
+
+        await self.disconnect(current)
+        self.assertIsNotNone(live.board._task)
+        await self.disconnect(stale)
+        self.assertIsNone(live.board._task)
+
+    def test_wsgi_sends_one_snapshot_per_connection(self):
+        response = self.client.get(reverse('attendance_live'))
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(User.objects.create_user('chef'))
+        awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        clock.clock_in(awa.id)
+        content = b''.join(self.client.get(reverse('attendance_live')).streaming_content).decode()
+        self.assertTrue(content.startswith('retry: 5000\n\n'))
+        self.assertIn(f"id: {kpis.kpi_version()}\nevent: snapshot", content)
+        self.assertIn('"employee": "Awa"', content)
+        response = self.client.get(reverse('attendance_live'), HTTP_LAST_EVENT_ID=str(kpis.kpi_version()))
+        self.assertEqual(b''.join(response.streaming_content), b'retry: 5000\n\n')
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self, **options):
+        options = {'employees': 40, 'departments': 4, 'days': 10, 'leaves': 80, 'seed': 7, **options}
+        call_command('generate_data', stdout=io.StringIO(), **options)
+
+    def test_generated_data_is_consistent(self):
+        cache.clear()
+        self.generate()
+        self.assertEqual(Employe.objects.count(), 40)
+        self.assertEqual(Department.objects.count(), 4)
+        self.assertTrue(60 <= LeaveRequest.objects.count() <= 80)
+        self.assertTrue(Attendance.objects.exists())
+        self.assertFalse(Attendance.objects.filter(work_date__gte=timezone.localdate()).exists())
+        for leave in LeaveRequest.objects.filter(status='approved'):
+            self.assertFalse(leave_coverage.overlapping(leave.employee_id, leave.start_date, leave.end_date, exclude_id=leave.pk)
+                             .filter(status='approved').exists())
+            self.assertFalse(Attendance.objects.filter(employee_id=leave.employee_id,
+                                                       work_date__range=(leave.start_date, leave.end_date)).exists())
+        # soldes = somme du journal, agrégats et index de recherche alignés sur les lignes insérées
+        for balance in LeaveBalance.objects.all():
+            entries = LeaveLedgerEntry.objects.filter(employee_id=balance.employee_id, type=balance.type)
+            self.assertEqual(balance.balance, sum(entries.values_list('days', flat=True)))
+        self.assertEqual(MonthlyAttendance.objects.aggregate(n=Sum('days_present'))['n'],
+                         Attendance.objects.filter(check_in__isnull=False).count())
+        employe = Employe.objects.order_by('id').first()
+        self.assertIn(employe, search.search(employe.email))
+        self.assertEqual(object_cache.get_employe(employe.pk).email, employe.email)
+
+    def test_refuses_populated_database(self):
+        Department.objects.create(name='IT')
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class RouteBenchmarkTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(bench_routes.missing_scenarios(), [])
+
+    def test_percentile_is_nearest_rank(self):
+        samples = list(range(1, 101))
+        random.shuffle(samples)
+        self.assertEqual(bench_routes.percentile(samples, 0.5), 50)
+        self.assertEqual(bench_routes.percentile(samples, 0.95), 95)
+        self.assertEqual(bench_routes.percentile([7], 0.99), 7)
+
+    def test_compare_flags_regressions_above_threshold_and_noise(self):
+        baseline = {
+            'liste_employes': {'status': 200, 'p50_ms': 40.0, 'p95_ms': 60.0, 'queries': 3, 'peak_kb': 400.0},
+            'dashboard': {'status': 200, 'p50_ms': 4.0, 'p95_ms': 8.0, 'queries': 2, 'peak_kb': 50.0},
+        }
+        current = {
+            'liste_employes': {'status': 200, 'p50_ms': 55.0, 'p95_ms': 70.0, 'queries': 4, 'peak_kb': 420.0},
+            # +100 % mais sous le plancher de bruit
+            'dashboard': {'status': 200, 'p50_ms': 8.0, 'p95_ms': 16.0, 'queries': 2, 'peak_kb': 100.0},
+            'sql_stats': {'status': 200, 'p50_ms': 5.0, 'p95_ms': 5.0, 'queries': 2, 'peak_kb': 10.0},
+        }
+        self.assertEqual(bench_routes.compare(baseline, current, 0.25), [
+            'liste_employes p50_ms : 40.0 -> 55.0', 'liste_employes queries : 3 -> 4',
+        ])
+        current['dashboard']['status'] = 302
+        self.assertIn('dashboard statut : 200 -> 302', bench_routes.compare(baseline, current, 0.25))
+
+    def test_attendance_and_leave_lists_are_paginated(self):
+        user = User.objects.create_user('rh', password='x', is_staff=True)
+        self.client.force_login(user)
+        employe = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        first = datetime.date(2024, 1, 1)
+        Attendance.objects.bulk_create(
+            Attendance(employee=employe, work_date=first + datetime.timedelta(days=i)) for i in range(views.POINTAGES_PAR_PAGE + 5)
+        )
+        response = self.client.get(reverse('attendance_list'))
+        self.assertEqual(len(response.context['records']), views.POINTAGES_PAR_PAGE)
+        self.assertEqual(response.context['records'][0].work_date, first + datetime.timedelta(days=views.POINTAGES_PAR_PAGE + 4))
+        response = self.client.get(reverse('attendance_list'), {'apres': response.context['page']['next_cursor']})
+        self.assertEqual([r.work_date for r in response.context['records']], [first + datetime.timedelta(days=i) for i in range(4, -1, -1)])
+        self.assertFalse(response.context['page']['has_next'])
+
+        LeaveRequest.objects.bulk_create(
+            LeaveRequest(employee=employe, start_date=first, end_date=first) for _ in range(views.DEMANDES_PAR_PAGE + 1)
+        )
+        response = self.client.get(reverse('leave_list'))
+        self.assertEqual(len(response.context['leaves']), views.DEMANDES_PAR_PAGE)
+        self.assertTrue(response.context['page']['has_next'])
+
+
+@override_settings(API_TOKEN='secret')
+class AttendanceArchiveTests(TestCase):
+    def setUp(self):
+        self.employe = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000)
+        # deux journées d'un mois clos, une de la période chaude
+        self.closed = archive.hot_since() - datetime.timedelta(days=40)
+        self.closed = self.closed.replace(day=2)
+        self.recent = timezone.localdate()
+        at = lambda d, h: timezone.make_aware(datetime.datetime.combine(d, datetime.time(h)))
+        self.rows = [
+            Attendance.objects.create(employee=self.employe, work_date=day, check_in=at(day, 8), check_out=at(day, 16))
+            for day in (self.closed, self.closed.replace(day=3), self.recent)
+        ]
+
+    def rollups(self):
+        return sorted(MonthlyAttendance.objects.values_list('year', 'month', 'days_present', 'total_hours'))
+
+    def test_closed_months_move_and_history_stays_unified(self):
+        before = self.rollups()
+        self.assertEqual(archive.archive(), [(self.closed.replace(day=1), 2)])
+        self.assertEqual(list(Attendance.objects.values_list('id', flat=True)), [self.rows[2].id])
+        archived = ArchivedAttendance.objects.get(work_date=self.closed)
+        self.assertEqual((archived.id, archived.updated_at), (self.rows[0].id, self.rows[0].updated_at))
+        self.assertEqual(archive.archive(), [])
+
+        # agrégats : intacts après le déplacement, identiques après reconstruction
+        self.assertEqual(self.rollups(), before)
+        rollups.rebuild()
+        self.assertEqual(self.rollups(), before)
+
+        dates = [row[0] for row in exports.attendance_rows()]
+        self.assertEqual(dates, [self.closed, self.closed.replace(day=3), self.recent])
+        with self.assertNumQueries(1):  # période chaude : l'archive n'est pas lue
+            self.assertEqual([row[0] for row in exports.attendance_rows(start=archive.hot_since())], [self.recent])
+
+        auth = {'HTTP_AUTHORIZATION': 'Bearer secret'}
+        api = self.client.get(reverse('api_list', args=['attendance']) + '?fields=work_date&limit=2', **auth).json()
+        self.assertEqual([row['id'] for row in api['results']], [self.rows[0].id, self.rows[1].id])
+        api = self.client.get(reverse('api_list', args=['attendance']) + f"?fields=work_date&after={api['next_cursor']}", **auth).json()
+        self.assertEqual([row['id'] for row in api['results']], [self.rows[2].id])
+        detail = self.client.get(reverse('api_detail', args=['attendance', self.rows[0].id]), **auth).json()
+        self.assertEqual(detail['work_date'], self.closed.isoformat())
+
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+        response = self.client.get(reverse('attendance_list'))
+        self.assertEqual([r.id for r in response.context['records']], [self.rows[2].id])
+
+        self.assertEqual(archive.restore(self.closed), [(self.closed.replace(day=1), 2)])
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertFalse(ArchivedAttendance.objects.exists())
+
+    def test_archived_days_are_closed_to_writes(self):
+        archive.archive()
+        data = {'employee': self.employe.pk, 'check_in': '', 'check_out': ''}
+        form = AttendanceForm(data={**data, 'work_date': self.closed})
+        self.assertFalse(form.is_valid())
+        self.assertIn('work_date', form.errors)
+        self.assertTrue(AttendanceForm(data={**data, 'work_date': self.closed.replace(day=4)}).is_valid())
+
+        stamp = timezone.make_aware(datetime.datetime.combine(self.closed, datetime.time(9))).isoformat()
+        results = clock.apply_batch([{'employee_id': self.employe.pk, 'timestamp': stamp, 'direction': 'in'}])
+        self.assertEqual(results[0]['status'], clock.INVALID)
+
+        # une journée non archivée d'un mois clos : l'agrégat compte aussi l'archive
+        Attendance.objects.create(employee=self.employe, work_date=self.closed.replace(day=4))
+        monthly = MonthlyAttendance.objects.get(year=self.closed.year, month=self.closed.month)
+        self.assertEqual((monthly.days_present, monthly.total_hours), (2, Decimal('16.00')))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_attendance', stdout=out)
+        self.assertIn('2 présence(s) archivée(s)', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('archive_attendance', restore='2025/01', stdout=out)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.sales = Department.objects.create(name='Ventes')
+        self.awa = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent', salaire=1000, department=self.sales)
+        self.ben = Employe.objects.create(nom='Ben', email='ben@example.com', poste='Agent', salaire=1000)
+        self.closed = (archive.hot_since() - datetime.timedelta(days=40)).replace(day=2)
+        self.recent = timezone.localdate()
+        for day in (self.recent, self.closed):
+            for employe in (self.ben, self.awa):
+                Attendance.objects.create(employee=employe, work_date=day, worked_hours=Decimal('7.50'))
+        self.assertEqual(archive.archive(), [(self.closed.replace(day=1), 2)])
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+
+    def download(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_merges_archive_and_hot_table_by_date(self):
+        response, content = self.download('attendance_export')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="presences.csv"')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], [header for _, header in exports.ATTENDANCE_COLUMNS])
+        # archive d'abord, puis table chaude ; même jour : par id
+        self.assertEqual([(row[0], row[2]) for row in rows[1:]], [
+            (self.closed.isoformat(), 'Ben'), (self.closed.isoformat(), 'Awa'),
+            (self.recent.isoformat(), 'Ben'), (self.recent.isoformat(), 'Awa'),
+        ])
+        self.assertEqual(rows[1][6], '7.50')
+
+        _, content = self.download('attendance_export', department=self.sales.id, start=self.recent.isoformat())
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual([(row[0], row[2], row[3]) for row in rows[1:]], [(self.recent.isoformat(), 'Awa', 'Ventes')])
+
+    def test_jsonl_filters(self):
+        for status, start in (('approved', self.closed), ('pending', self.recent)):
+            LeaveRequest.objects.create(employee=self.awa, type='annual', status=status, start_date=start, end_date=start)
+        LeaveRequest.objects.create(employee=self.ben, type='sick', start_date=self.recent, end_date=self.recent)
+
+        response, content = self.download('leave_export', format='jsonl', employee=self.awa.id)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="conges.jsonl"')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(list(rows[0]), [header for _, header in exports.LEAVE_COLUMNS])
+        self.assertEqual([(row['debut'], row['statut']) for row in rows],
+                         [(self.closed.isoformat(), 'approved'), (self.recent.isoformat(), 'pending')])
+
+        _, content = self.download('leave_export', format='jsonl', start=self.recent.isoformat())
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['employe'], row['departement']) for row in rows], [('Awa', 'Ventes'), ('Ben', None)])
+
+        _, content = self.download('attendance_export', format='jsonl', end=self.closed.isoformat(), employee=self.ben.id)
+        self.assertEqual([json.loads(line) for line in content.splitlines()], [{
+            'date': self.closed.isoformat(), 'employe_id': self.ben.id, 'employe': 'Ben', 'departement': None,
+            'arrivee': None, 'depart': None, 'heures': '7.50',
+        }])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in (
+            {'start': self.recent.isoformat(), 'end': self.closed.isoformat()},
+            {'department': 0},
+            {'format': 'xml'},
+            {'start': 'hier'},
+        ):
+            for name in ('attendance_export', 'leave_export'):
+                with self.subTest(name=name, params=params):
+                    self.assertEqual(self.client.get(reverse(name), params).status_code, 400)
+        response = self.client.get(reverse('attendance_export'), {'start': self.recent.isoformat(), 'end': self.closed.isoformat()})
+        self.assertIn("La date de fin doit être postérieure", response.content.decode())
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user('agent'))
+        self.assertRedirects(self.client.get(reverse('attendance_export')), reverse('attendance_list'), fetch_redirect_response=False)
+
+
+class AuditLogTests(TestCase):
+    def setUp(self):
+        self.rh = User.objects.create_user('rh', is_staff=True)
+        self.client.force_login(self.rh)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employe = Employe.objects.create(nom='Awa', email='awa@example.com', poste='Agent',
+                                                  salaire=Decimal('1000.00'), hire_date=datetime.date(2024, 1, 1))
+
+    def history(self, model, pk):
+        return [(entry.action, entry.changes, entry.actor) for entry in audit.history(model, pk)]
+
+    def audit_batches(self, callbacks):
+        batches = [callback.__self__ for callback in callbacks if isinstance(getattr(callback, '__self__', None), audit._Batch)]
+        return list(dict.fromkeys(batches))
+
+    def test_field_diffs_are_written_after_commit(self):
+        self.assertEqual(AuditEntry.objects.count(), 1)
+        it = Department.objects.create(name='IT')
+        data = {'nom': 'Awa', 'email': 'awa@example.com', 'poste': 'Cheffe', 'salaire': '1500.00',
+                'department': it.pk, 'hire_date': '2024-01-01'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('modifier_employe', args=[self.employe.pk]), data)
+            # enregistrement sans changement : pas d'entrée
+            Employe.objects.get(pk=self.employe.pk).save()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.employe.salaire = Decimal('9999.00')
+                self.employe.save()
+                raise ValueError
+        self.assertEqual(self.history(Employe, self.employe.pk), [
+            ('u', {'department_id': [None, it.pk], 'poste': ['Agent', 'Cheffe'], 'salaire': ['1000.00', '1500.00']}, 'rh'),
+            ('c', {'email': [None, 'awa@example.com'], 'hire_date': [None, '2024-01-01'], 'nom': [None, 'Awa'],
+                   'poste': [None, 'Agent'], 'salaire': [None, '1000.00']}, ''),
+        ])
+
+    @override_settings(AUDIT_BATCH_SIZE=2)
+    def test_one_batch_per_block(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for poste in ('A', 'B'):
+                self.employe.poste = poste
+                self.employe.save()
+            Department.objects.create(name='IT')
+            # point de sauvegarde annulé : son lot disparaît avec lui
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.employe.poste = 'Annulé'
+                self.employe.save()
+                raise ValueError
+            with transaction.atomic():
+                self.employe.poste = 'C'
+                self.employe.save()
+        batches = self.audit_batches(callbacks)
+        self.assertEqual([len(batch.entries) for batch in batches], [3, 1])
+        self.assertEqual(AuditEntry.objects.count(), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        inserts = [q['sql'] for q in queries if q['sql'].startswith(f'INSERT INTO "{AuditEntry._meta.db_table}"')]
+        self.assertEqual(len(inserts), 3)  # 2 + 1 entrées, puis 1
+        self.assertEqual([changes['poste'][1] for action, changes, _ in self.history(Employe, self.employe.pk)[:3]],
+                         ['C', 'B', 'A'])
+
+    def test_history_reads_only(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.employe.poste = 'Cheffe'
+            self.employe.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('audit_history', args=['employes', self.employe.pk]))
+        self.assertEqual(len(response.context['entries']), 1)
+        self.assertFalse([q['sql'] for q in queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(len(self.audit_batches(callbacks)), 1)
+
+    def test_leave_decisions_and_history_view(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = [
+                LeaveRequest.objects.create(employee=self.employe, type='sick', start_date=datetime.date(2025, 3, d),
+                                            end_date=datetime.date(2025, 3, d))
+                for d in (3, 10)
+            ]
+            self.client.get(reverse('leave_approve', args=[first.pk]))
+            self.client.post(reverse('leave_bulk'), {'action': 'reject', 'ids': [second.pk]})
+        self.assertEqual(self.history(LeaveRequest, first.pk)[0],
+                         ('u', {'approved_by': ['', 'rh'], 'status': ['pending', 'approved']}, 'rh'))
+        self.assertEqual(self.history(LeaveRequest, second.pk)[0],
+                         ('u', {'approved_by': ['', 'rh'], 'status': ['pending', 'rejected']}, 'rh'))
+
+        response = self.client.get(reverse('audit_history', args=['conges', first.pk]))
+        self.assertContains(response, 'pending → approved')
+        self.assertEqual(response.context['entries'][0][1][0], ('approved by', '', 'rh'))
+        self.assertEqual(self.client.get(reverse('audit_history', args=['inconnu', 1])).status_code, 404)
+
+        # l'historique survit à la suppression ; le journal n'est jamais modifié
+        pk = self.employe.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employe.delete()
+        response = self.client.get(reverse('audit_history', args=['employes', pk]))
+        self.assertIsNone(response.context['object'])
+        self.assertEqual(response.context['entries'][0][0].get_action_display(), 'Suppression')
+        entry = AuditEntry.objects.first()
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+        self.client.force_login(User.objects.create_user('agent'))
+        self.assertRedirects(self.client.get(reverse('audit_history', args=['conges', first.pk])),
+                             reverse('dashboard'), fetch_redirect_response=False)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.it = Department.objects.create(name='IT')
+        self.rh = Department.objects.create(name='RH')
+        rng = random.Random(3)
+        self.employes = [
+            Employe.objects.create(
+                nom=f'E{i}', email=f'e{i}@example.com', poste=('Agent', 'Cheffe', 'Technicien')[i % 3],
+                salaire=Decimal(rng.randint(100000, 900000)).scaleb(-2), department=(self.it, self.rh, None)[i % 3 if i % 7 else 2],
+                hire_date=datetime.date(2023 + i % 2, 1 + i % 12, 1 + i % 28),
+            )
+            for i in range(60)
+        ]
+        self.snapshot = analytics.OrgSnapshot()
+
+    def expected(self, by):
+        # calcul direct sur la table, percentiles au rang le plus proche
+        groups = defaultdict(list)
+        for employe in Employe.objects.select_related('department'):
+            if by == analytics.DEPARTMENT:
+                label = employe.department.name if employe.department else 'Sans département'
+            else:
+                label = employe.poste
+            groups[label].append(employe.salaire)
+        summary = []
+        for label, salaries in groups.items():
+            salaries.sort()
+            summary.append({
+                'label': label, 'count': len(salaries), 'min': salaries[0], 'max': salaries[-1],
+                'mean': (sum(salaries) / len(salaries)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+                **{f'p{p}': salaries[max(math.ceil(p * len(salaries) / 100) - 1, 0)] for p in analytics.PERCENTILES},
+            })
+        return sorted(summary, key=lambda row: (-row['count'], row['label']))
+
+    def assertMatchesTable(self):
+        for by in (analytics.DEPARTMENT, analytics.POSTE):
+            self.assertEqual(self.snapshot.salary_summary(by), self.expected(by))
+            self.assertEqual(self.snapshot.headcount(by), [(row['label'], row['count']) for row in self.expected(by)])
+
+    def test_group_by_percentiles_and_histogram(self):
+        self.assertMatchesTable()
+        salaries = sorted(Employe.objects.values_list('salaire', flat=True))
+        self.assertEqual(self.snapshot.percentile(50), salaries[29])
+        self.assertEqual(self.snapshot.percentile(100, analytics.POSTE, 'Agent'),
+                         max(Employe.objects.filter(poste='Agent').values_list('salaire', flat=True)))
+        self.assertIsNone(self.snapshot.percentile(50, analytics.POSTE, 'Inconnu'))
+
+        histogram = self.snapshot.histogram(bins=7)
+        self.assertEqual(len(histogram), 7)
+        self.assertEqual(histogram[0][0], salaries[0])
+        for low, high, count in histogram:
+            self.assertEqual(count, sum(1 for salary in salaries if low <= salary < high))
+        self.assertEqual(sum(count for *_, count in self.snapshot.histogram(by=analytics.DEPARTMENT, key=self.it.pk)),
+                         Employe.objects.filter(department=self.it).count())
+
+        trend = self.snapshot.hiring_trend(months=24, today=datetime.date(2024, 12, 15))
+        self.assertEqual(trend[0][0], datetime.date(2023, 1, 1))
+        self.assertEqual(trend[-1][0], datetime.date(2024, 12, 1))
+        for month, count in trend:
+            self.assertEqual(count, Employe.objects.filter(hire_date__year=month.year, hire_date__month=month.month).count())
+
+    def test_writes_are_applied_incrementally(self):
+        self.snapshot.headcount()
+        with mock.patch.object(analytics.OrgSnapshot, '_rebuild') as rebuild:
+            first = self.employes[0]
+            first.salaire, first.department, first.poste = Decimal('9999.99'), self.rh, 'Directrice'
+            first.save()
+            self.employes[1].delete()
+            Employe.objects.create(nom='Nouvelle', email='n@example.com', poste='Agent', salaire=Decimal('1234.50'),
+                                   department=self.it, hire_date=datetime.date(2024, 6, 3))
+            self.assertMatchesTable()
+            # import en masse : bulk_create sans signaux, puis invalidation explicite ; index refaits d'un coup
+            with mock.patch.object(analytics, 'REINDEX_AFTER', 2):
+                Employe.objects.bulk_create([
+                    Employe(nom=f'I{i}', email=f'i{i}@example.com', poste='Stagiaire', salaire=Decimal(500 + i),
+                            department=self.rh, hire_date=datetime.date(2024, 9, 1))
+                    for i in range(5)
+                ])
+                object_cache.invalidate('employe')
+                self.assertMatchesTable()
+        rebuild.assert_not_called()
+        self.assertEqual(len(self.snapshot.ids), Employe.objects.count())
+
+    def test_deleted_department_moves_employees_out(self):
+        self.snapshot.headcount()
+        self.rh.delete()
+        self.assertMatchesTable()
+        self.assertNotIn('RH', dict(self.snapshot.headcount()))
+
+    def test_page_is_staff_only(self):
+        self.client.force_login(User.objects.create_user('agent'))
+        self.assertRedirects(self.client.get(reverse('analytics')), reverse('dashboard'), fetch_redirect_response=False)
+
+        self.client.force_login(User.objects.create_user('rh', is_staff=True))
+        response = self.client.get(reverse('analytics'), {'departement': self.it.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['departments'], self.expected(analytics.DEPARTMENT))
+        self.assertEqual(sum(count for _, _, count, _ in response.context['histogram']),
+                         Employe.objects.filter(department=self.it).count())
+        self.assertEqual(max(width for *_, width in response.context['histogram']), 100)
+        self.assertEqual(len(response.context['hires']), 24)
+        self.assertContains(response, 'Technicien')
@@ -1,11 +1,14 @@
 from django.contrib import admin
 from django.urls import path 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.dashboard , name='dashboard'),
     path('employes/', views.liste_employes , name='liste_employes'),
     path('ajouter/', views.ajouter_employe , name='ajouter_employe'),
+    path('recherche/', views.recherche_employes, name='recherche_employes'),
+    path('employes/autocomplete/', views.employe_autocomplete, name='employe_autocomplete'),
+    path('employes/importer/', views.importer_employes, name='importer_employes'),
     path('modifier/<int:id>/', views.modifier_employe , name='modifier_employe'),
     path('supprimer/<int:id>/', views.supprimer_employe , name='supprimer_employe'),
     # Dashboard explicit route
@@ -22,17 +25,32 @@ urlpatterns = [
     path('departements/supprimer/<int:id>/', views.supprimer_departement, name='supprimer_departement'),
     # Attendance
     path('attendance/', views.attendance_dashboard, name='attendance_dashboard'),
+    path('attendance/live/', views.attendance_live, name='attendance_live'),
     path('attendance/list/', views.attendance_list, name='attendance_list'),
+    path('attendance/export/', views.attendance_export, name='attendance_export'),
+    path('attendance/report/', views.attendance_report, name='attendance_report'),
     path('attendance/create/', views.attendance_create, name='attendance_create'),
     path('attendance/edit/<int:id>/', views.attendance_edit, name='attendance_edit'),
     path('attendance/delete/<int:id>/', views.attendance_delete, name='attendance_delete'),
     path('attendance/clock-in/<int:employee_id>/', views.clock_in, name='clock_in'),
     path('attendance/clock-out/<int:employee_id>/', views.clock_out, name='clock_out'),
+    path('attendance/clock/batch/', views.clock_batch, name='clock_batch'),
     # Leave
     path('leave/', views.leave_list, name='leave_list'),
     path('leave/create/', views.leave_create, name='leave_create'),
+    path('leave/export/', views.leave_export, name='leave_export'),
     path('leave/edit/<int:id>/', views.leave_edit, name='leave_edit'),
     path('leave/delete/<int:id>/', views.leave_delete, name='leave_delete'),
     path('leave/approve/<int:id>/', views.leave_approve, name='leave_approve'),
     path('leave/reject/<int:id>/', views.leave_reject, name='leave_reject'),
+    path('leave/bulk/', views.leave_bulk, name='leave_bulk'),
+    # API JSON en lecture seule
+    path('api/v1/<str:resource>/', api.resource_list, name='api_list'),
+    path('api/v1/<str:resource>/<int:id>/', api.resource_detail, name='api_detail'),
+    # Effectifs et salaires (instantané en mémoire)
+    path('analytique/', views.analytics_page, name='analytics'),
+    # Journal d'audit
+    path('historique/<str:entity>/<int:id>/', views.audit_history, name='audit_history'),
+    # Instrumentation
+    path('stats/sql/', views.sql_stats, name='sql_stats'),
 ]
\ No newline at end of file
@@ -1,18 +1,85 @@
+import asyncio
+import hmac
+import json
+
+from asgiref.sync import sync_to_async
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
 from django.contrib import messages
-from .models import Employe, Department, Attendance, LeaveRequest
-from .form import EmployeForm, DepartmentForm, AttendanceForm, LeaveRequestForm
-from django.db.models import Count, Avg, Sum
+from .models import Employe, Department, Attendance, LeaveRequest, LeaveBalance, DepartmentMonthlyAttendance
+from .form import EmployeForm, ImportEmployesForm, DepartmentForm, AttendanceForm, LeaveRequestForm, ExportForm
+from django.db.models import F, FilteredRelation, Max, Q, Sum
 from django.utils import timezone
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import aauthenticate, alogin, alogout
 from django.contrib.auth.models import User
-from .supabase_client import get_supabase_client
-# pour recuperer la liste de tous les employe du site
+from .supabase_client import aget_supabase_client, asupabase_auth, SupabaseUnavailable
+from .pagination import KeysetPaginator
+from .aio import in_own_thread
+from .kpis import aget_kpis, akpi_version
+from .importers import ImportFileError, import_employes, iter_rows
+from . import analytics
+from . import archive
+from . import audit
+from . import exports
+from . import autocomplete
+from . import cache as object_cache
+from . import clock
+from . import leave_actions
+from . import leave_coverage
+from . import live
+from . import search
+from .middleware import view_stats
+
+EMPLOYES_PAR_PAGE = 50
+POINTAGES_PAR_PAGE = 100
+DEMANDES_PAR_PAGE = 100
+HISTORIQUE_PAR_PAGE = 50
+# tris autorisés pour l'annuaire (champ du modèle)
+TRIS_EMPLOYES = ('nom', 'hire_date', 'salaire')
+
+# pour recuperer la liste des employe du site, page par page
 def liste_employes(request):
-    employes = Employe.objects.all()
+    tri = request.GET.get('tri', 'nom')
+    descending = tri.startswith('-')
+    if tri.lstrip('-') not in TRIS_EMPLOYES:
+        tri, descending = 'nom', False
+    employes = Employe.objects.only('id', 'nom', 'email', 'poste', 'salaire', 'hire_date', 'department')
+    page = KeysetPaginator(employes, tri.lstrip('-'), descending, EMPLOYES_PAR_PAGE).page(
+        after=request.GET.get('apres'),
+        before=request.GET.get('avant'),
+    )
 
     #retourner a une page html 
-    return render(request, 'employe/list.html', {'employes' : employes})
+    return render(request, 'employe/list.html', {
+        # noms des départements lus dans le cache plutôt que par jointure
+        'employes': object_cache.attach_departments(page['object_list']),
+        'page': page,
+        'tri': tri,
+    })
+
+# recherche plein texte (nom, email, poste, département), accents et casse ignorés
+@require_safe
+def recherche_employes(request):
+    query = request.GET.get('q', '').strip()
+    results = object_cache.attach_departments(search.search(query)) if query else []
+    return render(request, 'employe/search.html', {'q': query, 'results': results})
+
+# suggestions du sélecteur d'employé (formulaires de présence et de congé)
+@require_safe
+def employe_autocomplete(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': "Authentification requise."}, status=401)
+    try:
+        limit = int(request.GET.get('limit') or autocomplete.AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': "limit doit être un entier."}, status=400)
+    limit = max(1, min(limit, autocomplete.AUTOCOMPLETE_MAX))
+    return JsonResponse({'results': autocomplete.suggest(request.GET.get('q', ''), limit)})
 
 #ajouter un employé
 def ajouter_employe(request): 
@@ -26,6 +93,31 @@ def ajouter_employe(request):
         messages.error(request, "Veuillez corriger les erreurs du formulaire.")
     return render(request, 'employe/formulaire.html', {'form': form})
 
+# importer des employés en masse depuis un fichier CSV/XLSX
+def importer_employes(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('liste_employes')
+    form = ImportEmployesForm(request.POST or None, request.FILES or None)
+    report = None
+    if form.is_valid():
+        fichier = form.cleaned_data['fichier']
+        try:
+            report = import_employes(iter_rows(fichier.file, fichier.name))
+        except ImportFileError as exc:
+            if exc.report is not None and exc.report.created:
+                messages.error(request, f"{exc} {exc.report.created} employé(s) déjà importé(s) avant l'erreur.")
+            else:
+                messages.error(request, str(exc))
+        else:
+            if report.error_count:
+                messages.error(request, f"{report.created} employé(s) importé(s), {report.error_count} ligne(s) en erreur.")
+            else:
+                messages.success(request, f"{report.created} employé(s) importé(s) avec succès.")
+    elif request.method == "POST":
+        messages.error(request, "Veuillez corriger les erreurs du formulaire.")
+    return render(request, 'employe/import.html', {'form': form, 'report': report})
+
 def modifier_employe(request, id) :
     #recuper un objet dans la bd ou renvoie 404
     employe = get_object_or_404(Employe, id=id)
@@ -47,115 +139,118 @@ def supprimer_employe(request, id):
     return render(request, 'employe/confirmer_suppression.html', {'employe': employe})
 
 # Auth pages (frontend for Supabase Auth)
-def login_page(request):
+# Vues asynchrones : l'appel HTTP à Supabase n'occupe pas de thread pendant l'attente.
+# Le rendu (session, utilisateur, messages) reste synchrone, dans le thread de la requête.
+arender = sync_to_async(render)
+
+
+async def login_page(request):
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
         password = request.POST.get('password', '')
-        sb = get_supabase_client()
+        sb = await aget_supabase_client()
         if sb:
             try:
-                res = sb.auth.sign_in_with_password({ 'email': email, 'password': password })
+                res = await asupabase_auth(sb, 'sign_in_with_password', { 'email': email, 'password': password })
                 if res and res.session:
-                    request.session['sb_access_token'] = res.session.access_token
-                    request.session['sb_user'] = res.user.id
+                    await request.session.aset('sb_access_token', res.session.access_token)
+                    await request.session.aset('sb_user', res.user.id)
                     messages.success(request, "Connexion réussie.")
                     return redirect('dashboard')
                 messages.error(request, "Identifiants invalides.")
+            except SupabaseUnavailable:
+                # Supabase lent ou hors service : repli sur l'authentification Django
+                sb = None
             except Exception:
                 messages.error(request, "Connexion échouée. Vérifiez vos identifiants ou votre email.")
-        else:
+        if not sb:
             # Fallback Django auth: try username directly, then by email lookup
-            user = authenticate(request, username=email, password=password)
+            user = await aauthenticate(request, username=email, password=password)
             if user is None:
                 try:
-                    u = User.objects.get(email=email)
-                    user = authenticate(request, username=u.username, password=password)
+                    u = await User.objects.aget(email=email)
+                    user = await aauthenticate(request, username=u.username, password=password)
                 except User.DoesNotExist:
                     user = None
             if user is not None:
-                login(request, user)
+                await alogin(request, user)
                 messages.success(request, "Connexion réussie.")
                 return redirect('dashboard')
             messages.error(request, "Identifiants invalides.")
-    return render(request, 'auth/login.html')
+    return await arender(request, 'auth/login.html')
 
-def signup_page(request):
+async def signup_page(request):
     if request.method == 'POST':
         full_name = request.POST.get('full_name', '').strip()
         email = request.POST.get('email', '').strip()
         password = request.POST.get('password', '')
-        sb = get_supabase_client()
+        sb = await aget_supabase_client()
         if sb:
             try:
-                res = sb.auth.sign_up({ 'email': email, 'password': password, 'options': { 'data': { 'full_name': full_name } } })
+                res = await asupabase_auth(sb, 'sign_up', { 'email': email, 'password': password, 'options': { 'data': { 'full_name': full_name } } })
                 messages.success(request, "Compte créé. Vérifiez votre email pour confirmer.")
                 return redirect('login')
+            except SupabaseUnavailable:
+                messages.error(request, "Service d'authentification indisponible. Réessayez plus tard.")
             except Exception:
                 messages.error(request, "Création du compte échouée. Essayez un autre email.")
         else:
             # Fallback: create Django user with username=email
-            if User.objects.filter(username=email).exists():
+            if await User.objects.filter(username=email).aexists():
                 messages.error(request, "Un compte existe déjà avec cet email.")
-                return render(request, 'auth/signup.html')
-            user = User.objects.create_user(username=email, email=email, password=password)
+                return await arender(request, 'auth/signup.html')
+            user = await User.objects.acreate_user(username=email, email=email, password=password)
             # Save full name if provided
             if full_name:
                 parts = full_name.split(" ", 1)
                 user.first_name = parts[0]
                 if len(parts) > 1:
                     user.last_name = parts[1]
-                user.save()
+                await user.asave()
             messages.success(request, "Compte créé avec succès. Vous pouvez vous connecter.")
             return redirect('login')
-    return render(request, 'auth/signup.html')
+    return await arender(request, 'auth/signup.html')
 
-def verify_email_page(request):
+async def verify_email_page(request):
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
-        sb = get_supabase_client()
+        sb = await aget_supabase_client()
         if sb:
             try:
-                sb.auth.resend({ 'type': 'signup', 'email': email })
+                await asupabase_auth(sb, 'resend', { 'type': 'signup', 'email': email })
                 messages.success(request, "Email de vérification renvoyé si le compte existe.")
                 return redirect('login')
+            except SupabaseUnavailable:
+                messages.error(request, "Service d'authentification indisponible. Réessayez plus tard.")
             except Exception:
                 messages.error(request, "Echec de l'envoi de l'email de vérification.")
         else:
             messages.info(request, "La vérification par email nécessite Supabase. Fonction non disponible.")
-    return render(request, 'auth/verify_email.html')
+    return await arender(request, 'auth/verify_email.html')
 
-def logout_page(request):
-    request.session.pop('sb_access_token', None)
-    request.session.pop('sb_user', None)
-    logout(request)
+async def logout_page(request):
+    await request.session.apop('sb_access_token', None)
+    await request.session.apop('sb_user', None)
+    await alogout(request)
     messages.success(request, "Déconnecté.")
     return redirect('login')
 
 # Dashboard
-def dashboard(request):
-    total_employees = Employe.objects.count()
-    total_departments = Department.objects.count()
-    recent_employees = Employe.objects.order_by('-id')[:5]
-    today = timezone.localdate()
-    today_att = Attendance.objects.filter(work_date=today)
-    present_count = today_att.exclude(check_in__isnull=True).values('employee').distinct().count()
-    attendance_rate = (present_count / total_employees * 100) if total_employees else 0
-    avg_hours = today_att.aggregate(avg=Avg('worked_hours'))['avg'] or 0
-    total_hours = today_att.aggregate(sum=Sum('worked_hours'))['sum'] or 0
-    pending_leaves = LeaveRequest.objects.filter(status='pending').count()
-    return render(request, 'employe/dashboard.html', {
-        'total_employees': total_employees,
-        'total_departments': total_departments,
-        'recent_employees': recent_employees,
-        'attendance_rate': round(attendance_rate, 2),
-        'avg_hours': avg_hours,
-        'total_hours': total_hours,
-        'pending_leaves': pending_leaves,
+async def dashboard(request):
+    kpis = await aget_kpis()
+    return await arender(request, 'employe/dashboard.html', {
+        'total_employees': kpis['total_employees'],
+        'total_departments': kpis['total_departments'],
+        'recent_employees': kpis['recent_employees'],
+        'attendance_rate': kpis['attendance_rate'],
+        'avg_hours': kpis['avg_hours'],
+        'total_hours': kpis['total_hours'],
+        'pending_leaves': kpis['pending_leaves'],
     })
 
 # Department Management
 def liste_departements(request):
-    departements = Department.objects.annotate(employee_count=Count('employees')).order_by('name')
+    departements = object_cache.department_list()
     return render(request, 'departments/list.html', {'departements': departements})
 
 def ajouter_departement(request):
@@ -197,32 +292,112 @@ def supprimer_departement(request, id):
     return render(request, 'departments/confirm_delete.html', {'departement': departement})
 
 # Attendance
-def attendance_dashboard(request):
-    if not request.user.is_authenticated:
+def _attendance_of(day):
+    return list(Attendance.objects.filter(work_date=day).select_related('employee').order_by('employee__nom'))
+
+async def attendance_dashboard(request):
+    user = await request.auser()
+    if not user.is_authenticated:
         messages.error(request, "Veuillez vous connecter.")
         return redirect('login')
     today = timezone.localdate()
-    total_employees = Employe.objects.count()
-    qs = Attendance.objects.filter(work_date=today)
-    present_count = qs.exclude(check_in__isnull=True).values('employee').distinct().count()
-    attendance_rate = (present_count / total_employees * 100) if total_employees else 0
-    avg_hours = qs.aggregate(avg=Avg('worked_hours'))['avg'] or 0
-    total_hours = qs.aggregate(sum=Sum('worked_hours'))['sum'] or 0
-    records = qs.select_related('employee').order_by('employee__nom')
-    return render(request, 'attendance/dashboard.html', {
+    # lue avant les données : le flux en direct repart de cette version (au pire un instantané de trop)
+    version = await akpi_version()
+    # indicateurs et pointages du jour lus en parallèle
+    kpis, records = await asyncio.gather(aget_kpis(), in_own_thread(_attendance_of)(today))
+    return await arender(request, 'attendance/dashboard.html', {
         'today': today,
         'records': records,
-        'attendance_rate': round(attendance_rate, 2),
-        'avg_hours': avg_hours,
-        'total_hours': total_hours,
+        'attendance_rate': kpis['attendance_rate'],
+        'avg_hours': kpis['avg_hours'],
+        'total_hours': kpis['total_hours'],
+        'live_version': version,
     })
 
+# flux SSE du tableau des présences : pointages et compteurs poussés à chaque changement
+async def attendance_live(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': "Authentification requise."}, status=401)
+    since = request.headers.get('Last-Event-ID') or request.GET.get('depuis')
+    # sous WSGI un flux sans fin serait mis en mémoire avant d'être envoyé : un seul envoi par connexion
+    events = live.stream(since) if isinstance(request, ASGIRequest) else live.once(since)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # pas de mise en mémoire tampon par nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def attendance_list(request):
     if not request.user.is_authenticated:
         messages.error(request, "Veuillez vous connecter.")
         return redirect('login')
-    records = Attendance.objects.select_related('employee').order_by('-work_date', 'employee__nom')
-    return render(request, 'attendance/list.html', {'records': records})
+    records = Attendance.objects.select_related('employee')
+    page = KeysetPaginator(records, 'work_date', True, POINTAGES_PAR_PAGE).page(
+        after=request.GET.get('apres'),
+        before=request.GET.get('avant'),
+    )
+    # table chaude seulement : les mois archivés se consultent par l'export et l'API
+    return render(request, 'attendance/list.html', {
+        'records': page['object_list'], 'page': page, 'hot_since': archive.hot_since(),
+    })
+
+def _export_response(request, columns, rows_for, filename):
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = {k: form.cleaned_data[k] for k in ('start', 'end', 'department', 'employee')}
+    rows = rows_for(**filters)
+    # Le téléchargement commence immédiatement : les lignes sont lues et écrites par lots
+    if form.cleaned_data['format'] == 'jsonl':
+        response = StreamingHttpResponse(exports.stream_jsonl(columns, rows), content_type='application/x-ndjson')
+        filename += '.jsonl'
+    else:
+        response = StreamingHttpResponse(exports.stream_csv(columns, rows), content_type='text/csv; charset=utf-8')
+        filename += '.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def attendance_export(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('attendance_list')
+    return _export_response(request, exports.ATTENDANCE_COLUMNS, exports.attendance_rows, 'presences')
+
+# Rapport mensuel ou annuel par département, lu dans les agrégats (pas de parcours des présences)
+def attendance_report(request):
+    if not request.user.is_authenticated:
+        messages.error(request, "Veuillez vous connecter.")
+        return redirect('login')
+    today = timezone.localdate()
+    try:
+        year = int(request.GET.get('annee') or today.year)
+        month = int(request.GET.get('mois') or 0)
+    except ValueError:
+        year, month = today.year, 0
+    if not 1 <= month <= 12:
+        month = 0
+    qs = DepartmentMonthlyAttendance.objects.filter(year=year)
+    if month:
+        qs = qs.filter(month=month)
+    rows = list(
+        qs.values('department__name')
+        .annotate(
+            employees=Max('employees'),
+            days_present=Sum('days_present'),
+            total_hours=Sum('total_hours'),
+            late_arrivals=Sum('late_arrivals'),
+        )
+        .order_by('department__name')
+    )
+    for row in rows:
+        row['average_hours'] = (row['total_hours'] / row['days_present']) if row['days_present'] else 0
+    return render(request, 'attendance/report.html', {
+        'rows': rows,
+        'year': year,
+        'month': month,
+        'months': range(1, 13),
+    })
 
 def attendance_create(request):
     if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
@@ -263,13 +438,9 @@ def clock_in(request, employee_id):
         messages.error(request, "Veuillez vous connecter.")
         return redirect('login')
     employee = get_object_or_404(Employe, id=employee_id)
-    today = timezone.localdate()
-    rec, _ = Attendance.objects.get_or_create(employee=employee, work_date=today)
-    if rec.check_in:
+    if clock.clock_in(employee.id) == clock.ALREADY_DONE:
         messages.info(request, "Déjà pointé pour aujourd'hui.")
     else:
-        rec.check_in = timezone.now()
-        rec.save()
         messages.success(request, "Pointage d'entrée enregistré.")
     return redirect('attendance_dashboard')
 
@@ -278,23 +449,62 @@ def clock_out(request, employee_id):
         messages.error(request, "Veuillez vous connecter.")
         return redirect('login')
     employee = get_object_or_404(Employe, id=employee_id)
-    today = timezone.localdate()
-    rec = get_object_or_404(Attendance, employee=employee, work_date=today)
-    if rec.check_out:
+    result = clock.clock_out(employee.id)
+    if result == clock.NO_RECORD:
+        raise Http404("Aucun pointage d'entrée aujourd'hui.")
+    if result == clock.ALREADY_DONE:
         messages.info(request, "Déjà sorti aujourd'hui.")
     else:
-        rec.check_out = timezone.now()
-        rec.save()
         messages.success(request, "Pointage de sortie enregistré.")
     return redirect('attendance_dashboard')
 
+# Badgeuses : rejeu d'un lot d'événements, authentifié par jeton (pas de session ni CSRF)
+@csrf_exempt
+@require_POST
+def clock_batch(request):
+    token = getattr(settings, 'KIOSK_API_TOKEN', '')
+    auth = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(auth.encode(), f'Bearer {token}'.encode()):
+        return JsonResponse({'error': "Jeton de badgeuse invalide."}, status=401)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "Corps JSON invalide."}, status=400)
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        return JsonResponse({'error': "Le champ 'events' doit être une liste."}, status=400)
+    if len(events) > clock.BATCH_MAX_EVENTS:
+        return JsonResponse({'error': f"Au plus {clock.BATCH_MAX_EVENTS} événements par lot."}, status=413)
+    results = clock.apply_batch(events)
+    return JsonResponse({
+        'recorded': sum(1 for r in results if r['status'] == clock.RECORDED),
+        'results': [{'index': i, **r} for i, r in enumerate(results)],
+    })
+
 # Leave Management
 def leave_list(request):
     if not request.user.is_authenticated:
         messages.error(request, "Veuillez vous connecter.")
         return redirect('login')
-    leaves = LeaveRequest.objects.select_related('employee').order_by('-created_at')
-    return render(request, 'leave/list.html', {'leaves': leaves})
+    # solde de l'employé pour le type de la demande, par jointure sur (employé, type)
+    leaves = (
+        LeaveRequest.objects.select_related('employee')
+        .annotate(balance_row=FilteredRelation(
+            'employee__leave_balances', condition=Q(employee__leave_balances__type=F('type')),
+        ))
+        .annotate(balance=F('balance_row__balance'))
+    )
+    page = KeysetPaginator(leaves, 'created_at', True, DEMANDES_PAR_PAGE).page(
+        after=request.GET.get('apres'),
+        before=request.GET.get('avant'),
+    )
+    return render(request, 'leave/list.html', {'leaves': page['object_list'], 'page': page})
+
+def leave_export(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('leave_list')
+    return _export_response(request, exports.LEAVE_COLUMNS, exports.leave_rows, 'conges')
 
 def leave_create(request):
     if not request.user.is_authenticated:
@@ -302,8 +512,11 @@ def leave_create(request):
         return redirect('login')
     form = LeaveRequestForm(request.POST or None)
     if form.is_valid():
-        form.save()
+        leave = form.save()
         messages.success(request, "Demande de congé créée.")
+        warning = leave_coverage.coverage_warning(leave)
+        if warning:
+            messages.warning(request, warning)
         return redirect('leave_list')
     return render(request, 'leave/form.html', {'form': form})
 
@@ -335,10 +548,21 @@ def leave_approve(request, id):
         messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
         return redirect('leave_list')
     lr = get_object_or_404(LeaveRequest, id=id)
+    # demandes antérieures au contrôle du formulaire : pas deux congés approuvés le même jour
+    clash = leave_coverage.overlapping(lr.employee_id, lr.start_date, lr.end_date, statuses=('approved',), exclude_id=lr.id).first()
+    if clash:
+        messages.error(request, f"Chevauche un congé déjà approuvé ({clash.start_date} → {clash.end_date}).")
+        return redirect('leave_list')
     lr.status = 'approved'
     lr.approved_by = request.user.get_username()
     lr.save()
     messages.success(request, "Demande de congé approuvée.")
+    warning = leave_coverage.coverage_warning(lr)
+    if warning:
+        messages.warning(request, warning)
+    balance = LeaveBalance.objects.filter(employee_id=lr.employee_id, type=lr.type).values_list('balance', flat=True).first()
+    if lr.type == 'annual' and balance is not None and balance < 0:
+        messages.warning(request, f"Solde de congés négatif pour {lr.employee.nom} : {balance} jour(s).")
     return redirect('leave_list')
 
 def leave_reject(request, id):
@@ -351,3 +575,95 @@ def leave_reject(request, id):
     lr.save()
     messages.success(request, "Demande de congé rejetée.")
     return redirect('leave_list')
+
+# Approbation/rejet groupé des demandes cochées dans la liste (un seul UPDATE)
+@require_POST
+def leave_bulk(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('leave_list')
+    action = request.POST.get('action')
+    try:
+        ids = [int(value) for value in request.POST.getlist('ids')]
+    except ValueError:
+        ids = None
+    if action not in leave_actions.DECISIONS or ids is None:
+        messages.error(request, "Requête invalide.")
+        return redirect('leave_list')
+    if not ids:
+        messages.error(request, "Aucune demande sélectionnée.")
+        return redirect('leave_list')
+    if len(ids) > leave_actions.BULK_MAX_IDS:
+        messages.error(request, f"Au plus {leave_actions.BULK_MAX_IDS} demandes par lot.")
+        return redirect('leave_list')
+    result = leave_actions.decide(ids, action, request.user.get_username())
+    verb = "approuvée(s)" if action == 'approve' else "rejetée(s)"
+    messages.success(request, f"{len(result['updated'])} demande(s) {verb}.")
+    if result['skipped']:
+        messages.warning(request, "Ignorée(s), déjà traitée(s) ou introuvable(s) : " + ', '.join(f"#{pk}" for pk in result['skipped']))
+    if result['overlapping']:
+        messages.warning(request, "Non approuvée(s), chevauchement avec un congé approuvé : " + ', '.join(f"#{pk}" for pk in result['overlapping']))
+    if action == 'approve':
+        for warning in leave_coverage.coverage_warnings(result['updated']):
+            messages.warning(request, warning)
+    return redirect('leave_list')
+
+# Historique d'une entité : entrées du journal d'audit, les plus récentes d'abord
+@require_safe
+def audit_history(request, entity, id):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('dashboard')
+    model = audit.MODELS.get(entity)
+    if model is None:
+        raise Http404("Entité inconnue.")
+    page = KeysetPaginator(audit.history(model, id), 'at', True, HISTORIQUE_PAR_PAGE).page(
+        after=request.GET.get('apres'),
+        before=request.GET.get('avant'),
+    )
+    labels = {field.attname: field.verbose_name for field in model._meta.concrete_fields}
+    entries = [
+        (entry, [(labels.get(name, name), old, new) for name, (old, new) in entry.changes.items()])
+        for entry in page['object_list']
+    ]
+    return render(request, 'audit/history.html', {
+        'entity': entity,
+        'entity_id': id,
+        'object': model.objects.filter(pk=id).first(),
+        'entries': entries,
+        'page': page,
+    })
+
+def _bars(rows):
+    # largeur de chaque barre en % de la plus haute (dernier élément : l'effectif)
+    tallest = max((row[-1] for row in rows), default=0) or 1
+    return [(*row, row[-1] * 100 // tallest) for row in rows]
+
+# Effectifs, salaires et embauches, lus dans l'instantané en mémoire (employe/analytics.py)
+@require_safe
+def analytics_page(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        messages.error(request, "Accès refusé: réservé aux administrateurs/gestionnaires.")
+        return redirect('dashboard')
+    snapshot = analytics.snapshot
+    departement = request.GET.get('departement', '')
+    if departement.isdigit():
+        histogram = snapshot.histogram(by=analytics.DEPARTMENT, key=int(departement))
+    else:
+        departement, histogram = '', snapshot.histogram()
+    return render(request, 'analytics/index.html', {
+        'departments': snapshot.salary_summary(analytics.DEPARTMENT),
+        'postes': snapshot.salary_summary(analytics.POSTE),
+        'histogram': _bars(histogram),
+        'hires': _bars(snapshot.hiring_trend()),
+        'departement': departement,
+        'department_choices': object_cache.department_choices(),
+    })
+
+# Statistiques SQL cumulées par vue (SQLInstrumentationMiddleware)
+def sql_stats(request):
+    if not request.user.is_authenticated or not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'error': "Accès refusé: réservé aux administrateurs/gestionnaires."}, status=403)
+    views = view_stats.snapshot()
+    order = sorted(views, key=lambda name: views[name]['total_ms'], reverse=True)
+    return JsonResponse({'views': {name: views[name] for name in order}})
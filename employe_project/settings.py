@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # en premier : mesure aussi les requêtes SQL des autres middlewares (session, auth)
+    'employe.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # après l'authentification : l'auteur des entrées du journal d'audit
+    'employe.middleware.AuditActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,6 +85,33 @@ DATABASES = {
     }
 }
 
+# Profil SQLite de production : journal WAL (lecteurs et écrivain ne se bloquent plus),
+# synchronous=NORMAL (pas de fsync à chaque commit en WAL), attente sur verrou au lieu de
+# « database is locked », lectures via mmap et cache de pages agrandi.
+# Les PRAGMA sont appliqués à chaque nouvelle connexion.
+SQLITE_PRODUCTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+]
+
+# Activer avec DJANGO_DB_PROFILE=production
+if os.getenv('DJANGO_DB_PROFILE') == 'production':
+    DATABASES['default'].update({
+        # connexions persistantes, vérifiées avant réutilisation
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            # prendre le verrou d'écriture dès BEGIN : évite les échecs de promotion de verrou
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(SQLITE_PRODUCTION_PRAGMAS),
+        },
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,3 +153,58 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Plusieurs processus (gunicorn/uvicorn --workers) : cache fichier commun, sinon chaque
+# processus garde ses propres entrées et ne voit pas les invalidations des autres
+if os.getenv('DJANGO_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+
+# Durée de vie (secondes) des départements et employés en cache (employe/cache.py)
+OBJECT_CACHE_TTL = 300
+
+# Durée de vie (secondes) des indicateurs du tableau de bord en cache
+KPI_CACHE_TTL = 30
+
+# Tableau des présences en direct (attendance/live/, serveur ASGI) : fréquence de vérification
+# des changements et intervalle des messages de maintien de la connexion, en secondes
+LIVE_POLL_SECONDS = 1
+LIVE_HEARTBEAT_SECONDS = 15
+
+# Heure locale au-delà de laquelle une arrivée compte comme un retard (rapport mensuel)
+ATTENDANCE_LATE_AFTER = '09:00'
+
+# Mois complets gardés dans la table des présences (mois en cours compris) ; les plus
+# anciens sont déplacés dans l'archive par `manage.py archive_attendance` (pour augmenter
+# cette valeur, ramener d'abord les mois concernés avec --restore)
+ATTENDANCE_HOT_MONTHS = 3
+
+# Journal d'audit (employe/audit.py) : entrées d'une transaction écrites à son commit, par
+# INSERT de AUDIT_BATCH_SIZE lignes au plus
+AUDIT_BATCH_SIZE = 200
+
+# Part minimale de l'effectif d'un département qui doit rester présente (alerte à l'approbation)
+LEAVE_MIN_COVERAGE = 0.5
+
+# Jeton partagé des badgeuses pour attendance/clock/batch/ (désactivé si vide)
+KIOSK_API_TOKEN = os.getenv('KIOSK_API_TOKEN', '')
+
+# Jeton des intégrations pour l'API JSON api/v1/ (désactivé si vide ; les comptes staff y ont accès par session)
+API_TOKEN = os.getenv('API_TOKEN', '')
+
+# Alerte N+1 : une même forme de requête SQL exécutée plus de N fois par requête HTTP
+SQL_N_PLUS_ONE_THRESHOLD = 10